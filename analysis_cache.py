@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from .config import config
+from .data_models import CellAnalysis
+
+def default_cache_path() -> str:
+    """Returns the default cache database location, honouring XDG_CACHE_HOME."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'nb2curio', config.CACHE_FILENAME)
+
+class AnalysisCache:
+    """
+    Persistent, content-addressed store of CellAnalysis results backed by SQLite.
+    Entries are keyed by a SHA-256 digest of the analyzer version and the raw cell
+    source, so edits to a cell or to the analyzer itself never return stale results.
+    A non-empty namespace, such as the fingerprint of custom categorization rules,
+    is mixed into every key to keep analyses made under other settings apart.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS analyses (
+            key TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_used REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = config.CACHE_MAX_BYTES,
+                 namespace: str = ""):
+        self.path = path or default_cache_path()
+        self.max_bytes = max_bytes
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._puts_since_check = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(self._SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_last_used ON analyses (last_used)")
+
+    def digest(self, source: str) -> str:
+        """Computes the cache key for a cell source."""
+        h = hashlib.sha256(config.ANALYZER_VERSION.encode('utf-8'))
+        h.update(b'\0')
+        if self.namespace:
+            h.update(self.namespace.encode('utf-8'))
+            h.update(b'\0')
+        h.update(source.encode('utf-8', 'surrogatepass'))
+        return h.hexdigest()
+
+    def get(self, source: str) -> Optional[CellAnalysis]:
+        """Returns the cached analysis for source, or None on a miss."""
+        key = self.digest(source)
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM analyses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE analyses SET last_used = ? WHERE key = ?", (time.time(), key))
+        return self._decode(row[0])
+
+    def contains(self, source: str) -> bool:
+        """Checks for an entry without touching the hit/miss counters."""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM analyses WHERE key = ?", (self.digest(source),)).fetchone()
+        return row is not None
+
+    def put(self, source: str, analysis: CellAnalysis) -> None:
+        """Stores an analysis, evicting least recently used entries when over budget."""
+        try:
+            payload = self._encode(analysis)
+        except (TypeError, ValueError):
+            return  # Specs that are not plain JSON are simply not cached.
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (key, payload, size, last_used) VALUES (?, ?, ?, ?)",
+                (self.digest(source), payload, len(payload), time.time())
+            )
+            self._puts_since_check += 1
+            if self._puts_since_check >= config.CACHE_EVICTION_INTERVAL:
+                self._evict()
+
+    def clear(self) -> None:
+        """Removes every entry from the cache."""
+        with self._lock:
+            self._conn.execute("DELETE FROM analyses")
+            self._conn.execute("VACUUM")
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and the current size of the store."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analyses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits, "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries, "bytes": size, "max_bytes": self.max_bytes,
+        }
+
+    def close(self) -> None:
+        """Runs a final eviction pass and closes the database."""
+        with self._lock:
+            self._evict()
+            self._conn.close()
+
+    def _evict(self) -> None:
+        """Deletes least recently used entries until the store is below budget."""
+        self._puts_since_check = 0
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM analyses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% of the budget so eviction does not run on every subsequent put.
+        excess = total - int(self.max_bytes * 0.9)
+        freed, stale = 0, []
+        for key, size in self._conn.execute("SELECT key, size FROM analyses ORDER BY last_used"):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM analyses WHERE key = ?", stale)
+
+    @staticmethod
+    def _encode(analysis: CellAnalysis) -> str:
+        return json.dumps({
+            "defined_vars": sorted(analysis.defined_vars),
+            "used_vars": sorted(analysis.used_vars),
+            "pure_overwrites": sorted(analysis.pure_overwrites),
+            "category": analysis.category,
+            "vega_spec": analysis.vega_spec,
+        }, separators=(',', ':'))
+
+    @staticmethod
+    def _decode(payload: str) -> CellAnalysis:
+        data = json.loads(payload)
+        return CellAnalysis(
+            defined_vars=set(data["defined_vars"]),
+            used_vars=set(data["used_vars"]),
+            pure_overwrites=set(data["pure_overwrites"]),
+            category=data["category"],
+            vega_spec=data["vega_spec"]
+        )
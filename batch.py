@@ -0,0 +1,180 @@
+import glob
+import multiprocessing.util
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from .notebook_processor import NotebookProcessor
+from .code_analyzer import CodeAnalyzer
+from .graph_builder import DependencyGraphBuilder
+from .curio_converter import CurioConverter
+from .analysis_cache import AnalysisCache
+from .spec_extractor import AltairSpecExtractor
+from .data_models import BatchResult
+from .curio_writer import CurioWriter
+from .category_rules import CategoryRules
+from .script_reader import is_percent_script
+from .config import config
+
+# Per-process pipeline, created once by the pool initializer so that every
+# notebook handled by a worker reuses the same warm analyzer and converter.
+_pipeline: Optional[Tuple[DependencyGraphBuilder, CurioConverter, CurioWriter, Optional[int]]] = None
+# Closes the pipeline's analysis cache; runs at most once, at the latest when
+# the process exits.
+_close_cache: Optional[Callable[[], None]] = None
+
+def _init_worker(cache_path: Optional[str] = None, writer: Optional[CurioWriter] = None,
+                 rules: Optional[CategoryRules] = None, layout: Optional[str] = None,
+                 coarsen: Optional[int] = None, datasets: Optional[str] = None,
+                 dataset_min_bytes: int = config.DATASET_MIN_BYTES) -> None:
+    """Builds the conversion pipeline for the current process."""
+    global _pipeline, _close_cache
+    rules = rules or CategoryRules.default()
+    cache = AnalysisCache(cache_path, namespace=rules.fingerprint) if cache_path else None
+    if cache is not None:
+        # Pool workers started by fork leave without running atexit handlers,
+        # but multiprocessing finalizers run in every worker on shutdown.
+        _close_cache = multiprocessing.util.Finalize(None, cache.close, exitpriority=10)
+    # The notebooks themselves are already spread across processes, so each
+    # worker only needs a single spec extraction subprocess.
+    analyzer = CodeAnalyzer(cache=cache, spec_extractor=AltairSpecExtractor(workers=1), rules=rules)
+    writer = writer or CurioWriter()
+    converter = CurioConverter(compact=writer.compact, layout=layout, datasets=datasets,
+                               dataset_min_bytes=dataset_min_bytes)
+    _pipeline = (DependencyGraphBuilder(analyzer), converter, writer, coarsen)
+
+def _convert_one(notebook_path: str, output_path: str) -> BatchResult:
+    """Converts one notebook, capturing any failure in the result."""
+    graph_builder, curio_converter, writer, coarsen = _pipeline
+    analyzer = graph_builder.analyzer
+    hits, misses = analyzer.hits, analyzer.misses
+    result = BatchResult(notebook_path=notebook_path, output_path=output_path)
+    start = time.perf_counter()
+    try:
+        code_cells = NotebookProcessor(notebook_path).get_code_cells()
+        result.cell_count = len(code_cells)
+        if not code_cells:
+            result.error = "No code cells found in the notebook."
+        else:
+            dependency_graph = graph_builder.build_graph(code_cells)
+            if coarsen is not None:
+                dependency_graph = graph_builder.coarsen_chains(dependency_graph, coarsen)
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            writer.write(output_path, curio_converter.dataflow(dependency_graph))
+    except Exception as e:
+        result.error = str(e) or type(e).__name__
+    result.cache_hits, result.cache_misses = analyzer.hits - hits, analyzer.misses - misses
+    result.seconds = time.perf_counter() - start
+    return result
+
+class BatchConverter:
+    """Converts many notebooks to Curio JSON on a pool of worker processes."""
+
+    def __init__(self, output_dir: str, jobs: Optional[int] = None, cache_path: Optional[str] = None,
+                 writer: Optional[CurioWriter] = None, rules: Optional[CategoryRules] = None,
+                 layout: Optional[str] = None, coarsen: Optional[int] = None,
+                 datasets: Optional[str] = None, dataset_min_bytes: int = config.DATASET_MIN_BYTES):
+        self.output_dir = output_dir
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        self.cache_path = cache_path
+        self.writer = writer or CurioWriter()
+        self.rules = rules
+        self.layout = layout
+        self.coarsen = coarsen
+        self.datasets = datasets
+        self.dataset_min_bytes = dataset_min_bytes
+
+    @staticmethod
+    def collect_notebooks(inputs: Iterable[str]) -> List[Tuple[str, str]]:
+        """
+        Expands files, directories and glob patterns into (path, relative name)
+        pairs. Directories are searched recursively for notebooks and for .py
+        files with percent-format cell markers, and their layout is mirrored in
+        the output directory.
+        """
+        found: Dict[str, str] = {}
+        for entry in inputs:
+            if os.path.isdir(entry):
+                root = Path(entry)
+                for path in sorted([*root.rglob('*.ipynb'), *root.rglob('*.py')]):
+                    if '.ipynb_checkpoints' in path.parts:
+                        continue
+                    if path.suffix == '.py' and not is_percent_script(str(path)):
+                        continue
+                    found.setdefault(str(path), str(path.relative_to(root)))
+            elif glob.has_magic(entry):
+                for path in sorted(glob.glob(entry, recursive=True)):
+                    if os.path.isfile(path):
+                        found.setdefault(path, os.path.basename(path))
+            else:
+                found.setdefault(entry, os.path.basename(entry))
+        return list(found.items())
+
+    def _plan_outputs(self, notebooks: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Maps each notebook to a unique output JSON path."""
+        planned, taken = [], set()
+        extension = '.json.gz' if self.writer.compress else '.json'
+        for notebook_path, relative_name in notebooks:
+            stem = os.path.splitext(relative_name)[0]
+            candidate, n = stem, 1
+            while candidate in taken:
+                n += 1
+                candidate = f"{stem}_{n}"
+            taken.add(candidate)
+            planned.append((notebook_path, os.path.join(self.output_dir, candidate + extension)))
+        return planned
+
+    def _worker_args(self) -> tuple:
+        return (self.cache_path, self.writer, self.rules, self.layout, self.coarsen,
+                self.datasets, self.dataset_min_bytes)
+
+    def run(self, inputs: Iterable[str]) -> List[BatchResult]:
+        """Converts every notebook matched by inputs and prints a throughput summary."""
+        planned = self._plan_outputs(self.collect_notebooks(inputs))
+        if not planned:
+            print("No notebooks found for the given inputs.")
+            return []
+
+        jobs = min(self.jobs, len(planned))
+        print(f"\nConverting {len(planned)} notebooks with {jobs} worker(s)...")
+        start = time.perf_counter()
+        results = []
+        if jobs == 1:
+            _init_worker(*self._worker_args())
+            try:
+                for notebook_path, output_path in planned:
+                    results.append(self._report(_convert_one(notebook_path, output_path)))
+            finally:
+                if _close_cache is not None:
+                    _close_cache()
+        else:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                     initargs=self._worker_args()) as executor:
+                futures = [executor.submit(_convert_one, nb, out) for nb, out in planned]
+                for future in as_completed(futures):
+                    results.append(self._report(future.result()))
+        self._print_summary(results, time.perf_counter() - start)
+        return results
+
+    @staticmethod
+    def _report(result: BatchResult) -> BatchResult:
+        """Prints a one-line status for a finished notebook."""
+        if result.ok:
+            print(f"  ok     {result.notebook_path} ({result.cell_count} cells, {result.seconds:.2f}s)")
+        else:
+            print(f"  FAILED {result.notebook_path}: {result.error}")
+        return result
+
+    @staticmethod
+    def _print_summary(results: List[BatchResult], elapsed: float) -> None:
+        """Prints totals and throughput for the whole batch."""
+        converted = [r for r in results if r.ok]
+        cells = sum(r.cell_count for r in converted)
+        elapsed = max(elapsed, 1e-9)
+        print(f"\nConverted {len(converted)}/{len(results)} notebooks "
+              f"({len(results) - len(converted)} failed) in {elapsed:.2f}s")
+        print(f"Throughput: {len(results) / elapsed:.1f} notebooks/s, {cells / elapsed:.1f} cells/s")
+        hits, misses = sum(r.cache_hits for r in results), sum(r.cache_misses for r in results)
+        if hits or misses:
+            print(f"Analysis cache: {hits} hits, {misses} misses ({hits / (hits + misses):.0%} hit rate)")
@@ -0,0 +1,82 @@
+"""
+Import-time benchmark for the convert path.
+
+Runs `python -X importtime -c "import <package>.main"` in fresh interpreters and
+fails (exit status 1) when the median cumulative import time exceeds the budget
+or when a module that only the visualizer or Altair extraction needs is imported.
+
+    python -m notebook_converter.benchmarks.import_time --budget-ms 400
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = os.path.basename(PACKAGE_DIR)
+
+DEFAULT_BUDGET_MS = 400.0
+# Heavy modules that must stay off the plain --output conversion path.
+FORBIDDEN_MODULES = ("tkinter", "matplotlib", "pandas", "altair", "vega_datasets")
+
+def measure_once(module: str) -> Tuple[float, Dict[str, int]]:
+    """Imports module in a fresh interpreter; returns (total ms, per-module cumulative us)."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, [os.path.dirname(PACKAGE_DIR), os.environ.get('PYTHONPATH')])
+    ))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True
+    )
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cum.isdigit():
+            cumulative[name] = int(cum)
+    return cumulative.get(module, 0) / 1000, cumulative
+
+def run(module: str, repeat: int) -> Dict:
+    """Measures module import time repeat times and collects any forbidden imports."""
+    totals: List[float] = []
+    forbidden = set()
+    for _ in range(repeat):
+        total_ms, cumulative = measure_once(module)
+        totals.append(total_ms)
+        forbidden.update(name.split('.')[0] for name in cumulative if name.split('.')[0] in FORBIDDEN_MODULES)
+    return {
+        "module": module,
+        "median_ms": statistics.median(totals),
+        "min_ms": min(totals),
+        "runs_ms": totals,
+        "forbidden_imports": sorted(forbidden),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check the import-time budget of the convert path.")
+    parser.add_argument("--module", default=f"{PACKAGE_NAME}.main", help="Module to import (default: the CLI module).")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Maximum median import time in milliseconds.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of fresh interpreters to sample.")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON.")
+    args = parser.parse_args()
+
+    result = run(args.module, args.repeat)
+    result["budget_ms"] = args.budget_ms
+    result["passed"] = result["median_ms"] <= args.budget_ms and not result["forbidden_imports"]
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"import {result['module']}: median {result['median_ms']:.1f} ms "
+              f"(min {result['min_ms']:.1f} ms, budget {args.budget_ms:.0f} ms)")
+        if result["forbidden_imports"]:
+            print("Heavy modules imported on the convert path: " + ", ".join(result["forbidden_imports"]))
+        print("PASS" if result["passed"] else "FAIL")
+    sys.exit(0 if result["passed"] else 1)
+
+if __name__ == "__main__":
+    main()
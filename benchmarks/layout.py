@@ -0,0 +1,93 @@
+"""
+Layout engine benchmark.
+
+Places the nodes of synthetic notebooks, and of any notebooks given on the
+command line, with every Curio layout engine and reports the time taken, the
+number of columns, the tallest column in rows and the number of edge crossings
+when edges are drawn as straight lines. Results are written as JSON so runs can
+be compared.
+
+    python -m notebook_converter.benchmarks.layout -o layout.json
+    python -m notebook_converter.benchmarks.layout path/to/notebook.ipynb
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+from .synthetic import NotebookShape, write_notebook
+from ..notebook_processor import NotebookProcessor
+from ..code_analyzer import CodeAnalyzer
+from ..graph_builder import DependencyGraphBuilder
+from ..graph_layout import LAYOUTS, make_layout, count_crossings
+from ..spec_extractor import AltairSpecExtractor
+
+SCENARIOS: Dict[str, NotebookShape] = {
+    "random": NotebookShape(cells=1500, vars_per_cell=2, fan_in=3, viz_fraction=0.05),
+    "pipelines": NotebookShape(cells=2000, fan_in=2, viz_fraction=0.05, pipelines=200),
+    "wide_pipelines": NotebookShape(cells=5000, fan_in=2, viz_fraction=0.05, pipelines=1000),
+}
+
+def measure(path: str, repeat: int, spec_extractor: AltairSpecExtractor) -> Dict[str, Any]:
+    """Lays out one notebook with every engine and returns the measurements."""
+    builder = DependencyGraphBuilder(CodeAnalyzer(spec_extractor=spec_extractor))
+    view = builder.build_graph(NotebookProcessor(path).get_code_cells()).without_imports()
+    edges = sum(1 for _ in view.edges())
+    layouts = {}
+    for name in LAYOUTS:
+        layout = make_layout(name)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            positions = layout.place(view)
+            times.append(time.perf_counter() - start)
+        columns: Dict[float, List[float]] = {}
+        for x, y in positions.values():
+            columns.setdefault(x, []).append(y)
+        layouts[name] = {
+            "median_s": statistics.median(times),
+            "columns": len(columns),
+            "tallest_column_rows": max((max(ys) - min(ys) + 1 for ys in columns.values()), default=0),
+            "crossings": count_crossings(view, positions),
+        }
+    return {"nodes": len(view), "edges": edges, "layouts": layouts}
+
+def print_result(name: str, result: Dict[str, Any]) -> None:
+    print(f"\n{name} ({result['nodes']} nodes, {result['edges']} edges)")
+    for layout, m in result["layouts"].items():
+        print(f"  {layout:<12} {m['median_s'] * 1000:9.2f} ms  {m['columns']:5d} columns  "
+              f"{m['tallest_column_rows']:7.1f} rows  {m['crossings']:10d} crossings")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the Curio layout engines.")
+    parser.add_argument("notebooks", nargs="*", help="Notebooks to lay out in addition to the synthetic scenarios.")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS), help="Synthetic scenario to run (repeatable; default: all, or none when notebooks are given).")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Layout runs per engine; the median time is reported.")
+    parser.add_argument("-o", "--output", help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    names = args.scenario or ([] if args.notebooks else list(SCENARIOS))
+    spec_extractor = AltairSpecExtractor()
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for name in names:
+                path = os.path.join(workdir, f"{name}.ipynb")
+                write_notebook(path, SCENARIOS[name])
+                results[name] = measure(path, args.repeat, spec_extractor)
+                print_result(name, results[name])
+        for path in args.notebooks:
+            results[path] = measure(path, args.repeat, spec_extractor)
+            print_result(path, results[path])
+    finally:
+        spec_extractor.close()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"results": results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
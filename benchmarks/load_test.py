@@ -0,0 +1,194 @@
+"""
+Load test for the conversion server.
+
+Sends POST /convert requests from several concurrent clients, each keeping its
+connection open, and reports throughput, latency percentiles, errors and the
+server's cache hit rates taken from /metrics. The target is a running server
+(--url or --socket) or one started for the run on a free port (--spawn).
+
+    python -m notebook_converter.benchmarks.load_test --spawn -n 200 -c 8
+    python -m notebook_converter.benchmarks.load_test --url http://127.0.0.1:8765 --notebook nb.ipynb
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from .synthetic import NotebookShape, generate_notebook
+from .import_time import PACKAGE_DIR, PACKAGE_NAME
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix domain socket."""
+
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+def _connect(target: str, timeout: float) -> http.client.HTTPConnection:
+    if target.startswith("unix:"):
+        return _UnixHTTPConnection(target[len("unix:"):], timeout)
+    url = urlsplit(target)
+    return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+
+def _request(conn: http.client.HTTPConnection, method: str, path: str, body: Optional[bytes] = None):
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    return response.status, response.read()
+
+def spawn_server(jobs: int, no_cache: bool) -> Tuple[subprocess.Popen, str]:
+    """Starts `main serve` on a free port and returns the process and its URL."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, [os.path.dirname(PACKAGE_DIR), os.environ.get('PYTHONPATH')])
+    ))
+    command = [sys.executable, "-m", f"{PACKAGE_NAME}.main", "serve", "--port", "0", "-j", str(jobs)]
+    if no_cache:
+        command.append("--no-cache")
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, env=env)
+    line = proc.stdout.readline()
+    if not line.startswith("Listening on "):
+        proc.kill()
+        raise RuntimeError(f"server failed to start: {line.strip() or 'no output'}")
+    return proc, line.split("Listening on ", 1)[1].strip()
+
+def _bodies(args: argparse.Namespace) -> List[bytes]:
+    if args.notebook:
+        bodies = []
+        for path in args.notebook:
+            with open(path, 'rb') as f:
+                bodies.append(f.read())
+        return bodies
+    if args.unique:
+        # A different seed per request keeps the server's caches from answering.
+        return [json.dumps(generate_notebook(NotebookShape(cells=args.cells, seed=i))).encode('utf-8')
+                for i in range(args.requests)]
+    return [json.dumps(generate_notebook(NotebookShape(cells=args.cells))).encode('utf-8')]
+
+def run_load(target: str, bodies: List[bytes], requests: int, concurrency: int,
+             path: str = "/convert", timeout: float = 300.0) -> Dict[str, Any]:
+    """Sends requests POSTs spread over concurrency persistent connections."""
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    errors: List[str] = []
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def client() -> None:
+        conn = _connect(target, timeout)
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            start = time.perf_counter()
+            try:
+                status, _ = _request(conn, "POST", path, bodies[i % len(bodies)])
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                conn = _connect(target, timeout)
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+        conn.close()
+
+    threads = [threading.Thread(target=client) for _ in range(max(1, concurrency))]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "wall_seconds": wall,
+        "requests_per_second": len(latencies) / wall if wall else 0.0,
+        "latency_ms": {
+            "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            "p50": percentile(0.50), "p90": percentile(0.90), "p99": percentile(0.99),
+            "max": latencies[-1] * 1000 if latencies else 0.0,
+        },
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "errors": len(errors) + sum(count for status, count in statuses.items() if status >= 400),
+        "connection_errors": errors[:10],
+    }
+
+def fetch_metrics(target: str) -> Dict[str, Any]:
+    conn = _connect(target, 30.0)
+    try:
+        status, body = _request(conn, "GET", "/metrics")
+    finally:
+        conn.close()
+    return json.loads(body) if status == 200 else {}
+
+def print_report(result: Dict[str, Any]) -> None:
+    latency = result["latency_ms"]
+    print(f"\n{result['requests']} requests, concurrency {result['concurrency']}, {result['wall_seconds']:.2f}s")
+    print(f"  throughput  {result['requests_per_second']:.1f} req/s")
+    print(f"  latency     mean {latency['mean']:.1f} ms  p50 {latency['p50']:.1f}  p90 {latency['p90']:.1f}  "
+          f"p99 {latency['p99']:.1f}  max {latency['max']:.1f}")
+    print(f"  statuses    {result['statuses']}  errors {result['errors']}")
+    for name, cache in result.get("caches", {}).items():
+        print(f"  cache       {name}: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.1%})")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the notebook conversion server.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running server, e.g. http://127.0.0.1:8765.")
+    target.add_argument("--socket", help="Unix socket path of a running server.")
+    target.add_argument("--spawn", action="store_true", help="Start a server on a free port for the run.")
+    parser.add_argument("-n", "--requests", type=int, default=100, help="Total number of requests.")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Concurrent client connections.")
+    parser.add_argument("--notebook", action="append", help="Notebook to post (repeatable; default: a synthetic one).")
+    parser.add_argument("--cells", type=int, default=200, help="Cells in the synthetic notebook.")
+    parser.add_argument("--unique", action="store_true", help="Post a different synthetic notebook with every request.")
+    parser.add_argument("--compact", action="store_true", help="Request compact output.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes for a --spawn server.")
+    parser.add_argument("--no-cache", action="store_true", help="Run a --spawn server without the analysis cache.")
+    parser.add_argument("-o", "--output", help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    proc = None
+    if args.spawn:
+        proc, url = spawn_server(args.jobs, args.no_cache)
+    else:
+        url = args.url or f"unix:{args.socket}"
+    try:
+        bodies = _bodies(args)
+        path = "/convert?compact=1" if args.compact else "/convert"
+        result = run_load(url, bodies, args.requests, args.concurrency, path)
+        result["caches"] = fetch_metrics(url).get("caches", {})
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    print_report(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Stage-by-stage pipeline benchmark.
+
+Generates synthetic notebooks for a set of scenarios and times each stage of the
+conversion separately: load, clean, parse, visit (the AST visitor over already
+parsed cells; also reported per cell with analyze), analyze, graph (node and
+edge construction), layout, convert (dag_to_curio_json, including layout),
+serialize (json.dumps of the whole document), stream (CurioWriter streaming the
+same dataflow into memory) and render (the headless HTML graph rendering).
+Results are written as JSON so runs from different commits can be compared.
+
+    python -m notebook_converter.benchmarks.run -o before.json
+    python -m notebook_converter.benchmarks.run -o after.json
+    python -m notebook_converter.benchmarks.run --compare before.json after.json
+"""
+import argparse
+import ast
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+from .synthetic import NotebookShape, write_notebook
+from ..notebook_processor import NotebookProcessor
+from ..code_analyzer import CodeAnalyzer, CellVisitor
+from ..graph_builder import DependencyGraphBuilder
+from ..curio_converter import CurioConverter
+from ..spec_extractor import AltairSpecExtractor
+from ..curio_writer import CurioWriter
+from ..graph_renderer import GraphRenderer
+
+SCENARIOS: Dict[str, NotebookShape] = {
+    "small": NotebookShape(cells=50),
+    "medium": NotebookShape(cells=500, magic_lines=1),
+    "large": NotebookShape(cells=2500, vars_per_cell=3, fan_in=3),
+    "wide_fan_in": NotebookShape(cells=1000, vars_per_cell=4, fan_in=12),
+    "large_cells": NotebookShape(cells=100, statements_per_cell=400, viz_fraction=0.0),
+}
+
+STAGES = ("load", "clean", "parse", "visit", "analyze", "graph", "layout", "convert", "serialize", "stream", "render")
+PER_CELL_STAGES = ("visit", "analyze")
+
+def _timed(fn: Callable[[], Any]) -> Tuple[float, Any]:
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def _parse_all(sources: List[str]) -> int:
+    # Trees are discarded straight away so that the stage does not also measure
+    # garbage collector pressure from keeping every AST alive.
+    parsed = 0
+    for source in sources:
+        try:
+            ast.parse(source)
+            parsed += 1
+        except SyntaxError:
+            pass
+    return parsed
+
+def _visit_all(trees: List[ast.AST]) -> None:
+    for tree in trees:
+        CellVisitor().visit(tree)
+
+def _parse_valid(sources: List[str]) -> List[ast.AST]:
+    trees = []
+    for source in sources:
+        try:
+            trees.append(ast.parse(source))
+        except SyntaxError:
+            pass
+    return trees
+
+def run_pipeline_once(path: str, spec_extractor: AltairSpecExtractor) -> Dict[str, float]:
+    """Runs every stage once on a fresh analyzer and returns per-stage seconds."""
+    timings = {}
+    analyzer = CodeAnalyzer(spec_extractor=spec_extractor)
+    builder = DependencyGraphBuilder(analyzer)
+    converter = CurioConverter()
+
+    timings["load"], cells = _timed(lambda: NotebookProcessor(path).get_code_cells())
+    timings["clean"], cleaned = _timed(lambda: [analyzer.clean_code_for_ast(c.source) for c in cells])
+    timings["parse"], _ = _timed(lambda: _parse_all(cleaned))
+    trees = _parse_valid(cleaned)
+    timings["visit"], _ = _timed(lambda: _visit_all(trees))
+    del trees
+    timings["analyze"], analyses = _timed(lambda: builder.analyze_cells(cells))
+    timings["graph"], graph = _timed(lambda: builder.build_graph_from_analyses(cells, analyses))
+    graph_no_imports = DependencyGraphBuilder.create_graph_without_imports(graph)
+    timings["layout"], _ = _timed(lambda: converter._calculate_node_positions(graph_no_imports))
+    timings["convert"], dataflow = _timed(lambda: converter.dag_to_curio_json(graph))
+    timings["serialize"], _ = _timed(lambda: json.dumps(dataflow, indent=2))
+    timings["stream"], _ = _timed(lambda: CurioWriter().write_to(io.BytesIO(), converter.dataflow(graph)))
+    timings["render"], _ = _timed(lambda: GraphRenderer().render_to(io.StringIO(), graph, 'html'))
+    return timings
+
+def run_scenario(name: str, shape: NotebookShape, repeat: int, workdir: str,
+                 spec_extractor: AltairSpecExtractor) -> Dict[str, Any]:
+    """Benchmarks one scenario, reporting the median and minimum of each stage."""
+    path = os.path.join(workdir, f"{name}.ipynb")
+    write_notebook(path, shape)
+    runs = [run_pipeline_once(path, spec_extractor) for _ in range(repeat)]
+    stages = {
+        stage: {
+            "median_s": statistics.median(r[stage] for r in runs),
+            "min_s": min(r[stage] for r in runs),
+        }
+        for stage in STAGES
+    }
+    total = statistics.median(sum(r.values()) for r in runs)
+    per_cell_ms = {stage: stages[stage]["median_s"] * 1000 / shape.cells for stage in PER_CELL_STAGES}
+    return {
+        "scenario": name, "shape": shape.as_dict(), "repeat": repeat, "stages": stages,
+        "per_cell_ms": per_cell_ms, "total_median_s": total
+    }
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_benchmarks(names: List[str], repeat: int) -> Dict[str, Any]:
+    """Runs the selected scenarios and returns a machine-readable result document."""
+    spec_extractor = AltairSpecExtractor()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for name in names:
+                result = run_scenario(name, SCENARIOS[name], repeat, workdir, spec_extractor)
+                results.append(result)
+                print_result(result)
+    finally:
+        spec_extractor.close()
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+def print_result(result: Dict[str, Any]) -> None:
+    print(f"\n{result['scenario']} ({result['shape']['cells']} cells, median of {result['repeat']})")
+    for stage, timing in result["stages"].items():
+        print(f"  {stage:<10} {timing['median_s'] * 1000:10.2f} ms")
+    print(f"  {'total':<10} {result['total_median_s'] * 1000:10.2f} ms")
+    for stage, ms in result.get("per_cell_ms", {}).items():
+        print(f"  {stage:<10} {ms:10.3f} ms/cell")
+
+def compare(baseline_path: str, current_path: str) -> None:
+    """Prints per-stage ratios of current over baseline medians."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    with open(current_path, encoding='utf-8') as f:
+        current = json.load(f)["results"]
+
+    for result in current:
+        base = baseline.get(result["scenario"])
+        if base is None:
+            continue
+        print(f"\n{result['scenario']}")
+        for stage, timing in result["stages"].items():
+            before = base["stages"].get(stage, {}).get("median_s")
+            after = timing["median_s"]
+            ratio = f"{after / before:6.2f}x" if before else "    n/a"
+            print(f"  {stage:<10} {(before or 0) * 1000:10.2f} ms -> {after * 1000:10.2f} ms  {ratio}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the notebook conversion pipeline.")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS), help="Scenario to run (repeatable; default: all).")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Runs per scenario.")
+    parser.add_argument("-o", "--output", help="Write results as JSON to this path.")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Compare two result files instead of running.")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    document = run_benchmarks(args.scenario or list(SCENARIOS), args.repeat)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Synthetic notebook generator for benchmarks.
+
+Produces nbformat v4 notebooks with a controllable shape: number of code cells,
+variables defined per cell, dependency fan-in, share of Altair/Vega-Lite cells,
+number of IPython magic/shell lines per cell and number of independent pipelines
+the cells are spread over.
+
+    python -m notebook_converter.benchmarks.synthetic out.ipynb --cells 2000 --fan-in 3
+"""
+import argparse
+import json
+import random
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List
+
+@dataclass
+class NotebookShape:
+    """Parameters controlling the generated notebook."""
+    cells: int = 200
+    vars_per_cell: int = 2
+    fan_in: int = 2
+    viz_fraction: float = 0.1
+    altair_share: float = 0.5
+    magic_lines: int = 0
+    statements_per_cell: int = 0
+    pipelines: int = 1
+    seed: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+def _code_cell(index: int, source: str) -> Dict[str, Any]:
+    return {
+        "cell_type": "code", "id": f"cell-{index:06d}", "metadata": {},
+        "execution_count": None, "outputs": [], "source": source,
+    }
+
+def _magic_lines(rng: random.Random, count: int) -> List[str]:
+    choices = ["%time", "%matplotlib inline", "!ls -la", "%load_ext autoreload", "!pip list"]
+    return [rng.choice(choices) for _ in range(count)]
+
+def _vega_literal(var: str) -> str:
+    return (
+        'spec = {"$schema": "https://vega.github.io/schema/vega-lite/v5.json", '
+        f'"mark": "bar", "encoding": {{"x": {{"field": "{var}", "type": "quantitative"}}}}}}'
+    )
+
+def generate_notebook(shape: NotebookShape) -> Dict[str, Any]:
+    """Builds a notebook dictionary with the requested shape."""
+    rng = random.Random(shape.seed)
+    cells = [_code_cell(0, "import pandas as pd\nimport numpy as np\nimport altair as alt")]
+    pools: List[List[str]] = [[] for _ in range(max(1, shape.pipelines))]
+
+    for i in range(1, shape.cells):
+        # Each cell reads only the variables of its own pipeline.
+        defined = pools[rng.randrange(len(pools))] if len(pools) > 1 else pools[0]
+        lines = _magic_lines(rng, shape.magic_lines)
+        inputs = rng.sample(defined, min(shape.fan_in, len(defined))) if defined else []
+
+        if not defined or rng.random() < 0.05:
+            var = f"raw_{i}"
+            lines.append(f"{var} = pd.read_csv('data_{i}.csv')")
+            defined.append(var)
+        elif rng.random() < shape.viz_fraction:
+            source_var = inputs[0]
+            if rng.random() < shape.altair_share:
+                lines.append(f"alt.Chart({source_var}).mark_point().encode(x='a', y='b')")
+            else:
+                lines.append(_vega_literal(source_var))
+        else:
+            expr = " + ".join(f"{v}['a']" for v in inputs) or "0"
+            for k in range(shape.vars_per_cell):
+                var = f"v_{i}_{k}"
+                lines.append(f"{var} = {inputs[0] if inputs else 'pd'}.assign(a={expr} * {k + 1})")
+                defined.append(var)
+            for k in range(shape.statements_per_cell):
+                lines.append(f"tmp_{i}_{k} = [x ** 2 for x in range({k + 10}) if x % 3 == 0]")
+        cells.append(_code_cell(i, "\n".join(lines)))
+
+    return {
+        "cells": cells,
+        "metadata": {"kernelspec": {"name": "python3", "display_name": "Python 3", "language": "python"}},
+        "nbformat": 4, "nbformat_minor": 5,
+    }
+
+def write_notebook(path: str, shape: NotebookShape) -> None:
+    """Generates a notebook and writes it to path."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(generate_notebook(shape), f, indent=1)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic notebook for benchmarking.")
+    parser.add_argument("output", help="Path of the .ipynb file to write.")
+    defaults = NotebookShape()
+    parser.add_argument("--cells", type=int, default=defaults.cells, help="Number of code cells.")
+    parser.add_argument("--vars-per-cell", type=int, default=defaults.vars_per_cell, help="Variables defined per transform cell.")
+    parser.add_argument("--fan-in", type=int, default=defaults.fan_in, help="Earlier variables read by each cell.")
+    parser.add_argument("--viz-fraction", type=float, default=defaults.viz_fraction, help="Fraction of visualization cells.")
+    parser.add_argument("--altair-share", type=float, default=defaults.altair_share, help="Share of visualization cells using Altair rather than literal Vega-Lite specs.")
+    parser.add_argument("--magic-lines", type=int, default=defaults.magic_lines, help="Magic/shell lines per cell.")
+    parser.add_argument("--statements-per-cell", type=int, default=defaults.statements_per_cell, help="Extra statements per transform cell, to make large cells.")
+    parser.add_argument("--pipelines", type=int, default=defaults.pipelines, help="Independent pipelines the cells are spread over.")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="Random seed.")
+    args = parser.parse_args()
+
+    shape = NotebookShape(
+        cells=args.cells, vars_per_cell=args.vars_per_cell, fan_in=args.fan_in,
+        viz_fraction=args.viz_fraction, altair_share=args.altair_share,
+        magic_lines=args.magic_lines, statements_per_cell=args.statements_per_cell,
+        pipelines=args.pipelines, seed=args.seed
+    )
+    write_notebook(args.output, shape)
+    print(f"Wrote {shape.cells}-cell notebook to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Optional, Pattern, Sequence, Tuple
+from .config import config
+
+_RULE_KEYS = frozenset(["category", "keywords", "patterns"])
+
+class RulesError(ValueError):
+    """Raised when categorization rules are malformed."""
+
+def _default_rules() -> List[Dict[str, Any]]:
+    return [
+        {"category": "visualize", "keywords": sorted(config.VIZ_KEYWORDS), "patterns": []},
+        {"category": "load_data", "keywords": sorted(config.DATA_KEYWORDS), "patterns": []},
+    ]
+
+class CategoryRules:
+    """
+    Keyword rules that categorize cells, checked in priority order, where the
+    first rule that matches a cell's text gives its category. Each rule lists
+    literal keywords and optionally regular expressions. Rules are compiled once:
+    keywords stay plain substrings, which CPython's string search scans several
+    times faster than a regex alternation over the same words, and the patterns
+    of a rule are joined into a single expression. A Vega-Lite spec found in the
+    cell counts as a match for the "visualize" rule.
+
+    A rules file is JSON of the form
+    {"rules": [{"category": "load_data", "keywords": ["read_csv"], "patterns": ["read_(parquet|feather)"]}]}.
+    """
+    _default: Optional['CategoryRules'] = None
+
+    def __init__(self, rules: Sequence[Dict[str, Any]]):
+        self.rules = [self._validate(rule) for rule in rules]
+        compiled: List[Tuple[str, Tuple[str, ...], Optional[Pattern[str]]]] = [
+            (
+                rule["category"],
+                tuple(rule["keywords"]),
+                re.compile("|".join(f"(?:{pattern})" for pattern in rule["patterns"])) if rule["patterns"] else None,
+            )
+            for rule in self.rules
+        ]
+        if not any(category == "visualize" for category, _, _ in compiled):
+            compiled.insert(0, ("visualize", (), None))
+        self._compiled = tuple(compiled)
+        # Analyses made under other rules must not be served from the cache.
+        # The built-in rules keep the empty namespace so existing entries stay valid.
+        canonical = json.dumps(self.rules, sort_keys=True)
+        if canonical == json.dumps(_default_rules(), sort_keys=True):
+            self.fingerprint = ""
+        else:
+            self.fingerprint = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+    @classmethod
+    def default(cls) -> 'CategoryRules':
+        """The built-in rules, made from Config.VIZ_KEYWORDS and Config.DATA_KEYWORDS."""
+        if cls._default is None:
+            cls._default = cls(_default_rules())
+        return cls._default
+
+    @classmethod
+    def from_file(cls, path: str) -> 'CategoryRules':
+        """Loads rules from a JSON rules file."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                document = json.load(f)
+        except (OSError, ValueError) as e:
+            raise RulesError(f"Could not read the rules file '{path}': {e}") from e
+        if not isinstance(document, dict) or not isinstance(document.get("rules"), list):
+            raise RulesError(f"The rules file '{path}' must hold an object with a \"rules\" list.")
+        return cls(document["rules"])
+
+    def match(self, code: str, vega_spec: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Returns the category of the first matching rule, or None."""
+        for category, keywords, pattern in self._compiled:
+            if vega_spec is not None and category == "visualize":
+                return category
+            for keyword in keywords:
+                if keyword in code:
+                    return category
+            if pattern is not None and pattern.search(code):
+                return category
+        return None
+
+    @staticmethod
+    def _validate(rule: Any) -> Dict[str, Any]:
+        if not isinstance(rule, dict):
+            raise RulesError(f"Each rule must be an object, got: {rule!r}")
+        unknown = set(rule) - _RULE_KEYS
+        if unknown:
+            raise RulesError(f"Unknown rule keys: {', '.join(sorted(unknown))}")
+        category = rule.get("category")
+        if category not in config.LOGICAL_CELL_ORDER:
+            raise RulesError(f"Unknown category {category!r}; expected one of: {', '.join(config.LOGICAL_CELL_ORDER)}")
+        keywords, patterns = rule.get("keywords", []), rule.get("patterns", [])
+        for name, values in (("keywords", keywords), ("patterns", patterns)):
+            if not isinstance(values, list) or not all(isinstance(v, str) and v for v in values):
+                raise RulesError(f"The {name} of the {category} rule must be a list of non-empty strings.")
+        if not keywords and not patterns:
+            raise RulesError(f"The {category} rule needs at least one keyword or pattern.")
+        for pattern in patterns:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise RulesError(f"Invalid pattern {pattern!r} in the {category} rule: {e}") from e
+        return {"category": category, "keywords": list(keywords), "patterns": list(patterns)}
@@ -0,0 +1,199 @@
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from .data_models import CodeCell, CellAnalysis
+
+class GraphCycleError(ValueError):
+    """Raised when a topological order is requested for a graph with a cycle."""
+
+class CellGraphView:
+    """
+    Read-only view of a CellGraph, optionally restricted to a subset of its nodes.
+    Views share the graph's arrays and payloads, so filtering copies nothing but
+    a one-byte-per-node mask.
+
+    Nodes are integer indices in notebook order. Edges come out in the same order
+    networkx would give for the equivalent DiGraph: grouped by source node, then
+    in insertion order.
+    """
+
+    def __init__(self, graph: 'CellGraph', mask: Optional[bytearray] = None):
+        self.graph = graph
+        self._mask = mask
+
+    def __len__(self) -> int:
+        return len(self.graph.cells) if self._mask is None else sum(self._mask)
+
+    def __contains__(self, cell_id: str) -> bool:
+        i = self.graph._index.get(cell_id)
+        return i is not None and self._included(i)
+
+    def _included(self, i: int) -> bool:
+        return self._mask is None or bool(self._mask[i])
+
+    def nodes(self) -> List[int]:
+        """Node indices in notebook order."""
+        if self._mask is None:
+            return list(range(len(self.graph.cells)))
+        return [i for i, keep in enumerate(self._mask) if keep]
+
+    def index(self, cell_id: str) -> int:
+        return self.graph._index[cell_id]
+
+    def cell_id(self, i: int) -> str:
+        return self.graph.cells[i].id
+
+    def cell(self, i: int) -> CodeCell:
+        return self.graph.cells[i]
+
+    def analysis(self, i: int) -> CellAnalysis:
+        return self.graph.analyses[i]
+
+    def category(self, i: int) -> str:
+        return self.graph.analyses[i].category
+
+    def edges(self) -> Iterator[Tuple[int, int, Tuple[str, ...]]]:
+        """Yields (source, target, variables) for every edge between included nodes."""
+        graph = self.graph
+        offsets, edge_ids = graph._successor_index()
+        dst, edge_vars, mask = graph._edge_dst, graph._edge_vars, self._mask
+        for u in self.nodes():
+            for k in range(offsets[u], offsets[u + 1]):
+                e = edge_ids[k]
+                if mask is None or mask[dst[e]]:
+                    yield u, dst[e], edge_vars[e]
+
+    def successors(self, i: int) -> List[int]:
+        offsets, edge_ids = self.graph._successor_index()
+        dst = self.graph._edge_dst
+        return [dst[e] for e in edge_ids[offsets[i]:offsets[i + 1]] if self._included(dst[e])]
+
+    def predecessors(self, i: int) -> List[int]:
+        offsets, edge_ids = self.graph._predecessor_index()
+        src = self.graph._edge_src
+        return [src[e] for e in edge_ids[offsets[i]:offsets[i + 1]] if self._included(src[e])]
+
+    def topological_generations(self) -> List[List[int]]:
+        """
+        Groups nodes into layers where every edge points to a later layer, in the
+        same order as networkx.topological_generations.
+        """
+        graph = self.graph
+        offsets, edge_ids = graph._successor_index()
+        dst, mask = graph._edge_dst, self._mask
+        nodes = self.nodes()
+        indegree = array('l', bytes(array('l').itemsize * len(graph.cells)))
+        for u, v in zip(graph._edge_src, dst):
+            if mask is None or (mask[u] and mask[v]):
+                indegree[v] += 1
+
+        generation = [i for i in nodes if indegree[i] == 0]
+        generations, placed = [], 0
+        while generation:
+            generations.append(generation)
+            placed += len(generation)
+            next_generation = []
+            for u in generation:
+                for k in range(offsets[u], offsets[u + 1]):
+                    v = dst[edge_ids[k]]
+                    if mask is None or mask[v]:
+                        indegree[v] -= 1
+                        if indegree[v] == 0:
+                            next_generation.append(v)
+            generation = next_generation
+        if placed != len(nodes):
+            raise GraphCycleError("graph contains a cycle")
+        return generations
+
+    def without_imports(self) -> 'CellGraphView':
+        """A view hiding import cells, which carry no dataflow of their own."""
+        mask = self._mask
+        return self.graph.view(
+            analysis.category != 'imports' and (mask is None or mask[i])
+            for i, analysis in enumerate(self.graph.analyses)
+        )
+
+    def to_networkx(self) -> Any:
+        """Exports the view as a networkx DiGraph with the classic node and edge attributes."""
+        import networkx as nx
+        nx_graph = nx.DiGraph()
+        for i in self.nodes():
+            cell, analysis = self.graph.cells[i], self.graph.analyses[i]
+            nx_graph.add_node(
+                cell.id, source=cell.source, category=analysis.category, vega_spec=analysis.vega_spec,
+                nb_cell=cell.nb_cell, defined_vars=analysis.defined_vars
+            )
+        for u, v, names in self.edges():
+            nx_graph.add_edge(self.cell_id(u), self.cell_id(v), vars=set(names))
+        return nx_graph
+
+class CellGraph(CellGraphView):
+    """
+    Compact dependency graph. Nodes hold their CodeCell and CellAnalysis by
+    reference, edges live in parallel integer arrays and the variables carried
+    by each edge are sorted tuples of names interned in one table, so every
+    name is stored once however many edges carry it. Adjacency indexes are
+    built on first use and dropped when an edge is added.
+    """
+
+    def __init__(self):
+        super().__init__(self)
+        self.cells: List[CodeCell] = []
+        self.analyses: List[CellAnalysis] = []
+        self._index: Dict[str, int] = {}
+        self._var_names: Dict[str, str] = {}
+        self._edge_src = array('l')
+        self._edge_dst = array('l')
+        self._edge_vars: List[Tuple[str, ...]] = []
+        self._successors: Optional[Tuple[array, array]] = None
+        self._predecessors: Optional[Tuple[array, array]] = None
+
+    def add_node(self, cell: CodeCell, analysis: CellAnalysis) -> int:
+        """Adds a cell and returns its index. A repeated cell id replaces the earlier payload."""
+        i = self._index.get(cell.id)
+        if i is not None:
+            self.cells[i], self.analyses[i] = cell, analysis
+            return i
+        i = self._index[cell.id] = len(self.cells)
+        self.cells.append(cell)
+        self.analyses.append(analysis)
+        return i
+
+    def add_edge(self, u: int, v: int, variables: Iterable[str]) -> None:
+        """Adds an edge from node u to node v carrying the given variable names."""
+        names = self._var_names
+        self._edge_src.append(u)
+        self._edge_dst.append(v)
+        self._edge_vars.append(tuple(names.setdefault(name, name) for name in sorted(variables)))
+        self._successors = self._predecessors = None
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._edge_src)
+
+    def view(self, keep: Iterable[bool]) -> CellGraphView:
+        """Returns a view containing the nodes for which keep is true."""
+        return CellGraphView(self, bytearray(keep))
+
+    def _successor_index(self) -> Tuple[array, array]:
+        if self._successors is None:
+            self._successors = self._csr(self._edge_src)
+        return self._successors
+
+    def _predecessor_index(self) -> Tuple[array, array]:
+        if self._predecessors is None:
+            self._predecessors = self._csr(self._edge_dst)
+        return self._predecessors
+
+    def _csr(self, keys: array) -> Tuple[array, array]:
+        """Groups edge ids by key with a stable counting sort, giving offsets and edge ids."""
+        offsets = array('l', bytes(array('l').itemsize * (len(self.cells) + 1)))
+        for key in keys:
+            offsets[key + 1] += 1
+        for i in range(len(self.cells)):
+            offsets[i + 1] += offsets[i]
+        cursor = array('l', offsets)
+        edge_ids = array('l', bytes(array('l').itemsize * len(keys)))
+        for e, key in enumerate(keys):
+            edge_ids[cursor[key]] = e
+            cursor[key] += 1
+        return offsets, edge_ids
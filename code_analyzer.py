@@ -1,28 +1,153 @@
 import ast
-from functools import lru_cache
-from typing import Optional, Dict, Any, Set
-import pandas as pd
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
 from .config import config
 from .data_models import CellAnalysis
+from .analysis_cache import AnalysisCache
+from .memory_cache import MemoryCache
+from .spec_extractor import AltairSpecExtractor, SpecExtractionError
+from .category_rules import CategoryRules
+
+class CellVisitor:
+    """
+    Collects the defined, used, mutated and purely overwritten variables of a
+    cell, its import aliases, any `spec = {...}` Vega-Lite literals and the
+    kinds of its top-level statements in a single traversal. Nodes are visited
+    breadth-first like ast.walk, without recursion, so deeply nested
+    expressions parse and analyze alike.
+    """
+    # Bound per node type on first use rather than looked up for every node.
+    _handlers: Dict[type, Callable[['CellVisitor', ast.AST, Optional[Set[str]]], None]] = {}
 
-class RHSVariableVisitor(ast.NodeVisitor):
-    """Visitor to collect variables used in right-hand side of assignments."""
     def __init__(self):
-        self.used_vars = set()
-    def visit_Name(self, node):
-        if isinstance(node.ctx, ast.Load):
+        self.defined_vars: Set[str] = set()
+        self.used_vars: Set[str] = set()
+        self.mutated_vars: Set[str] = set()
+        self.pure_overwrites: Set[str] = set()
+        self.imported_aliases: Set[str] = set()
+        self.spec_candidates: List[ast.expr] = []
+        self.imports_only = True
+        self.has_statements = False
+        self._assignments: List[Tuple[Set[str], Set[str]]] = []
+        self._queue: Deque[Tuple[ast.AST, Optional[Set[str]]]] = deque()
+
+    def visit(self, tree: ast.AST) -> None:
+        """Walks the tree; each queued node carries the set collecting names read by its enclosing assignment value, if any."""
+        queue = self._queue
+        queue.append((tree, None))
+        handlers = self._handlers
+        while queue:
+            node, rhs_vars = queue.popleft()
+            handler = handlers.get(node.__class__)
+            if handler is None:
+                handler = getattr(CellVisitor, 'visit_' + node.__class__.__name__, CellVisitor.generic_visit)
+                handlers[node.__class__] = handler
+            handler(self, node, rhs_vars)
+        for lhs_vars, rhs_vars in self._assignments:
+            self.pure_overwrites.update(lhs_vars - rhs_vars)
+
+    def generic_visit(self, node: ast.AST, rhs_vars: Optional[Set[str]]) -> None:
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ast.AST):
+                        self._queue.append((item, rhs_vars))
+            elif isinstance(value, ast.AST):
+                self._queue.append((value, rhs_vars))
+
+    def visit_Module(self, node, rhs_vars):
+        for statement in node.body:
+            if not isinstance(statement, (ast.Import, ast.ImportFrom)):
+                self.imports_only = False
+                if isinstance(statement, (ast.Assign, ast.Expr)):
+                    self.has_statements = True
+            self._queue.append((statement, rhs_vars))
+
+    def visit_expr_context(self, node, rhs_vars):
+        pass
+
+    visit_Load = visit_Store = visit_Del = visit_expr_context
+
+    def visit_Name(self, node, rhs_vars):
+        if isinstance(node.ctx, ast.Store):
+            self.defined_vars.add(node.id)
+        elif isinstance(node.ctx, ast.Load):
             self.used_vars.add(node.id)
+            if rhs_vars is not None:
+                rhs_vars.add(node.id)
+
+    def visit_FunctionDef(self, node, rhs_vars):
+        self.defined_vars.add(node.name)
+        self.generic_visit(node, rhs_vars)
+
+    visit_ClassDef = visit_FunctionDef
+
+    def visit_Import(self, node, rhs_vars):
+        for alias in node.names:
+            self.imported_aliases.add(alias.asname or alias.name)
+
+    visit_ImportFrom = visit_Import
+
+    def visit_Call(self, node, rhs_vars):
+        if any(kw.arg == 'inplace' and getattr(kw.value, 'value', False) for kw in node.keywords):
+            if isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name):
+                self.mutated_vars.add(node.func.value.id)
+        self.generic_visit(node, rhs_vars)
+
+    def visit_Assign(self, node, rhs_vars):
+        lhs_vars = set()
+        for target in node.targets:
+            if isinstance(target, ast.Subscript) and isinstance(target.value, ast.Name):
+                self.mutated_vars.add(target.value.id)
+            elif isinstance(target, ast.Name):
+                lhs_vars.add(target.id)
+            self._queue.append((target, rhs_vars))
+        if 'spec' in lhs_vars:
+            self.spec_candidates.append(node.value)
+
+        value_vars: Set[str] = set()
+        self._assignments.append((lhs_vars, value_vars))
+        self._queue.append((node.value, value_vars))
+
+    def vega_spec(self) -> Optional[Dict[str, Any]]:
+        """Returns the first `spec` literal, in traversal order, that is a Vega-Lite spec."""
+        for value in self.spec_candidates:
+            try:
+                spec_dict = ast.literal_eval(value)
+            except (ValueError, SyntaxError):
+                continue
+            if isinstance(spec_dict, dict) and "$schema" in spec_dict:
+                return spec_dict
+        return None
 
 class CodeAnalyzer:
     """
     Analyzes code cells for dependencies and categorization. The AST traversal
-    is now consolidated into a single pass for efficiency.
+    is now consolidated into a single pass for efficiency. Finished analyses are
+    kept in a bounded in-memory LRU cache, backed by the persistent cache when
+    one is configured; hits and misses count lookups served by either layer.
     """
     
-    def __init__(self):
-        self._ast_cache = {}
+    def __init__(self, cache: Optional[AnalysisCache] = None,
+                 spec_extractor: Optional[AltairSpecExtractor] = None,
+                 rules: Optional[CategoryRules] = None,
+                 memory_cache: Optional[MemoryCache] = None):
+        self.cache = cache
+        self.memory_cache = memory_cache if memory_cache is not None else MemoryCache()
+        self.spec_extractor = spec_extractor or AltairSpecExtractor()
+        self.rules = rules or CategoryRules.default()
     
-    @lru_cache(maxsize=128)
+    @property
+    def hits(self) -> int:
+        """Lookups answered by either cache."""
+        return self.memory_cache.hits + (self.cache.hits if self.cache is not None else 0)
+
+    @property
+    def misses(self) -> int:
+        """Lookups answered by neither cache; only memory misses reach the persistent one."""
+        return self.cache.misses if self.cache is not None else self.memory_cache.misses
+
     def clean_code_for_ast(self, source: str) -> str:
         """Removes IPython magic commands and shell commands from code."""
         cleaned = config.MAGIC_PATTERN.sub('', source)
@@ -31,115 +156,104 @@ class CodeAnalyzer:
     
     def _execute_for_altair_spec(self, code_string: str) -> Optional[Dict[str, Any]]:
         """
-        Dynamically executes cell code in a sandboxed environment to extract the
-        spec from a generated Altair chart object.
+        Extracts the spec from a generated Altair chart object. The cell code is
+        executed in an isolated, time- and memory-limited worker process.
         """
         if 'alt.Chart' not in code_string:
             return None
+        return self.spec_extractor.extract(self.clean_code_for_ast(code_string))
 
-        try:
-            import altair as alt
-            from vega_datasets import data
-
-            placeholder_df = pd.DataFrame()
-
-            exec_namespace = {
-                'alt': alt,
-                'pd': pd,
-                'data': data,
-                'df': placeholder_df
-            }
-            
-            tree = ast.parse(self.clean_code_for_ast(code_string))
-            if not tree.body or not isinstance(tree.body[-1], ast.Expr):
-                return None
-
-            main_code_block = ast.Module(body=tree.body[:-1], type_ignores=[])
-            last_expression = ast.Expression(body=tree.body[-1].value)
-            
-            exec(compile(main_code_block, filename='<ast>', mode='exec'), exec_namespace)
-            chart_object = eval(compile(last_expression, filename='<ast>', mode='eval'), exec_namespace)
-
-            if hasattr(chart_object, 'to_dict'):
-                return chart_object.to_dict()
-        except Exception:
-            return None
-        return None
+    def prefetch_altair_specs(self, sources: List[str]) -> None:
+        """
+        Extracts the Altair specs of all chart cells concurrently so that the
+        subsequent per-cell analysis finds them in the extractor's cache.
+        """
+        pending = {
+            self.clean_code_for_ast(source) for source in sources
+            if 'alt.Chart' in source and not self.is_cached(source)
+        }
+        if pending:
+            self.spec_extractor.extract_many(sorted(pending))
 
     def analyze_dependencies(self, code_string: str) -> CellAnalysis:
         """
         Analyzes code in a single pass to find variables, dependencies,
-        and categorization, including mutations and Vega-Lite specs.
+        and categorization, including mutations and Vega-Lite specs. Results are
+        served from the caches when possible.
         """
-        cache_key = hash(code_string)
-        if cache_key not in self._ast_cache:
-            try:
-                self._ast_cache[cache_key] = ast.parse(self.clean_code_for_ast(code_string))
-            except SyntaxError as e:
-                print(f"Warning: Could not parse a cell. Error: {e}")
-                return CellAnalysis(set(), set(), set(), "other")
-
-        tree = self._ast_cache[cache_key]
-        defined_vars, used_vars = set(), set()
-        mutated_vars, pure_overwrites = set(), set()
-        imported_aliases = set()
-        vega_spec = None
-
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Name):
-                if isinstance(node.ctx, ast.Store):
-                    defined_vars.add(node.id)
-                elif isinstance(node.ctx, ast.Load):
-                    used_vars.add(node.id)
-            elif isinstance(node, (ast.FunctionDef, ast.ClassDef)):
-                defined_vars.add(node.name)
-            elif isinstance(node, (ast.Import, ast.ImportFrom)):
-                for alias in node.names:
-                    imported_aliases.add(alias.asname or alias.name)
-            elif isinstance(node, ast.Call):
-                if any(kw.arg == 'inplace' and getattr(kw.value, 'value', False) for kw in node.keywords):
-                    if isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name):
-                        mutated_vars.add(node.func.value.id)
-            elif isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Subscript) and isinstance(target.value, ast.Name):
-                        mutated_vars.add(target.value.id)
-                
-                lhs_vars = {t.id for t in node.targets if isinstance(t, ast.Name)}
-                rhs_visitor = RHSVariableVisitor()
-                rhs_visitor.visit(node.value)
-                pure_overwrites.update(lhs_vars - rhs_visitor.used_vars)
-
-                if not vega_spec and any(isinstance(t, ast.Name) and t.id == 'spec' for t in node.targets):
-                    try:
-                        spec_dict = ast.literal_eval(node.value)
-                        if isinstance(spec_dict, dict) and "$schema" in spec_dict:
-                            vega_spec = spec_dict
-                    except (ValueError, SyntaxError):
-                        pass
+        cached = self.cached_analysis(code_string)
+        if cached is not None:
+            return cached
+
+        analysis = self.analyze_source(code_string)
+        if analysis is None:
+            return CellAnalysis(set(), set(), set(), "other")
+        self.store_analysis(code_string, analysis)
+        return analysis
+
+    def cached_analysis(self, code_string: str) -> Optional[CellAnalysis]:
+        """Looks code up in the memory cache, then the persistent one, or returns None."""
+        analysis = self.memory_cache.get(code_string)
+        if analysis is None and self.cache is not None:
+            analysis = self.cache.get(code_string)
+            if analysis is not None:
+                self.memory_cache.put(code_string, analysis)
+        return analysis
+
+    def store_analysis(self, code_string: str, analysis: CellAnalysis) -> None:
+        """
+        Adds an analysis to the memory cache and, if configured, the persistent one.
+        Analyses whose spec extraction failed stay out of the persistent cache.
+        """
+        self.memory_cache.put(code_string, analysis)
+        if self.cache is not None and not analysis.spec_failed:
+            self.cache.put(code_string, analysis)
+
+    def is_cached(self, code_string: str) -> bool:
+        """Checks both caches without touching any counters or the LRU order."""
+        return code_string in self.memory_cache or (self.cache is not None and self.cache.contains(code_string))
+
+    def analyze_source(self, code_string: str) -> Optional[CellAnalysis]:
+        """
+        Analyzes code without consulting or filling the persistent cache. Returns
+        None when the cell cannot be parsed, so that failures are never cached.
+        """
+        try:
+            tree = ast.parse(self.clean_code_for_ast(code_string))
+        except SyntaxError as e:
+            print(f"Warning: Could not parse a cell. Error: {e}")
+            return None
+
+        visitor = CellVisitor()
+        visitor.visit(tree)
+        vega_spec = visitor.vega_spec()
+        spec_failed = False
 
         if vega_spec is None:
-            vega_spec = self._execute_for_altair_spec(code_string)
+            try:
+                vega_spec = self._execute_for_altair_spec(code_string)
+            except SpecExtractionError:
+                spec_failed = True
 
-        category = self._categorize_cell(tree, code_string, vega_spec)
-        used_vars.update(mutated_vars)
+        category = self._categorize_cell(visitor, code_string, vega_spec)
+        used_vars = visitor.used_vars | visitor.mutated_vars
 
         return CellAnalysis(
-            defined_vars=defined_vars,
-            used_vars=used_vars - imported_aliases,
-            pure_overwrites=pure_overwrites,
+            defined_vars=visitor.defined_vars,
+            used_vars=used_vars - visitor.imported_aliases,
+            pure_overwrites=visitor.pure_overwrites,
             category=category,
-            vega_spec=vega_spec
+            vega_spec=vega_spec,
+            spec_failed=spec_failed
         )
     
-    def _categorize_cell(self, tree: ast.AST, code_string: str, vega_spec: Optional[Dict]) -> str:
-        """Categorizes a cell based on its content."""
-        if all(isinstance(n, (ast.Import, ast.ImportFrom)) for n in tree.body):
+    def _categorize_cell(self, visitor: CellVisitor, code_string: str, vega_spec: Optional[Dict]) -> str:
+        """Categorizes a cell from its top-level statements and the keyword rules."""
+        if visitor.imports_only:
             return "imports"
-        if any(kw in code_string for kw in config.VIZ_KEYWORDS) or vega_spec is not None:
-            return "visualize"
-        if any(kw in code_string for kw in config.DATA_KEYWORDS):
-            return "load_data"
-        if any(isinstance(n, (ast.Assign, ast.Call, ast.Expr)) for n in tree.body):
+        category = self.rules.match(code_string, vega_spec)
+        if category is not None:
+            return category
+        if visitor.has_statements:
             return "transform"
         return "other"
@@ -1,4 +1,5 @@
 import re
+import uuid
 from dataclasses import dataclass
 
 @dataclass(frozen=True)
@@ -20,7 +21,62 @@ class Config:
     VIZ_KEYWORDS = frozenset(['.plot', 'plt.show', 'sns.', 'px.', 'go.Figure', 'alt.Chart', '"$schema"'])
     DATA_KEYWORDS = frozenset(['read_csv', 'read_excel', 'read_sql'])
     LAYOUT_SPACING = {'x': 800, 'y': 500}
+    # Curio node layout: "generations" stacks each topological generation in one
+    # column; "sugiyama" bounds column height and reduces edge crossings.
+    LAYOUT_ALGORITHM = "generations"
+    LAYOUT_SWEEPS = 4
+    LAYOUT_MAX_COLUMN_NODES = 20
+    # Graph coarsening (--coarsen): runs of at least COARSEN_MIN_CHAIN linked
+    # cells of one of these categories are fused into a single Curio node.
+    COARSEN_MIN_CHAIN = 2
+    COARSEN_CATEGORIES = frozenset(["transform"])
     LOGICAL_CELL_ORDER = ["imports", "load_data", "transform", "visualize", "other"]
+    CURIO_UUID_NAMESPACE = uuid.UUID("5f0c3b9e-2a4d-4c1e-9b7a-6d8e1f2a3c4b")
+    WATCH_INTERVAL = 0.5
+
+    # Persistent analysis cache. Bump ANALYZER_VERSION whenever CodeAnalyzer output changes.
+    ANALYZER_VERSION = "1"
+    CACHE_FILENAME = "analysis_cache.sqlite3"
+    CACHE_MAX_BYTES = 256 * 1024 * 1024
+    CACHE_EVICTION_INTERVAL = 256
+
+    # In-process LRU cache of analyses in front of the persistent one, bounded by
+    # entries and by an estimate of the memory they hold.
+    MEMORY_CACHE_MAX_ENTRIES = 16_384
+    MEMORY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+    # Isolated Altair spec extraction workers
+    SPEC_WORKERS = 2
+    SPEC_TIMEOUT = 10.0
+    SPEC_MEMORY_LIMIT_MB = 1024
+    SPEC_WORKER_START_TIMEOUT = 60.0
+    SPEC_CACHE_SIZE = 1024
+
+    # Parallel cell analysis within one notebook. Analysis runs at roughly
+    # 0.3 MB of source per second per core, so below this much uncached source
+    # the pool's start-up cost outweighs the gain and cells are analyzed serially.
+    PARALLEL_MIN_SOURCE_CHARS = 100_000
+    PARALLEL_MIN_CHUNK_CHARS = 16_000
+
+    # Curio JSON output
+    GZIP_LEVEL = 6
+    # Inline Vega-Lite datasets (--datasets): how those of at least
+    # DATASET_MIN_BYTES, as compact JSON, are written (see spec_datasets).
+    DATASET_MODE = "inline"
+    DATASET_MIN_BYTES = 4096
+
+    # Conversion server
+    SERVER_HOST = "127.0.0.1"
+    SERVER_PORT = 8765
+    SERVER_MAX_CONCURRENT = 8
+    SERVER_MAX_BODY_BYTES = 512 * 1024 * 1024
+    SERVER_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    # Headless SVG/HTML rendering (--render)
+    RENDER_NODE_SIZE = (170, 36)
+    RENDER_SPACING = {'x': 240, 'y': 56}
+    RENDER_MARGIN = 20
+    RENDER_LABEL_CHARS = 24
 
     # Compiled regex patterns for better performance
     MAGIC_PATTERN = re.compile(r'^\s*%.*$', re.MULTILINE)
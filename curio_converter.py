@@ -1,24 +1,115 @@
 import json
 import uuid
-from typing import Dict, Any, Optional, Tuple
-import networkx as nx
+from typing import Dict, Any, Iterator, Optional, Tuple
 from .config import config
 from .graph_builder import DependencyGraphBuilder
+from .cell_graph import CellGraph, CellGraphView
+from .graph_layout import make_layout
+from .data_models import CellChain
+from .spec_datasets import DATASET_MODES, DatasetStore
+
+class CurioDataflow:
+    """
+    A Curio dataflow whose nodes and edges are produced lazily, so a writer can
+    stream them to disk without holding the whole document. Layout, node ids and
+    input variables are computed up front; node contents are rendered on demand.
+    When a subgraph view is given, only its nodes and the edges between them are
+    emitted; their contents and ids are the same as in the full conversion.
+    Large inline datasets of the nodes' specs are collected in datasets while
+    the nodes are rendered, so they are complete once nodes() is exhausted.
+    """
+    name = "GeneratedWorkflow"
+    
+    def __init__(self, converter: 'CurioConverter', graph: CellGraph, subgraph: Optional[CellGraphView] = None):
+        self.converter = converter
+        self.graph = graph
+        self.graph_no_imports = DependencyGraphBuilder.create_graph_without_imports(graph if subgraph is None else subgraph)
+        self.node_positions = converter._calculate_node_positions(self.graph_no_imports)
+        
+        # Build a map of target nodes to their primary input variable name from edge data.
+        # Variables are picked with min() so the choice does not depend on set order,
+        # which differs between hash seeds and between analyses made in other processes.
+        self.node_input_vars = {
+            v: min(names)
+            for u, v, names in graph.edges() if names
+        }
+        self.node_uuids = {i: converter.node_uuid(graph.cell_id(i)) for i in self.graph_no_imports.nodes()}
+        self.datasets = DatasetStore(converter.datasets, converter.dataset_min_bytes)
+    
+    def nodes(self) -> Iterator[Dict[str, Any]]:
+        graph = self.graph
+        for i, node_uuid in self.node_uuids.items():
+            cell, analysis = graph.cell(i), graph.analysis(i)
+            input_var = self.node_input_vars.get(i, 'arg')
+            defined_vars = analysis.defined_vars
+            if isinstance(cell, CellChain):
+                output_var = cell.output_var
+            else:
+                output_var = min(defined_vars) if defined_vars else input_var
+            
+            node_content = self.converter.transform_node_content(
+                cell.source,
+                analysis.category,
+                analysis.vega_spec,
+                input_var=input_var,
+                output_var=output_var,
+                datasets=self.datasets
+            )
+            
+            yield {
+                "id": node_uuid,
+                "type": config.CATEGORY_TO_CURIO_TYPE.get(analysis.category, "DATA_CLEANING"),
+                "x": self.node_positions.get(i, (0, 0))[0],
+                "y": self.node_positions.get(i, (0, 0))[1],
+                "content": node_content,
+                "out": "DEFAULT", "in": "DEFAULT", "goal": "", "metadata": {"keywords": []}
+            }
+    
+    def edges(self) -> Iterator[Dict[str, Any]]:
+        node_uuids = self.node_uuids
+        for u, v, _ in self.graph_no_imports.edges():
+            yield {"id": f"reactflow__edge-{node_uuids[u]}out-{node_uuids[v]}in", "source": node_uuids[u], "target": node_uuids[v]}
+    
+    def to_dict(self) -> Dict[str, Any]:
+        document = {"dataflow": {"nodes": list(self.nodes()), "edges": list(self.edges()), "name": self.name}}
+        if self.datasets.datasets:
+            document["datasets"] = self.datasets.datasets
+        return document
 
 class CurioConverter:
-    """Converts dependency graphs to Curio JSON format."""
+    """
+    Converts dependency graphs to Curio JSON format. In compact mode the Vega-Lite
+    specs embedded in node contents are serialized without indentation. Nodes
+    are placed by the named layout engine (see graph_layout.LAYOUTS), and large
+    inline datasets are handled according to the dataset mode (see
+    spec_datasets.DATASET_MODES).
+    """
+    
+    def __init__(self, compact: bool = False, layout: Optional[str] = None,
+                 datasets: Optional[str] = None, dataset_min_bytes: int = config.DATASET_MIN_BYTES):
+        self.compact = compact
+        self.layout = make_layout(layout)
+        self.datasets = datasets or config.DATASET_MODE
+        if self.datasets not in DATASET_MODES:
+            raise ValueError(f"unknown dataset mode: {self.datasets}; expected one of: {', '.join(DATASET_MODES)}")
+        self.dataset_min_bytes = dataset_min_bytes
     
     def transform_node_content(
         self, source: str, category: str, vega_spec: Optional[Dict], 
-        input_var: str, output_var: str
+        input_var: str, output_var: str, datasets: Optional[DatasetStore] = None
     ) -> str:
         """
         UPDATED: Transforms cell source code using specific input/output variable names
         to preserve original code logic.
         """
         if category == "visualize" and vega_spec:
-            # Use the actual input variable name for the data source.
-            vega_spec["data"] = {"name": input_var}
+            # Use the actual input variable name for the data source. The spec is
+            # copied so the analysis (which may be cached) is left untouched.
+            vega_spec = {**vega_spec, "data": {"name": input_var}}
+            if datasets is not None:
+                vega_spec = datasets.rewrite(vega_spec)
+            if self.compact:
+                return json.dumps(vega_spec, separators=(',', ':'))
             return json.dumps(vega_spec, indent=2)
         
         if category == "load_data":
@@ -32,65 +123,27 @@ class CurioConverter:
             
         return source
     
-    def dag_to_curio_json(self, graph: nx.DiGraph) -> Dict[str, Any]:
+    @staticmethod
+    def node_uuid(node_id: str) -> str:
+        """Derives a stable Curio node id from a cell id, so unchanged cells keep their id."""
+        return str(uuid.uuid5(config.CURIO_UUID_NAMESPACE, str(node_id)))
+    
+    def dag_to_curio_json(self, graph: CellGraph, subgraph: Optional[CellGraphView] = None) -> Dict[str, Any]:
         """
-        UPDATED: Converts NetworkX DAG to Curio-compatible JSON, now aware of the
-        variable names flowing between nodes.
+        UPDATED: Converts the dependency DAG to Curio-compatible JSON, now aware of the
+        variable names flowing between nodes. Pass a view of graph, such as a
+        DependencyQuery slice, as subgraph to emit only those nodes.
         """
-        graph_no_imports = DependencyGraphBuilder.create_graph_without_imports(graph)
-        node_positions = self._calculate_node_positions(graph_no_imports)
-        
-        # Build a map of target nodes to their primary input variable name from edge data.
-        node_input_vars = {
-            v: list(d['vars'])[0] 
-            for u, v, d in graph.edges(data=True) if d.get('vars')
-        }
-        
-        nx_id_to_uuid = {node_id: str(uuid.uuid4()) for node_id in graph_no_imports.nodes()}
-        
-        curio_nodes = []
-        for node_id, data in graph_no_imports.nodes(data=True):
-            input_var = node_input_vars.get(node_id, 'arg')
-            defined_vars = data.get('defined_vars', set())
-            output_var = list(defined_vars)[0] if defined_vars else input_var
-            
-            node_content = self.transform_node_content(
-                data['source'],
-                data['category'],
-                data.get('vega_spec'),
-                input_var=input_var,
-                output_var=output_var
-            )
-
-            curio_nodes.append({
-                "id": nx_id_to_uuid[node_id],
-                "type": config.CATEGORY_TO_CURIO_TYPE.get(data['category'], "DATA_CLEANING"),
-                "x": node_positions.get(node_id, (0, 0))[0],
-                "y": node_positions.get(node_id, (0, 0))[1],
-                "content": node_content,
-                "out": "DEFAULT", "in": "DEFAULT", "goal": "", "metadata": {"keywords": []}
-            })
-        
-        curio_edges = [
-            {"id": f"reactflow__edge-{nx_id_to_uuid[u]}out-{nx_id_to_uuid[v]}in", "source": nx_id_to_uuid[u], "target": nx_id_to_uuid[v]}
-            for u, v in graph_no_imports.edges()
-        ]
-        
-        return {"dataflow": {"nodes": curio_nodes, "edges": curio_edges, "name": "GeneratedWorkflow"}}
+        return self.dataflow(graph, subgraph).to_dict()
+    
+    def dataflow(self, graph: CellGraph, subgraph: Optional[CellGraphView] = None) -> CurioDataflow:
+        """Prepares the Curio dataflow for graph, or a view of it, for streaming with a CurioWriter."""
+        return CurioDataflow(self, graph, subgraph)
     
-    def _calculate_node_positions(self, graph: nx.DiGraph) -> Dict[str, Tuple[float, float]]:
-        """Calculates optimal positions for nodes in the graph."""
-        if not graph.nodes:
-            return {}
-        try:
-            layers = list(nx.topological_generations(graph))
-            node_positions = {}
-            x, y = config.LAYOUT_SPACING['x'], config.LAYOUT_SPACING['y']
-            for i, layer in enumerate(layers):
-                start_y = -((len(layer) - 1) * y) / 2
-                for j, node_id in enumerate(layer):
-                    node_positions[node_id] = (i * x, start_y + j * y)
-            return node_positions
-        except nx.NetworkXUnfeasible:
-            print("Warning: Cycle detected. Using simpler linear layout.")
-            return {node_id: (i * config.LAYOUT_SPACING['x'], 0) for i, node_id in enumerate(graph.nodes())}
+    def _calculate_node_positions(self, graph: CellGraphView) -> Dict[int, Tuple[float, float]]:
+        """Calculates optimal positions for nodes in the graph, keyed by node index."""
+        x, y = config.LAYOUT_SPACING['x'], config.LAYOUT_SPACING['y']
+        if self.layout.name == "generations":
+            return {node: (column * x, row * y) for node, (column, row) in self.layout.place(graph).items()}
+        # Rows found by the fit are fractional; whole pixels keep the output tidy.
+        return {node: (column * x, round(row * y)) for node, (column, row) in self.layout.place(graph).items()}
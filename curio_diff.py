@@ -0,0 +1,176 @@
+import gzip
+import itertools
+import json
+import os
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from .curio_converter import CurioDataflow
+from .curio_writer import datasets_path
+from .spec_datasets import DatasetStore
+from .data_models import DataflowPatch
+from .config import config
+
+try:
+    import orjson
+except ImportError:  # Optional; the standard library decoder is used instead.
+    orjson = None
+
+def load_dataflow(path: str) -> Dict[str, Any]:
+    """Reads a Curio JSON document, gzip-compressed when path ends with .gz."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        data = f.read()
+    document = orjson.loads(data) if orjson is not None else json.loads(data)
+    if not isinstance(document, dict) or not isinstance(document.get("dataflow"), dict):
+        raise ValueError(f"'{path}' is not a Curio dataflow.")
+    return document
+
+def apply_patch(document: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Applies a patch document from DataflowPatch.to_dict to a Curio JSON document.
+    Dataset changes are applied to its "datasets" section, which for output
+    written with --datasets file is the content of the side file.
+    """
+    dataflow = document["dataflow"]
+    removed = set(patch["nodes"]["removed"])
+    changed = {node["id"]: node for node in patch["nodes"]["changed"]}
+    removed_edges = set(patch["edges"]["removed"])
+    patched = {"dataflow": {
+        "nodes": [changed.get(node["id"], node) for node in dataflow["nodes"] if node["id"] not in removed]
+                 + patch["nodes"]["added"],
+        "edges": [edge for edge in dataflow["edges"] if edge["id"] not in removed_edges] + patch["edges"]["added"],
+        "name": dataflow.get("name", CurioDataflow.name),
+    }}
+    dataset_changes = patch.get("datasets", {})
+    removed_datasets = set(dataset_changes.get("removed", []))
+    datasets = {name: values for name, values in document.get("datasets", {}).items()
+                if name not in removed_datasets}
+    datasets.update(dataset_changes.get("added", {}))
+    if datasets:
+        patched["datasets"] = datasets
+    return patched
+
+def _content_key(node: Dict[str, Any]) -> Tuple[Any, Any]:
+    return node.get("type"), node.get("content")
+
+def _unused_id(node_id: str, taken: Set[str]) -> str:
+    """Derives a fresh, deterministic node id from node_id that is not in taken."""
+    for k in itertools.count(1):
+        candidate = str(uuid.uuid5(config.CURIO_UUID_NAMESPACE, f"{node_id}/{k}"))
+        if candidate not in taken:
+            return candidate
+
+class MergedDataflow:
+    """A dataflow held in memory, with the interface a CurioWriter streams from."""
+
+    def __init__(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]], name: str,
+                 datasets: Optional[DatasetStore] = None):
+        self._nodes = nodes
+        self._edges = edges
+        self.name = name
+        self.datasets = datasets or DatasetStore()
+
+    def nodes(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._nodes)
+
+    def edges(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._edges)
+
+    def to_dict(self) -> Dict[str, Any]:
+        document = {"dataflow": {"nodes": self._nodes, "edges": self._edges, "name": self.name}}
+        if self.datasets.datasets:
+            document["datasets"] = self.datasets.datasets
+        return document
+
+class CurioUpdater:
+    """
+    Reconciles a regenerated dataflow with the Curio JSON written for an earlier
+    version of the notebook, so that an unchanged cell keeps its node id and
+    position. Nodes are matched by id, which is derived from the cell id, and by
+    type and content; content matching also recognises cells whose positional
+    ids shifted, and files written before ids were stable.
+
+    The merged dataflow lists surviving nodes and edges in their previous
+    order and appends new ones, so rewriting a file changes only the lines of
+    what actually changed.
+    """
+
+    def __init__(self, previous: Dict[str, Any]):
+        dataflow = previous.get("dataflow", {})
+        self.name = dataflow.get("name", CurioDataflow.name)
+        self.nodes: List[Dict[str, Any]] = dataflow.get("nodes", [])
+        self.edges: List[Dict[str, Any]] = dataflow.get("edges", [])
+        self.datasets: Dict[str, Any] = previous.get("datasets", {})
+
+    @classmethod
+    def from_file(cls, path: str) -> 'CurioUpdater':
+        """Loads a previous dataflow, with the datasets of its side file if it has one."""
+        previous = load_dataflow(path)
+        side_path = datasets_path(path)
+        if "datasets" not in previous and os.path.exists(side_path):
+            opener = gzip.open if side_path.endswith('.gz') else open
+            with opener(side_path, 'rb') as f:
+                previous["datasets"] = json.loads(f.read())
+        return cls(previous)
+
+    def update(self, dataflow: CurioDataflow) -> Tuple[MergedDataflow, DataflowPatch]:
+        """Returns the merged dataflow and the patch that turns the previous one into it."""
+        previous = {node["id"]: node for node in self.nodes}
+        indices = list(dataflow.node_uuids)
+        fresh = list(dataflow.nodes())
+
+        # Unchanged nodes are matched on id and content, then nodes with the same
+        # content under another id (moved or re-identified cells), and only then
+        # changed nodes on id alone, so a shifted positional id cannot hide a move.
+        reused: Dict[int, str] = {}
+        for i, node in zip(indices, fresh):
+            old = previous.get(node["id"])
+            if old is not None and _content_key(old) == _content_key(node):
+                reused[i] = node["id"]
+        claimed = set(reused.values())
+        by_content: Dict[Tuple[Any, Any], List[str]] = {}
+        for node in self.nodes:
+            if node["id"] not in claimed:
+                by_content.setdefault(_content_key(node), []).append(node["id"])
+        for i, node in zip(indices, fresh):
+            candidates = by_content.get(_content_key(node)) if i not in reused else None
+            if candidates:
+                reused[i] = candidates.pop(0)
+                claimed.add(reused[i])
+        for i, node in zip(indices, fresh):
+            if i not in reused and node["id"] in previous and node["id"] not in claimed:
+                reused[i] = node["id"]
+                claimed.add(node["id"])
+
+        patch = DataflowPatch()
+        merged: Dict[str, Dict[str, Any]] = {}
+        for i, node in zip(indices, fresh):
+            node_id = reused.get(i)
+            if node_id is None:
+                if node["id"] in claimed:
+                    # The id now belongs to the node that was matched by content.
+                    node = {**node, "id": _unused_id(node["id"], claimed)}
+                    dataflow.node_uuids[i] = node["id"]
+                claimed.add(node["id"])
+                patch.added_nodes.append(node)
+                continue
+            old = previous[node_id]
+            node = {**node, "id": node_id, "x": old.get("x", node["x"]), "y": old.get("y", node["y"])}
+            if node != old:
+                patch.changed_nodes.append(node)
+            merged[node_id] = node
+            # Edges are generated from the node ids, so they pick up the reused ones.
+            dataflow.node_uuids[i] = node_id
+        patch.removed_nodes = [node["id"] for node in self.nodes if node["id"] not in merged]
+
+        old_edges = {(edge["source"], edge["target"]): edge for edge in self.edges}
+        new_edges = {(edge["source"], edge["target"]): edge for edge in dataflow.edges()}
+        patch.added_edges = [edge for key, edge in new_edges.items() if key not in old_edges]
+        patch.removed_edges = [edge["id"] for key, edge in old_edges.items() if key not in new_edges]
+        new_datasets = dataflow.datasets.datasets
+        patch.added_datasets = {name: values for name, values in new_datasets.items() if name not in self.datasets}
+        patch.removed_datasets = [name for name in self.datasets if name not in new_datasets]
+
+        nodes = [merged[node["id"]] for node in self.nodes if node["id"] in merged] + patch.added_nodes
+        edges = [new_edges[key] for key in old_edges if key in new_edges] + patch.added_edges
+        return MergedDataflow(nodes, edges, self.name, dataflow.datasets), patch
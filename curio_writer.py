@@ -0,0 +1,120 @@
+import gzip
+import json
+from typing import Any, BinaryIO, Dict, Iterable, Optional
+from .curio_converter import CurioDataflow
+from .config import config
+
+try:
+    import orjson
+except ImportError:  # Optional; the standard library encoder is used instead.
+    orjson = None
+
+_NODE_INDENT = b"\n      "
+_DATASET_INDENT = b"\n    "
+
+def datasets_path(path: str) -> str:
+    """The side file that holds the datasets of the Curio JSON at path: out.json -> out.datasets.json."""
+    base, suffix = (path[:-3], '.gz') if path.endswith('.gz') else (path, '')
+    if base.endswith('.json'):
+        base = base[:-5]
+    return f"{base}.datasets.json{suffix}"
+
+class CurioWriter:
+    """
+    Streams a CurioDataflow to a file one node and edge at a time, so the full
+    document is never built in memory. The default output is byte-for-byte what
+    json.dump(..., indent=2) gives for the same dataflow; compact output drops all
+    insignificant whitespace. orjson is used when installed (backend="auto"),
+    which writes non-ASCII characters as UTF-8 rather than \\u escapes. Output is
+    gzip-compressed when compress is set.
+
+    Datasets moved out of the specs (see spec_datasets) follow the nodes as a
+    top-level "datasets" object, or in "file" mode go to a side file written
+    with the same settings.
+    """
+
+    def __init__(self, compact: bool = False, backend: str = "auto", compress: bool = False):
+        if backend not in ("auto", "json", "orjson"):
+            raise ValueError(f"unknown JSON backend: {backend}")
+        if backend == "orjson" and orjson is None:
+            raise ValueError("the orjson backend is not installed")
+        if backend == "auto":
+            backend = "json" if orjson is None else "orjson"
+        self.compact = compact
+        self.compress = compress
+        self.backend = backend
+
+    def write(self, path: str, dataflow: CurioDataflow, side_path: Optional[str] = None) -> None:
+        """
+        Writes the dataflow to path. In "file" dataset mode its datasets go to
+        side_path, by default datasets_path(path).
+        """
+        side_file = dataflow.datasets.mode == "file"
+        with self._open(path) as f:
+            self.write_to(f, dataflow, shared=not side_file)
+        if side_file and dataflow.datasets.datasets:
+            with self._open(side_path or datasets_path(path)) as f:
+                f.write(self._dumps(dataflow.datasets.datasets))
+
+    def _open(self, path: str) -> BinaryIO:
+        if self.compress:
+            return gzip.open(path, 'wb', compresslevel=config.GZIP_LEVEL)
+        return open(path, 'wb')
+
+    def write_to(self, f: BinaryIO, dataflow: CurioDataflow, shared: bool = True) -> None:
+        """
+        Writes the dataflow to a binary file object, followed by its datasets
+        unless shared is False.
+        """
+        if self.compact:
+            f.write(b'{"dataflow":{"nodes":[')
+            self._write_items(f, dataflow.nodes(), b",", b"")
+            f.write(b'],"edges":[')
+            self._write_items(f, dataflow.edges(), b",", b"")
+            f.write(b'],"name":' + self._dumps(dataflow.name) + b'}')
+        else:
+            f.write(b'{\n  "dataflow": {\n    "nodes": [')
+            self._write_items(f, dataflow.nodes(), b",", b"\n    ")
+            f.write(b'],\n    "edges": [')
+            self._write_items(f, dataflow.edges(), b",", b"\n    ")
+            f.write(b'],\n    "name": ' + self._dumps(dataflow.name) + b'\n  }')
+        if shared and dataflow.datasets.datasets:
+            self._write_datasets(f, dataflow.datasets.datasets)
+        f.write(b'}' if self.compact else b'\n}')
+
+    def _write_datasets(self, f: BinaryIO, datasets: Dict[str, Any]) -> None:
+        # Written one dataset at a time, as json.dump(..., indent=2) would lay them out.
+        f.write(b',"datasets":{' if self.compact else b',\n  "datasets": {')
+        first = True
+        for name, values in datasets.items():
+            data = self._dumps(values)
+            if self.compact:
+                item = self._dumps(name) + b':' + data
+            else:
+                item = _DATASET_INDENT + self._dumps(name) + b': ' + data.replace(b"\n", _DATASET_INDENT)
+            f.write(item if first else b',' + item)
+            first = False
+        f.write(b'}' if self.compact else b'\n  }')
+
+    def _write_items(self, f: BinaryIO, items: Iterable[Any], separator: bytes, closing: bytes) -> None:
+        # Items sit three levels deep; in indented mode each one is re-indented
+        # by splitting on newlines, which never occur inside JSON strings.
+        first = True
+        for item in items:
+            data = self._dumps(item)
+            if not self.compact:
+                data = _NODE_INDENT + data.replace(b"\n", _NODE_INDENT)
+            f.write(data if first else separator + data)
+            first = False
+        if not first:
+            f.write(closing)
+
+    def _dumps(self, obj: Any) -> bytes:
+        if self.backend == "orjson":
+            try:
+                return orjson.dumps(obj) if self.compact else orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+            except TypeError:  # e.g. integers beyond 64 bits; fall back to the standard encoder.
+                pass
+        if self.compact:
+            return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+        return json.dumps(obj, indent=2).encode('utf-8')
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import Set, Optional, Dict, Any
+from typing import Set, Optional, Dict, Any, List, Tuple
 
 @dataclass
 class CellAnalysis:
@@ -9,6 +9,9 @@ class CellAnalysis:
     pure_overwrites: Set[str]
     category: str
     vega_spec: Optional[Dict[str, Any]] = None
+    # Set when Altair spec extraction failed, so the analysis is kept out of the
+    # persistent cache and retried on a later run.
+    spec_failed: bool = False
 
 @dataclass
 class CodeCell:
@@ -16,4 +19,81 @@ class CodeCell:
     id: str
     source: str
     nb_cell: Any
-    
\ No newline at end of file
+
+@dataclass
+class CellChain(CodeCell):
+    """
+    A linear run of cells fused into one graph node by coarsening. The source is
+    the members' sources in order; output_var is the variable the run hands on.
+    """
+    members: List[CodeCell] = field(default_factory=list)
+    output_var: str = ""
+
+@dataclass
+class BatchResult:
+    """Outcome of converting a single notebook in batch mode."""
+    notebook_path: str
+    output_path: str
+    cell_count: int = 0
+    seconds: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+@dataclass
+class GraphPatch:
+    """Nodes and edges touched when a dependency graph is updated in place."""
+    added_nodes: List[str] = field(default_factory=list)
+    removed_nodes: List[str] = field(default_factory=list)
+    changed_nodes: List[str] = field(default_factory=list)
+    added_edges: List[Tuple[str, str]] = field(default_factory=list)
+    removed_edges: List[Tuple[str, str]] = field(default_factory=list)
+    changed_edges: List[Tuple[str, str]] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not any((self.added_nodes, self.removed_nodes, self.changed_nodes,
+                        self.added_edges, self.removed_edges, self.changed_edges))
+
+    def summary(self) -> str:
+        return (f"nodes +{len(self.added_nodes)} -{len(self.removed_nodes)} ~{len(self.changed_nodes)}, "
+                f"edges +{len(self.added_edges)} -{len(self.removed_edges)} ~{len(self.changed_edges)}")
+
+@dataclass
+class DataflowPatch:
+    """Differences between a previously written Curio dataflow and its regenerated version."""
+    added_nodes: List[Dict[str, Any]] = field(default_factory=list)
+    removed_nodes: List[str] = field(default_factory=list)
+    changed_nodes: List[Dict[str, Any]] = field(default_factory=list)
+    added_edges: List[Dict[str, Any]] = field(default_factory=list)
+    removed_edges: List[str] = field(default_factory=list)
+    # Shared Vega-Lite datasets, named by content hash, so they never change in place.
+    added_datasets: Dict[str, Any] = field(default_factory=dict)
+    removed_datasets: List[str] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not any((self.added_nodes, self.removed_nodes, self.changed_nodes,
+                        self.added_edges, self.removed_edges, self.added_datasets, self.removed_datasets))
+
+    def summary(self) -> str:
+        summary = (f"nodes +{len(self.added_nodes)} -{len(self.removed_nodes)} ~{len(self.changed_nodes)}, "
+                   f"edges +{len(self.added_edges)} -{len(self.removed_edges)}")
+        if self.added_datasets or self.removed_datasets:
+            summary += f", datasets +{len(self.added_datasets)} -{len(self.removed_datasets)}"
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        The patch document: full objects for added and changed items, ids for
+        removed ones. Dataset changes are listed only when there are any.
+        """
+        document = {
+            "nodes": {"added": self.added_nodes, "removed": self.removed_nodes, "changed": self.changed_nodes},
+            "edges": {"added": self.added_edges, "removed": self.removed_edges},
+        }
+        if self.added_datasets or self.removed_datasets:
+            document["datasets"] = {"added": self.added_datasets, "removed": self.removed_datasets}
+        return document
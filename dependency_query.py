@@ -0,0 +1,213 @@
+"""
+Dependency queries over a notebook's cell graph.
+
+Answers "which cells does this one depend on" (upstream) and "which cells
+depend on this one" (downstream) for a set of cells or variables, and exports
+the resulting slice of the notebook to Curio JSON:
+
+    python -m notebook_converter.main query notebook.ipynb chart_df --upstream -o slice.json
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Dict, Iterable, List, Optional
+from .notebook_processor import NotebookProcessor, NotebookLoadError
+from .code_analyzer import CodeAnalyzer
+from .graph_builder import DependencyGraphBuilder
+from .curio_converter import CurioConverter
+from .curio_writer import CurioWriter
+from .analysis_cache import AnalysisCache, default_cache_path
+from .category_rules import CategoryRules, RulesError
+from .cell_graph import CellGraph, CellGraphView
+from .graph_layout import LAYOUTS
+from .config import config
+
+DIRECTIONS = ("upstream", "downstream", "both")
+
+class QueryTargetError(ValueError):
+    """Raised when a query target matches no cell id, id prefix or variable."""
+
+class ReachabilityIndex:
+    """
+    Transitive closure of a graph view, stored as one integer bitset per node in
+    each direction: bit j of ancestors[i] is set when node j reaches node i.
+    Both tables are filled in a single sweep in topological order, each node
+    OR-ing in the sets of its direct neighbours, so later reachability tests
+    are a shift and a mask and set queries are one OR per target.
+    """
+
+    def __init__(self, view: CellGraphView):
+        self.view = view
+        order = [i for generation in view.topological_generations() for i in generation]
+        size = len(view.graph.cells)
+        self._ancestors = [0] * size
+        self._descendants = [0] * size
+        for v in order:
+            bits = 0
+            for u in view.predecessors(v):
+                bits |= self._ancestors[u] | (1 << u)
+            self._ancestors[v] = bits
+        for u in reversed(order):
+            bits = 0
+            for v in view.successors(u):
+                bits |= self._descendants[v] | (1 << v)
+            self._descendants[u] = bits
+
+    def reaches(self, u: int, v: int) -> bool:
+        """Whether there is a path from node u to node v."""
+        return bool(self._ancestors[v] >> u & 1)
+
+    def ancestors(self, nodes: Iterable[int]) -> int:
+        """The bitset of nodes with a path to any of nodes."""
+        bits = 0
+        for i in nodes:
+            bits |= self._ancestors[i]
+        return bits
+
+    def descendants(self, nodes: Iterable[int]) -> int:
+        """The bitset of nodes reachable from any of nodes."""
+        bits = 0
+        for i in nodes:
+            bits |= self._descendants[i]
+        return bits
+
+    @staticmethod
+    def members(bits: int) -> List[int]:
+        """Node indices set in a bitset, in ascending order."""
+        digits = bin(bits)[:1:-1]
+        return [i for i, digit in enumerate(digits) if digit == '1']
+
+class DependencyQuery:
+    """
+    Upstream and downstream queries for the cells of a dependency graph. Targets
+    are cell ids, unique cell id prefixes or variable names; a variable stands
+    for every cell that defines it. The reachability index is built once, so
+    any number of queries can follow without traversing the graph again.
+    """
+
+    def __init__(self, graph: CellGraph):
+        self.graph = graph
+        self.index = ReachabilityIndex(graph)
+        self._definers: Dict[str, List[int]] = {}
+        for i, analysis in enumerate(graph.analyses):
+            for name in analysis.defined_vars:
+                self._definers.setdefault(name, []).append(i)
+
+    def resolve(self, targets: Iterable[str]) -> List[int]:
+        """Maps targets to node indices, in notebook order."""
+        nodes = set()
+        for target in targets:
+            if target in self.graph:
+                nodes.add(self.graph.index(target))
+            elif target in self._definers:
+                nodes.update(self._definers[target])
+            else:
+                matches = [i for i, cell in enumerate(self.graph.cells) if cell.id.startswith(target)]
+                if len(matches) != 1:
+                    problem = "is ambiguous" if matches else "matches no cell id or variable"
+                    raise QueryTargetError(f"Query target '{target}' {problem}.")
+                nodes.add(matches[0])
+        return sorted(nodes)
+
+    def ancestors(self, targets: Iterable[str]) -> List[int]:
+        """Cells the targets depend on, directly or transitively."""
+        return self.index.members(self.index.ancestors(self.resolve(targets)))
+
+    def descendants(self, targets: Iterable[str]) -> List[int]:
+        """Cells that depend on the targets, directly or transitively."""
+        return self.index.members(self.index.descendants(self.resolve(targets)))
+
+    def depends_on(self, target: str, dependency: str) -> bool:
+        """Whether any cell of target depends on any cell of dependency."""
+        sources = self.resolve([dependency])
+        return any(self.index.reaches(u, v) for v in self.resolve([target]) for u in sources)
+
+    def slice(self, targets: Iterable[str], direction: str = "upstream") -> CellGraphView:
+        """
+        The smallest view containing the targets and every cell upstream of them,
+        downstream of them, or both. Upstream slices hold everything needed to
+        recompute the targets.
+        """
+        if direction not in DIRECTIONS:
+            raise ValueError(f"unknown slice direction: {direction}")
+        nodes = self.resolve(targets)
+        bits = 0
+        for i in nodes:
+            bits |= 1 << i
+        if direction in ("upstream", "both"):
+            bits |= self.index.ancestors(nodes)
+        if direction in ("downstream", "both"):
+            bits |= self.index.descendants(nodes)
+        keep = bytearray(len(self.graph.cells))
+        for i in self.index.members(bits):
+            keep[i] = 1
+        return CellGraphView(self.graph, keep)
+
+def _describe(view: CellGraphView, targets: List[int]) -> List[Dict[str, object]]:
+    target_set = set(targets)
+    return [
+        {
+            "id": view.cell_id(i),
+            "category": view.category(i),
+            "defines": sorted(view.analysis(i).defined_vars),
+            "target": i in target_set,
+        }
+        for i in view.nodes()
+    ]
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="main query", description="List the cells upstream or downstream of cells or variables, and export that slice.")
+    parser.add_argument("notebook_path", help="The Jupyter Notebook (.ipynb) or percent-format script (.py), or - for stdin.")
+    parser.add_argument("targets", nargs="+", help="Cell ids, unique cell id prefixes or variable names.")
+    direction = parser.add_mutually_exclusive_group()
+    direction.add_argument("--upstream", dest="direction", action="store_const", const="upstream", help="Cells the targets depend on (default).")
+    direction.add_argument("--downstream", dest="direction", action="store_const", const="downstream", help="Cells that depend on the targets.")
+    direction.add_argument("--both", dest="direction", action="store_const", const="both", help="Cells upstream and downstream of the targets.")
+    parser.add_argument("-o", "--output", default=None, help="Write the slice, targets included, as Curio JSON to this path.")
+    parser.add_argument("--compact", action="store_true", help="Write the Curio JSON without indentation.")
+    parser.add_argument("--layout", choices=LAYOUTS, default=config.LAYOUT_ALGORITHM, help="Node layout of the exported slice.")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON.")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes for analyzing the cells of a large notebook.")
+    parser.add_argument("--rules", metavar="FILE", default=None, help="JSON file of keyword rules for categorizing cells.")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the persistent cell analysis cache.")
+    parser.add_argument("--cache-dir", default=None, help="Directory holding the analysis cache (default: ~/.cache/nb2curio).")
+    args = parser.parse_args(argv)
+    args.direction = args.direction or "upstream"
+    try:
+        rules = CategoryRules.from_file(args.rules) if args.rules else CategoryRules.default()
+    except RulesError as e:
+        parser.error(str(e))
+
+    cache = None
+    if not args.no_cache:
+        cache_path = os.path.join(args.cache_dir, config.CACHE_FILENAME) if args.cache_dir else default_cache_path()
+        cache = AnalysisCache(cache_path, namespace=rules.fingerprint)
+    builder = DependencyGraphBuilder(CodeAnalyzer(cache=cache, rules=rules), jobs=args.jobs)
+    try:
+        code_cells = NotebookProcessor(args.notebook_path).get_code_cells()
+        graph = builder.build_graph(code_cells)
+        query = DependencyQuery(graph)
+        targets = query.resolve(args.targets)
+        view = query.slice(args.targets, args.direction)
+    except (NotebookLoadError, QueryTargetError) as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        builder.close()
+        if cache is not None:
+            cache.close()
+
+    cells = _describe(view, targets)
+    if args.json:
+        print(json.dumps({"direction": args.direction, "targets": [graph.cell_id(i) for i in targets],
+                          "cells": cells}, indent=2))
+    else:
+        print(f"{len(cells) - len(targets)} cells {args.direction} of {len(targets)} target cell(s):")
+        for cell in cells:
+            marker = "*" if cell["target"] else " "
+            print(f" {marker} {cell['id']:<12} {cell['category']:<10} {', '.join(cell['defines'])}")
+    if args.output:
+        writer = CurioWriter(compact=args.compact, compress=args.output.endswith('.gz'))
+        writer.write(args.output, CurioConverter(compact=args.compact, layout=args.layout).dataflow(graph, view))
+        print(f"Slice written to: {args.output}", file=sys.stderr if args.json else sys.stdout)
@@ -1,74 +1,240 @@
+import time
 from collections import defaultdict
-from typing import List, Dict
-import networkx as nx
+from contextlib import nullcontext
+from typing import FrozenSet, List, Dict, Optional, Set, Tuple
 from .code_analyzer import CodeAnalyzer
-from .data_models import CodeCell, CellAnalysis
+from .data_models import CodeCell, CellAnalysis, CellChain, GraphPatch
+from .cell_graph import CellGraph, CellGraphView
 from .config import config
+from .profiling import ConversionStats
+from .parallel_analysis import ParallelCellAnalyzer
 
 class DependencyGraphBuilder:
-    """Builds dependency graphs from analyzed code cells."""
+    """
+    Builds dependency graphs from analyzed code cells. With jobs other than 1
+    (None meaning one per CPU), large notebooks are analyzed on a process pool.
+    """
     
-    def __init__(self, analyzer: CodeAnalyzer):
+    def __init__(self, analyzer: CodeAnalyzer, stats: Optional[ConversionStats] = None,
+                 jobs: Optional[int] = 1):
         self.analyzer = analyzer
+        self.stats = stats
+        self.parallel = ParallelCellAnalyzer(analyzer, jobs) if jobs != 1 else None
     
-    def build_graph(self, code_cells: List[CodeCell]) -> nx.DiGraph:
+    def _stage(self, name: str):
+        """Times a stage when statistics are being collected."""
+        return self.stats.stage(name) if self.stats is not None else nullcontext()
+    
+    def build_graph(self, code_cells: List[CodeCell]) -> CellGraph:
         """Builds a dependency graph from code cells."""
-        graph = nx.DiGraph()
-        cell_analyses = {
-            cell.id: self.analyzer.analyze_dependencies(cell.source)
-            for cell in code_cells
-        }
-
+        cell_analyses = self.analyze_cells(code_cells)
+        with self._stage("graph"):
+            return self.build_graph_from_analyses(code_cells, cell_analyses)
+    
+    def analyze_cells(self, code_cells: List[CodeCell]) -> Dict[str, CellAnalysis]:
+        """Analyzes every cell, keyed by cell id."""
+        sources = [cell.source for cell in code_cells]
+        if self.stats is None and self.parallel is None:
+            self.analyzer.prefetch_altair_specs(sources)
+            return {
+                cell.id: self.analyzer.analyze_dependencies(cell.source)
+                for cell in code_cells
+            }
+        
+        with self._stage("altair"):
+            self.analyzer.prefetch_altair_specs(sources)
+        with self._stage("analyze"):
+            if self.parallel is not None:
+                timed = self.parallel.analyze(sources)
+            else:
+                timed = [self._timed_analysis(source) for source in sources]
+        
+        cell_analyses = {}
+        for cell, (analysis, seconds) in zip(code_cells, timed):
+            cell_analyses[cell.id] = analysis
+            if self.stats is not None:
+                self.stats.record_cell(cell.id, seconds)
+        return cell_analyses
+    
+    def _timed_analysis(self, source: str) -> Tuple[CellAnalysis, float]:
+        start = time.perf_counter()
+        analysis = self.analyzer.analyze_dependencies(source)
+        return analysis, time.perf_counter() - start
+    
+    def close(self) -> None:
+        """Stops the analysis worker pool, if any."""
+        if self.parallel is not None:
+            self.parallel.close()
+    
+    def build_graph_from_analyses(self, code_cells: List[CodeCell],
+                                  cell_analyses: Dict[str, CellAnalysis]) -> CellGraph:
+        """Builds the graph nodes and dependency edges from existing cell analyses."""
+        graph = CellGraph()
         for cell in code_cells:
-            analysis = cell_analyses[cell.id]
-            # UPDATED: Store defined_vars on the node to be used later in conversion.
-            graph.add_node(
-                cell.id,
-                source=cell.source,
-                category=analysis.category,
-                vega_spec=analysis.vega_spec,
-                nb_cell=cell.nb_cell,
-                defined_vars=analysis.defined_vars
-            )
+            graph.add_node(cell, cell_analyses[cell.id])
+        
+        self._add_dependency_edges(graph, self._logical_order(code_cells, cell_analyses), cell_analyses)
+        return graph
+    
+    def update_graph(self, graph: CellGraph, code_cells: List[CodeCell],
+                     cell_analyses: Dict[str, CellAnalysis]) -> Tuple[CellGraph, GraphPatch]:
+        """
+        Rebuilds the graph for code_cells from existing analyses, which is cheap next
+        to analysis itself, and reports which nodes and edges differ from graph:
+        nodes whose source changed and edges that appear, disappear or carry
+        different variables.
+        """
+        new_graph = self.build_graph_from_analyses(code_cells, cell_analyses)
+        patch = GraphPatch()
+        patch.removed_nodes = [cell.id for cell in graph.cells if cell.id not in new_graph]
+        for cell in new_graph.cells:
+            if cell.id not in graph:
+                patch.added_nodes.append(cell.id)
+            elif graph.cell(graph.index(cell.id)).source != cell.source:
+                patch.changed_nodes.append(cell.id)
         
+        old_edges = self._edge_map(graph)
+        new_edges = self._edge_map(new_graph)
+        patch.removed_edges = [edge for edge in old_edges if edge not in new_edges]
+        for edge, names in new_edges.items():
+            if edge not in old_edges:
+                patch.added_edges.append(edge)
+            elif old_edges[edge] != names:
+                patch.changed_edges.append(edge)
+        return new_graph, patch
+    
+    @staticmethod
+    def _edge_map(graph: CellGraph) -> Dict[Tuple[str, str], Tuple[str, ...]]:
+        return {(graph.cell_id(u), graph.cell_id(v)): names for u, v, names in graph.edges()}
+    
+    @staticmethod
+    def _logical_order(code_cells: List[CodeCell], cell_analyses: Dict[str, CellAnalysis]) -> List[CodeCell]:
+        """Orders cells by category (imports first), keeping notebook order within a category."""
         categorized_cells = defaultdict(list)
         for cell in code_cells:
             categorized_cells[cell_analyses[cell.id].category].append(cell)
 
-        logically_ordered_cells = [
+        return [
             cell for category in config.LOGICAL_CELL_ORDER
             for cell in categorized_cells[category]
         ]
-        
-        self._add_dependency_edges(graph, logically_ordered_cells, cell_analyses)
-        return graph
     
-    def _add_dependency_edges(self, graph: nx.DiGraph, code_cells: List[CodeCell], 
+    def _add_dependency_edges(self, graph: CellGraph, code_cells: List[CodeCell], 
                               cell_analyses: Dict[str, CellAnalysis]) -> None:
         """Adds dependency edges to the graph."""
-        cell_ids = [cell.id for cell in code_cells]
+        order = [graph.index(cell.id) for cell in code_cells]
+        for (u, v), dependency_vars in self._compute_dependency_edges(graph, order).items():
+            graph.add_edge(u, v, dependency_vars)
+    
+    def _compute_dependency_edges(self, graph: CellGraph, order: List[int]) -> Dict[Tuple[int, int], Set[str]]:
+        """
+        Computes dependency edges between node indices in a single forward sweep. A
+        running index maps each variable to the last node that defined it, so every
+        used variable resolves in constant time instead of scanning earlier cells.
+        """
+        edges: Dict[Tuple[int, int], Set[str]] = {}
+        last_definition: Dict[str, int] = {}
         
-        for i, current_cell_id in enumerate(cell_ids):
-            current_analysis = cell_analyses[current_cell_id]
+        for current in order:
+            current_analysis = graph.analyses[current]
             relevant_vars = current_analysis.used_vars - current_analysis.pure_overwrites
             
             for var in relevant_vars:
-                for j in range(i - 1, -1, -1):
-                    prev_cell_id = cell_ids[j]
-                    if var in cell_analyses[prev_cell_id].defined_vars:
-                        if graph.has_edge(prev_cell_id, current_cell_id):
-                            graph[prev_cell_id][current_cell_id]['vars'].add(var)
-                        else:
-                            graph.add_edge(prev_cell_id, current_cell_id, vars={var})
-                        break
+                previous = last_definition.get(var)
+                if previous is None:
+                    continue
+                edge = (previous, current)
+                if edge in edges:
+                    edges[edge].add(var)
+                else:
+                    edges[edge] = {var}
+            
+            for var in current_analysis.defined_vars:
+                last_definition[var] = current
+        return edges
     
     @staticmethod
-    def create_graph_without_imports(graph: nx.DiGraph) -> nx.DiGraph:
-        """Creates a copy of the graph without import nodes."""
-        graph_no_imports = graph.copy()
-        import_nodes = [
-            node for node, data in graph.nodes(data=True) 
-            if data.get('category') == 'imports'
-        ]
-        graph_no_imports.remove_nodes_from(import_nodes)
-        return graph_no_imports
+    def coarsen_chains(graph: CellGraph, min_length: int = config.COARSEN_MIN_CHAIN,
+                       categories: FrozenSet[str] = config.COARSEN_CATEGORIES) -> CellGraph:
+        """
+        Fuses maximal linear chains into single nodes: runs of at least min_length
+        cells of the same category, taken from categories, where each cell is the
+        only dependent of the one before it and depends on nothing else apart
+        from import cells. A fused node is a CellChain placed at the first cell
+        of its run, and edges to and from the run's cells move to it. Returns
+        graph itself when no chain is long enough.
+        """
+        view = graph.without_imports()
+        nodes = view.nodes()
+        in_degree: Dict[int, int] = defaultdict(int)
+        out_edges: Dict[int, List[Tuple[int, Tuple[str, ...]]]] = defaultdict(list)
+        for u, v, names in view.edges():
+            in_degree[v] += 1
+            out_edges[u].append((v, names))
+        links: Dict[int, int] = {}
+        link_vars: Dict[Tuple[int, int], Tuple[str, ...]] = {}
+        for u, edges in out_edges.items():
+            category = graph.category(u)
+            if len(edges) == 1 and category in categories:
+                v, names = edges[0]
+                if v != u and graph.category(v) == category and in_degree[v] == 1:
+                    links[u] = v
+                    link_vars[u, v] = names
+        
+        linked = set(links.values())
+        chains = []
+        for u in nodes:
+            if u in links and u not in linked:
+                chain = [u]
+                while chain[-1] in links:
+                    chain.append(links[chain[-1]])
+                if len(chain) >= max(2, min_length):
+                    chains.append(chain)
+        if not chains:
+            return graph
+        
+        head_of = {i: chain[0] for chain in chains for i in chain}
+        fused = {chain[0]: chain for chain in chains}
+        coarse = CellGraph()
+        new_index: Dict[int, int] = {}
+        for i in range(len(graph.cells)):
+            if i in fused:
+                new_index[i] = coarse.add_node(*DependencyGraphBuilder._fuse(graph, fused[i], link_vars))
+            elif i not in head_of:
+                new_index[i] = coarse.add_node(graph.cell(i), graph.analysis(i))
+        
+        edges: Dict[Tuple[int, int], Set[str]] = {}
+        for u, v, names in graph.edges():
+            edge = (new_index[head_of.get(u, u)], new_index[head_of.get(v, v)])
+            if edge[0] != edge[1]:
+                edges.setdefault(edge, set()).update(names)
+        for (u, v), names in edges.items():
+            coarse.add_edge(u, v, names)
+        return coarse
+    
+    @staticmethod
+    def _fuse(graph: CellGraph, chain: List[int],
+              link_vars: Dict[Tuple[int, int], Tuple[str, ...]]) -> Tuple[CellChain, CellAnalysis]:
+        """The cell and analysis of the node that replaces a chain."""
+        cells = [graph.cell(i) for i in chain]
+        analyses = [graph.analysis(i) for i in chain]
+        defined: Set[str] = set()
+        used: Set[str] = set()
+        pure_overwrites: Set[str] = set()
+        for analysis in analyses:
+            used |= analysis.used_vars - defined
+            defined |= analysis.defined_vars
+            pure_overwrites |= analysis.pure_overwrites
+        # As for a single cell, the run hands on what its last cell defines, or
+        # else the variable that last cell received from the one before it.
+        handed_on = analyses[-1].defined_vars or link_vars[chain[-2], chain[-1]]
+        cell = CellChain(
+            id=cells[0].id, source="\n".join(cell.source for cell in cells), nb_cell=cells[0].nb_cell,
+            members=cells, output_var=min(handed_on),
+        )
+        return cell, CellAnalysis(defined, used, pure_overwrites, analyses[0].category)
+    
+    @staticmethod
+    def create_graph_without_imports(graph: CellGraphView) -> CellGraphView:
+        """Returns a view of the graph without import nodes; nothing is copied."""
+        return graph.without_imports()
@@ -0,0 +1,253 @@
+from typing import Dict, List, Optional, Set, Tuple
+from .config import config
+from .cell_graph import CellGraphView, GraphCycleError
+
+# Node positions in layout units: (column, row), with rows centred on zero.
+# Callers scale them to pixels with their own column and row spacing.
+Positions = Dict[int, Tuple[float, float]]
+
+LAYOUTS = ("generations", "sugiyama")
+
+class GenerationLayout:
+    """
+    Places each topological generation in its own column, stacked in discovery
+    order and centred vertically. Graphs with a cycle fall back to a single row.
+    """
+    name = "generations"
+
+    def place(self, view: CellGraphView) -> Positions:
+        nodes = view.nodes()
+        if not nodes:
+            return {}
+        try:
+            layers = view.topological_generations()
+        except GraphCycleError:
+            print("Warning: Cycle detected. Using simpler linear layout.")
+            return {node: (i, 0) for i, node in enumerate(nodes)}
+        positions = {}
+        for column, layer in enumerate(layers):
+            top = -(len(layer) - 1) / 2
+            for row, node in enumerate(layer):
+                positions[node] = (column, top + row)
+        return positions
+
+class SugiyamaLayout:
+    """
+    Layered layout in the style of Sugiyama et al., in four steps that each run
+    in time linear in the number of nodes and edges:
+
+    1. Cycles are broken by reversing the back edges of a depth-first search.
+    2. Nodes are assigned to columns in topological order, each in the first
+       column after all of its predecessors that has room for it, so that no
+       column holds more than max_column_nodes nodes (0 for no limit).
+    3. Crossings are reduced by barycenter sweeps: each column is sorted by the
+       mean row of a node's predecessors, then, sweeping back, of its successors.
+       Neighbours in any column count, so long edges need no dummy nodes.
+    4. Rows are assigned by isotonic regression: each node is pulled towards the
+       mean row of its predecessors while keeping the sweep order and a gap of
+       one row, which straightens edges without growing the columns.
+    """
+    name = "sugiyama"
+
+    def __init__(self, sweeps: int = config.LAYOUT_SWEEPS,
+                 max_column_nodes: int = config.LAYOUT_MAX_COLUMN_NODES):
+        self.sweeps = sweeps
+        self.max_column_nodes = max_column_nodes
+
+    def place(self, view: CellGraphView) -> Positions:
+        nodes = view.nodes()
+        if not nodes:
+            return {}
+        predecessors, successors = self._acyclic_adjacency(view, nodes)
+        columns = self._columns(nodes, predecessors, successors)
+        self._reduce_crossings(columns, predecessors, successors)
+        return self._rows(columns, predecessors)
+
+    @staticmethod
+    def _acyclic_adjacency(view: CellGraphView, nodes: List[int]) -> Tuple[Dict[int, List[int]], Dict[int, List[int]]]:
+        """Adjacency lists of the view with the back edges of a depth-first search reversed."""
+        successors: Dict[int, List[int]] = {i: [] for i in nodes}
+        for u, v, _ in view.edges():
+            if u != v:
+                successors[u].append(v)
+
+        on_stack, done = set(), set()
+        back_edges: Set[Tuple[int, int]] = set()
+        for root in nodes:
+            if root in done:
+                continue
+            on_stack.add(root)
+            stack = [(root, iter(successors[root]))]
+            while stack:
+                u, children = stack[-1]
+                for v in children:
+                    if v in on_stack:
+                        back_edges.add((u, v))
+                    elif v not in done:
+                        on_stack.add(v)
+                        stack.append((v, iter(successors[v])))
+                        break
+                else:
+                    stack.pop()
+                    on_stack.discard(u)
+                    done.add(u)
+        if back_edges:
+            print(f"Warning: Cycle detected. Reversing {len(back_edges)} edge(s) for the layout.")
+            for u, v in back_edges:
+                successors[u].remove(v)
+                successors[v].append(u)
+
+        predecessors: Dict[int, List[int]] = {i: [] for i in nodes}
+        for u in nodes:
+            for v in successors[u]:
+                predecessors[v].append(u)
+        return predecessors, successors
+
+    def _columns(self, nodes: List[int], predecessors: Dict[int, List[int]],
+                 successors: Dict[int, List[int]]) -> List[List[int]]:
+        """
+        Assigns nodes to width-bounded columns in a depth-first topological order,
+        which keeps chains of cells together, so that a column that fills up
+        pushes whole chains to the right rather than splitting them.
+        """
+        indegree = {i: len(predecessors[i]) for i in nodes}
+        ready = [i for i in reversed(nodes) if indegree[i] == 0]
+        order = []
+        while ready:
+            u = ready.pop()
+            order.append(u)
+            released = [v for v in successors[u] if _release(indegree, v)]
+            ready.extend(sorted(released, reverse=True))
+
+        limit = self.max_column_nodes
+        column_of: Dict[int, int] = {}
+        columns: List[List[int]] = []
+        # Full columns point to a later column that may have room; chains of
+        # full columns are shortened as they are followed, as in union-find.
+        forward: List[int] = []
+        for u in order:
+            c = max((column_of[p] + 1 for p in predecessors[u]), default=0)
+            if limit > 0:
+                path = []
+                while c < len(columns) and len(columns[c]) >= limit:
+                    path.append(c)
+                    c = forward[c]
+                for full in path:
+                    forward[full] = c
+            while c >= len(columns):
+                columns.append([])
+                forward.append(len(forward) + 1)
+            columns[c].append(u)
+            column_of[u] = c
+        return columns
+
+    def _reduce_crossings(self, columns: List[List[int]], predecessors: Dict[int, List[int]],
+                          successors: Dict[int, List[int]]) -> None:
+        """Reorders every column in place by alternating barycenter sweeps."""
+        row: Dict[int, float] = {}
+
+        def number(column: List[int]) -> None:
+            top = (len(column) - 1) / 2
+            for k, node in enumerate(column):
+                row[node] = k - top
+
+        def sort(column: List[int], neighbours: Dict[int, List[int]]) -> None:
+            def barycenter(node: int) -> float:
+                adjacent = neighbours[node]
+                return sum(row[n] for n in adjacent) / len(adjacent) if adjacent else row[node]
+            column.sort(key=barycenter)
+            number(column)
+
+        for column in columns:
+            number(column)
+        for _ in range(self.sweeps):
+            for column in columns[1:]:
+                sort(column, predecessors)
+            for column in reversed(columns[:-1]):
+                sort(column, successors)
+        # A last downward pass leaves each column ordered by its predecessors,
+        # which is what the row assignment aligns to.
+        for column in columns[1:]:
+            sort(column, predecessors)
+
+    @staticmethod
+    def _rows(columns: List[List[int]], predecessors: Dict[int, List[int]]) -> Positions:
+        positions: Positions = {}
+        for c, column in enumerate(columns):
+            top = (len(column) - 1) / 2
+            targets = []
+            for k, node in enumerate(column):
+                adjacent = [positions[p][1] for p in predecessors[node]]
+                targets.append(sum(adjacent) / len(adjacent) if adjacent else k - top)
+            for node, y in zip(column, _ordered_fit(targets)):
+                positions[node] = (c, y)
+        return positions
+
+def _release(indegree: Dict[int, int], node: int) -> bool:
+    indegree[node] -= 1
+    return indegree[node] == 0
+
+def _ordered_fit(targets: List[float]) -> List[float]:
+    """
+    The rows closest to targets, in the least-squares sense, that keep their
+    order and lie at least one row apart. Subtracting k from the k-th target
+    turns this into isotonic regression, solved by pooling adjacent violators.
+    """
+    blocks: List[List[float]] = []  # [sum, count] of pooled, shifted targets
+    for k, target in enumerate(targets):
+        blocks.append([target - k, 1])
+        while len(blocks) > 1 and blocks[-2][0] / blocks[-2][1] > blocks[-1][0] / blocks[-1][1]:
+            total, count = blocks.pop()
+            blocks[-1][0] += total
+            blocks[-1][1] += count
+    rows = []
+    for total, count in blocks:
+        mean = total / count
+        for _ in range(count):
+            rows.append(mean + len(rows))
+    return rows
+
+def make_layout(name: Optional[str] = None):
+    """Returns the layout engine called name, by default Config.LAYOUT_ALGORITHM."""
+    name = name or config.LAYOUT_ALGORITHM
+    if name == "generations":
+        return GenerationLayout()
+    if name == "sugiyama":
+        return SugiyamaLayout()
+    raise ValueError(f"unknown layout: {name}; expected one of: {', '.join(LAYOUTS)}")
+
+def count_crossings(view: CellGraphView, positions: Positions) -> int:
+    """
+    Counts pairs of edges that cross when drawn as straight lines between their
+    nodes, column gap by column gap. Used to compare layouts; its cost grows with
+    the total number of columns that edges span.
+    """
+    gaps: Dict[float, List[Tuple[float, float]]] = {}
+    for u, v, _ in view.edges():
+        (x1, y1), (x2, y2) = positions[u], positions[v]
+        if x1 == x2:
+            continue
+        if x1 > x2:
+            (x1, y1), (x2, y2) = (x2, y2), (x1, y1)
+        steps = int(x2 - x1)
+        slope = (y2 - y1) / steps
+        for k in range(steps):
+            gaps.setdefault(x1 + k, []).append((y1 + slope * k, y1 + slope * (k + 1)))
+
+    crossings = 0
+    for segments in gaps.values():
+        segments.sort()
+        ranks = {y: r for r, y in enumerate(sorted({right for _, right in segments}), 1)}
+        tree = [0] * (len(ranks) + 1)
+        for inserted, (_, right) in enumerate(segments):
+            r = ranks[right]
+            # Earlier segments start higher, so those ending lower cross this one.
+            at_most, k = 0, r
+            while k:
+                at_most += tree[k]
+                k -= k & -k
+            crossings += inserted - at_most
+            while r <= len(ranks):
+                tree[r] += 1
+                r += r & -r
+    return crossings
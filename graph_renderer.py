@@ -0,0 +1,225 @@
+import html
+import io
+import json
+import math
+import os
+from typing import Dict, Optional, Set, TextIO, Tuple
+from .config import config
+from .cell_graph import CellGraph, CellGraphView, GraphCycleError
+from .graph_layout import make_layout
+
+_HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Jupyter Notebook Dependency Graph</title>
+<style>
+html, body {{ margin: 0; height: 100%; font-family: sans-serif; background: #f0f0f0; }}
+#canvas {{ position: absolute; inset: 0 420px 0 0; overflow: hidden; cursor: grab; }}
+#canvas svg {{ width: 100%; height: 100%; }}
+#panel {{ position: absolute; top: 0; right: 0; bottom: 0; width: 420px; box-sizing: border-box;
+          padding: 12px; overflow: auto; background: #fff; border-left: 1px solid #ccc; }}
+#panel pre {{ white-space: pre-wrap; font-size: 12px; background: #f7f7f7; padding: 8px; }}
+.node.selected rect {{ stroke-width: 4; }}
+</style>
+</head>
+<body>
+<div id="canvas">{svg}</div>
+<div id="panel"><h3>Jupyter Notebook Dependency Graph</h3><p>{summary}. Click a node to view its code; scroll to zoom, drag to pan.</p><div id="details"></div></div>
+<script type="application/json" id="cells">{cells}</script>
+<script>
+(function () {{
+  var cells = JSON.parse(document.getElementById("cells").textContent);
+  var svg = document.querySelector("#canvas svg");
+  var details = document.getElementById("details");
+  var box = svg.viewBox.baseVal, selected = null, drag = null;
+
+  function text(tag, value) {{
+    var el = document.createElement(tag);
+    el.textContent = value;
+    return el;
+  }}
+  svg.addEventListener("click", function (event) {{
+    var node = event.target.closest(".node");
+    if (!node) return;
+    if (selected) selected.classList.remove("selected");
+    selected = node;
+    node.classList.add("selected");
+    var cell = cells[+node.dataset.node];
+    details.replaceChildren(
+      text("h4", cell.category + " \\u2014 " + cell.id),
+      text("p", "Uses: " + (cell.uses.join(", ") || "\\u2013")),
+      text("p", "Defines: " + (cell.defines.join(", ") || "\\u2013")),
+      text("pre", cell.source));
+  }});
+  svg.addEventListener("wheel", function (event) {{
+    event.preventDefault();
+    var scale = event.deltaY > 0 ? 1.2 : 1 / 1.2, rect = svg.getBoundingClientRect();
+    var px = box.x + (event.clientX - rect.left) / rect.width * box.width;
+    var py = box.y + (event.clientY - rect.top) / rect.height * box.height;
+    box.x = px - (px - box.x) * scale; box.y = py - (py - box.y) * scale;
+    box.width *= scale; box.height *= scale;
+  }}, {{ passive: false }});
+  svg.addEventListener("mousedown", function (event) {{
+    drag = {{ x: event.clientX, y: event.clientY }};
+  }});
+  window.addEventListener("mouseup", function () {{ drag = null; }});
+  window.addEventListener("mousemove", function (event) {{
+    if (!drag) return;
+    var rect = svg.getBoundingClientRect();
+    box.x -= (event.clientX - drag.x) / rect.width * box.width;
+    box.y -= (event.clientY - drag.y) / rect.height * box.height;
+    drag = {{ x: event.clientX, y: event.clientY }};
+  }});
+}})();
+</script>
+</body>
+</html>
+"""
+
+class GraphRenderer:
+    """
+    Renders the dependency graph to a static SVG or a self-contained HTML page
+    without matplotlib or a display. Nodes are laid out in topological layers
+    and drawn as plain SVG elements, so output size and rendering time grow
+    linearly with the number of nodes and edges. Edge variables and, in SVG,
+    cell sources are shown on hover; the HTML page shows a cell's source in a
+    side panel when its node is clicked. Nodes are placed by the named layout
+    engine, as in the Curio JSON.
+    """
+
+    def __init__(self, layout: Optional[str] = None):
+        self.layout = make_layout(layout)
+
+    def render(self, graph: CellGraph, path: str) -> None:
+        """Writes the graph to path, as HTML for .html/.htm files and SVG for .svg files."""
+        fmt = self.format_for(path)
+        with open(path, 'w', encoding='utf-8') as f:
+            self.render_to(f, graph, fmt)
+
+    @staticmethod
+    def format_for(path: str) -> str:
+        extension = os.path.splitext(path)[1].lower()
+        if extension in ('.html', '.htm'):
+            return 'html'
+        if extension == '.svg':
+            return 'svg'
+        raise ValueError(f"Cannot render to '{path}': use a .svg or .html file.")
+
+    def render_to(self, f: TextIO, graph: CellGraph, fmt: str = 'svg') -> None:
+        """Writes the graph to a text file object in the given format ('svg' or 'html')."""
+        view = graph.without_imports()
+        if fmt == 'svg':
+            self._write_svg(f, view, embed_sources=True)
+            return
+        if fmt != 'html':
+            raise ValueError(f"unknown render format: {fmt}")
+        svg = io.StringIO()
+        self._write_svg(svg, view, embed_sources=False)
+        uses: Dict[int, Set[str]] = {}
+        edge_count = 0
+        for _, v, names in view.edges():
+            uses.setdefault(v, set()).update(names)
+            edge_count += 1
+        cells = [
+            {
+                "id": view.cell_id(i),
+                "category": view.category(i),
+                "source": view.cell(i).source,
+                "uses": sorted(uses.get(i, ())),
+                "defines": sorted(view.analysis(i).defined_vars),
+            }
+            for i in view.nodes()
+        ]
+        f.write(_HTML_TEMPLATE.format(
+            svg=svg.getvalue(),
+            summary=f"{len(cells)} cells, {edge_count} dependencies",
+            # "<" is escaped so that cell sources can never close the script element.
+            cells=json.dumps(cells).replace("<", "\\u003c"),
+        ))
+
+    def _write_svg(self, f: TextIO, view: CellGraphView, embed_sources: bool) -> None:
+        positions, width, height = self._layout(view)
+        node_w, node_h = config.RENDER_NODE_SIZE
+        slot = {i: k for k, i in enumerate(view.nodes())}
+
+        f.write(
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+            f'width="{width}" height="{height}" font-family="sans-serif" font-size="12">'
+            '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="7" '
+            'markerHeight="7" orient="auto"><path d="M0,0L10,5L0,10z" fill="#555"/></marker>'
+            '<style>.edges path{fill:none;stroke:#555;stroke-width:1.2;marker-end:url(#arrow)}'
+            '.edges path:hover{stroke:#d00;stroke-width:3}'
+            '.node rect{stroke-width:1.5}.node text{text-anchor:middle;font-weight:bold;pointer-events:none}'
+        )
+        for category, color in config.NODE_COLORS.items():
+            f.write(f'.c-{category} rect{{fill:{color};stroke:{config.NODE_BORDERS[category]}}}')
+        f.write('</style></defs>')
+
+        f.write('<g class="edges">')
+        for u, v, names in view.edges():
+            (x1, y1), (x2, y2) = positions[u], positions[v]
+            x1, y1, y2 = x1 + node_w, y1 + node_h // 2, y2 + node_h // 2
+            mid = (x1 + x2) // 2
+            f.write(
+                f'<path d="M{x1},{y1}C{mid},{y1} {mid},{y2} {x2},{y2}">'
+                f'<title>{html.escape(", ".join(names), quote=False)}</title></path>'
+            )
+        f.write('</g><g class="nodes">')
+        for i in view.nodes():
+            x, y = positions[i]
+            category = view.category(i)
+            label = category.replace('_', ' ').title()
+            defined = view.analysis(i).defined_vars
+            if defined:
+                label = f"{label}: {min(defined)}"
+            if len(label) > config.RENDER_LABEL_CHARS:
+                label = label[:config.RENDER_LABEL_CHARS - 1] + "…"
+            tooltip = view.cell(i).source if embed_sources else view.cell_id(i)
+            f.write(
+                f'<g class="node c-{category}" data-node="{slot[i]}" transform="translate({x},{y})">'
+                f'<rect width="{node_w}" height="{node_h}" rx="6"/>'
+                f'<text x="{node_w // 2}" y="{node_h // 2 + 4}">{html.escape(label, quote=False)}</text>'
+                f'<title>{html.escape(tooltip, quote=False)}</title></g>'
+            )
+        f.write('</g></svg>')
+
+    def _layout(self, view: CellGraphView) -> Tuple[Dict[int, Tuple[int, int]], int, int]:
+        """
+        Places topological layers in columns, each centred on the tallest one, and
+        returns the top-left corner of every node with the canvas size. Graphs with
+        a cycle fall back to a square grid in notebook order. Layout engines other
+        than "generations" give the columns and rows instead.
+        """
+        nodes = view.nodes()
+        node_w, node_h = config.RENDER_NODE_SIZE
+        step_x, step_y = config.RENDER_SPACING['x'], config.RENDER_SPACING['y']
+        margin = config.RENDER_MARGIN
+        if self.layout.name != "generations":
+            placed = self.layout.place(view)
+            if not placed:
+                return {}, 2 * margin + node_w, 2 * margin + node_h
+            top = min(row for _, row in placed.values())
+            positions = {
+                i: (margin + int(column) * step_x, margin + round((row - top) * step_y))
+                for i, (column, row) in placed.items()
+            }
+            width = max(x for x, _ in positions.values()) + node_w + margin
+            height = max(y for _, y in positions.values()) + node_h + margin
+            return positions, width, height
+        try:
+            layers = view.topological_generations()
+        except GraphCycleError:
+            print("Warning: Cycle detected. Using a grid layout.")
+            rows = max(1, math.ceil(math.sqrt(len(nodes))))
+            layers = [nodes[k:k + rows] for k in range(0, len(nodes), rows)]
+
+        tallest = max((len(layer) for layer in layers), default=1)
+        positions = {}
+        for column, layer in enumerate(layers):
+            offset = (tallest - len(layer)) * step_y // 2
+            for row, i in enumerate(layer):
+                positions[i] = (margin + column * step_x, margin + offset + row * step_y)
+        width = 2 * margin + max(len(layers) - 1, 0) * step_x + node_w
+        height = 2 * margin + (tallest - 1) * step_y + node_h
+        return positions, width, height
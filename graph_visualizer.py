@@ -5,19 +5,20 @@ import matplotlib.pyplot as plt
 import networkx as nx
 from .config import config
 from .graph_builder import DependencyGraphBuilder
+from .cell_graph import CellGraph
 
 class GraphVisualizer:
     """Handles visualization of dependency graphs."""
     
-    def visualize_dag(self, graph: nx.DiGraph) -> None:
+    def visualize_dag(self, graph: CellGraph) -> None:
         """Renders the dependency graph using matplotlib."""
-        if not graph.nodes:
+        if not len(graph):
             return
         
         fig, ax = plt.subplots(figsize=(16, 10), facecolor='#f0f0f0')
         ax.set_facecolor('#f0f0f0')
         
-        graph_no_imports = DependencyGraphBuilder.create_graph_without_imports(graph)
+        graph_no_imports = DependencyGraphBuilder.create_graph_without_imports(graph).to_networkx()
         pos = self._calculate_layout(graph_no_imports)
         
         if pos:
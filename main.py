@@ -1,77 +1,320 @@
 import argparse
 import json
-from .notebook_processor import NotebookProcessor
+import os
+import sys
+from contextlib import nullcontext
+from typing import List, Optional
+from .notebook_processor import NotebookProcessor, NotebookLoadError, STDIN_PATH
 from .code_analyzer import CodeAnalyzer
 from .graph_builder import DependencyGraphBuilder
 from .curio_converter import CurioConverter
-from .graph_visualizer import GraphVisualizer
+from .curio_writer import CurioWriter
+from .analysis_cache import AnalysisCache, default_cache_path
+from .category_rules import CategoryRules, RulesError
+from .profiling import ConversionStats
+from .data_models import CodeCell
+from .cell_graph import CellGraph
+from .graph_layout import LAYOUTS
+from .spec_datasets import DATASET_MODES
+from .config import config
 
 class NotebookConverter:
     """Main converter class that orchestrates the conversion process."""
     
-    def __init__(self, notebook_path: str):
+    def __init__(self, notebook_path: str, cache: Optional[AnalysisCache] = None,
+                 stats: Optional[ConversionStats] = None, validate: bool = False,
+                 jobs: Optional[int] = 1, writer: Optional[CurioWriter] = None,
+                 rules: Optional[CategoryRules] = None, layout: Optional[str] = None,
+                 coarsen: Optional[int] = None, datasets: Optional[str] = None,
+                 dataset_min_bytes: int = config.DATASET_MIN_BYTES):
         self.notebook_path = notebook_path
-        self.processor = NotebookProcessor(notebook_path)
-        self.analyzer = CodeAnalyzer()
-        self.graph_builder = DependencyGraphBuilder(self.analyzer)
-        self.curio_converter = CurioConverter()
-        self.visualizer = GraphVisualizer()
+        self.layout = layout
+        self.coarsen = coarsen
+        self.stats = stats
+        self.processor = NotebookProcessor(notebook_path, validate=validate)
+        self.analyzer = CodeAnalyzer(cache=cache, rules=rules)
+        self.graph_builder = DependencyGraphBuilder(self.analyzer, stats=stats, jobs=jobs)
+        self.writer = writer or CurioWriter()
+        self.curio_converter = CurioConverter(compact=self.writer.compact, layout=layout, datasets=datasets,
+                                              dataset_min_bytes=dataset_min_bytes)
+        self._visualizer = None
+    
+    @property
+    def visualizer(self):
+        """The graph visualizer, created on first use since it pulls in matplotlib and tkinter."""
+        if self._visualizer is None:
+            from .graph_visualizer import GraphVisualizer
+            self._visualizer = GraphVisualizer()
+        return self._visualizer
+    
+    def build_graph(self, code_cells: List[CodeCell]) -> CellGraph:
+        """Builds the dependency graph, fusing linear chains of cells when coarsening is on."""
+        graph = self.graph_builder.build_graph(code_cells)
+        if self.coarsen is None:
+            return graph
+        with self._stage("coarsen"):
+            coarse = self.graph_builder.coarsen_chains(graph, self.coarsen)
+        if coarse is not graph:
+            print(f"Coarsened {len(graph.without_imports())} nodes into {len(coarse.without_imports())}.")
+        return coarse
+    
+    def _stage(self, name: str, profile: bool = True):
+        """Times a stage when statistics are being collected."""
+        return self.stats.stage(name, profile) if self.stats is not None else nullcontext()
+    
+    def collect_cache_stats(self) -> None:
+        """Records analysis and Altair spec cache counters into the statistics."""
+        if self.stats is None:
+            return
+        memory = self.analyzer.memory_cache
+        self.stats.record_cache("memory", memory.hits, memory.misses, evictions=memory.evictions,
+                                entries=len(memory), bytes=memory.bytes)
+        if self.analyzer.cache is not None:
+            self.stats.record_cache("analysis", self.analyzer.cache.hits, self.analyzer.cache.misses)
+        extractor = self.analyzer.spec_extractor
+        self.stats.record_cache("altair_spec", extractor.hits, extractor.misses)
     
     def convert_to_curio(self, output_path: str) -> None:
         """Converts the notebook to Curio JSON format."""
         print(f"\nAnalyzing notebook: {self.notebook_path}")
-        code_cells = self.processor.get_code_cells()
+        with self._stage("load", profile=False):
+            code_cells = self.processor.get_code_cells()
         
         if not code_cells:
             print("No code cells found in the notebook.")
             return
         
         print("\nBuilding dependency graph...")
-        dependency_graph = self.graph_builder.build_graph(code_cells)
+        dependency_graph = self.build_graph(code_cells)
         
         print("\nGenerating Curio JSON...")
-        curio_dataflow = self.curio_converter.dag_to_curio_json(dependency_graph)
+        with self._stage("convert"):
+            curio_dataflow = self.curio_converter.dataflow(dependency_graph)
         
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(curio_dataflow, f, indent=2)
+            # Node contents are rendered while they are streamed, so "write" includes them.
+            with self._stage("write"):
+                self.writer.write(output_path, curio_dataflow)
             print(f"\nSuccessfully generated Curio dataflow at: {output_path}")
+            self._report_datasets(curio_dataflow)
         except Exception as e:
             print(f"\nError writing to output file: {e}")
     
+    def update_curio(self, previous_path: str, output_path: Optional[str] = None,
+                     patch_path: Optional[str] = None) -> None:
+        """
+        Regenerates the Curio JSON against the one previously written to previous_path,
+        reusing the ids and positions of unchanged nodes. Writes the merged dataflow to
+        output_path and/or the patch from the previous version to patch_path.
+        """
+        from .curio_diff import CurioUpdater
+        if os.path.exists(previous_path):
+            try:
+                with self._stage("diff", profile=False):
+                    updater = CurioUpdater.from_file(previous_path)
+            except (OSError, ValueError) as e:
+                print(f"\nError reading the previous dataflow: {e}")
+                return
+        else:
+            print(f"\nNo previous dataflow at {previous_path}; every node is new.")
+            updater = CurioUpdater({})
+        
+        print(f"\nAnalyzing notebook: {self.notebook_path}")
+        with self._stage("load", profile=False):
+            code_cells = self.processor.get_code_cells()
+        
+        if not code_cells:
+            print("No code cells found in the notebook.")
+            return
+        
+        print("\nBuilding dependency graph...")
+        dependency_graph = self.build_graph(code_cells)
+        
+        print("\nComparing with the previous Curio JSON...")
+        with self._stage("convert"):
+            curio_dataflow = self.curio_converter.dataflow(dependency_graph)
+        with self._stage("diff"):
+            merged, patch = updater.update(curio_dataflow)
+        print(f"Changes: {patch.summary()}")
+        
+        try:
+            with self._stage("write"):
+                if output_path:
+                    self.writer.write(output_path, merged)
+                    print(f"\nSuccessfully generated Curio dataflow at: {output_path}")
+                    self._report_datasets(merged)
+                if patch_path:
+                    with open(patch_path, 'w', encoding='utf-8') as f:
+                        json.dump(patch.to_dict(), f, indent=None if self.writer.compact else 2)
+                    print(f"Patch written to: {patch_path}")
+        except Exception as e:
+            print(f"\nError writing to output file: {e}")
+    
+    @staticmethod
+    def _report_datasets(dataflow) -> None:
+        if dataflow.datasets.mode != "inline" and dataflow.datasets.bytes_removed:
+            print(f"Datasets: {dataflow.datasets.summary()}")
+    
     def visualize(self) -> None:
         """Visualizes the notebook dependency graph."""
         print(f"\nAnalyzing notebook: {self.notebook_path}")
-        code_cells = self.processor.get_code_cells()
+        with self._stage("load", profile=False):
+            code_cells = self.processor.get_code_cells()
         
         if not code_cells:
             print("No code cells found in the notebook.")
             return
         
         print("\nBuilding dependency graph...")
-        dependency_graph = self.graph_builder.build_graph(code_cells)
+        dependency_graph = self.build_graph(code_cells)
         
         print("\nVisualizing graph...")
         self.visualizer.visualize_dag(dependency_graph)
+    
+    def render(self, output_path: str) -> None:
+        """Renders the dependency graph to a static SVG or HTML file, without a display."""
+        from .graph_renderer import GraphRenderer
+        renderer = GraphRenderer(layout=self.layout)
+        print(f"\nAnalyzing notebook: {self.notebook_path}")
+        with self._stage("load", profile=False):
+            code_cells = self.processor.get_code_cells()
+        
+        if not code_cells:
+            print("No code cells found in the notebook.")
+            return
+        
+        print("\nBuilding dependency graph...")
+        dependency_graph = self.build_graph(code_cells)
+        
+        print("\nRendering graph...")
+        with self._stage("render"):
+            renderer.render(dependency_graph, output_path)
+        print(f"\nGraph rendered to: {output_path}")
 
 def main():
     """Main entry point for the script."""
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from .server import main as serve_main
+        serve_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "query":
+        from .dependency_query import main as query_main
+        query_main(sys.argv[2:])
+        return
     parser = argparse.ArgumentParser(
         description="Convert a Jupyter Notebook into a Curio dataflow JSON or an interactive graph."
     )
-    parser.add_argument("notebook_path", help="The file path to the Jupyter Notebook (.ipynb).")
+    parser.add_argument("notebook_path", nargs="*", help="The Jupyter Notebook (.ipynb) or percent-format script (.py), or - to read either from stdin. With --output-dir, any number of files, directories or glob patterns.")
     parser.add_argument("-o", "--output", help="The file path to save the output Curio JSON.", default=None)
     parser.add_argument("--visualize", action="store_true", help="Visualize the dependency graph instead of generating JSON.")
+    parser.add_argument("--render", metavar="FILE", default=None, help="Render the dependency graph to a static .svg or self-contained .html file (no display needed).")
+    parser.add_argument("--watch", action="store_true", help="Keep running and update the --output JSON whenever the notebook changes.")
+    parser.add_argument("--output-dir", help="Batch mode: convert every matched notebook into this directory.", default=None)
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of worker processes for batch mode, or for analyzing the cells of a large notebook (default: CPU count).")
+    parser.add_argument("--previous", metavar="FILE", default=None, help="Previously generated Curio JSON to update: unchanged cells keep their node ids and positions.")
+    parser.add_argument("--patch", metavar="FILE", default=None, help="With --previous, write the node/edge changes as a patch document to FILE.")
+    parser.add_argument("--layout", choices=LAYOUTS, default=config.LAYOUT_ALGORITHM, help="Node layout: one column per topological generation, or Sugiyama-style with bounded column height and fewer edge crossings.")
+    parser.add_argument("--coarsen", metavar="MIN", nargs="?", type=int, const=config.COARSEN_MIN_CHAIN, default=None, help=f"Fuse linear chains of at least MIN transform cells (default {config.COARSEN_MIN_CHAIN}) into single Curio nodes.")
+    parser.add_argument("--datasets", choices=DATASET_MODES, default=config.DATASET_MODE, help="How large inline Vega-Lite datasets are written: embedded in every spec, stored once in a shared section of the Curio JSON, stored once in a side file next to it, or dropped for preview-only exports.")
+    parser.add_argument("--dataset-threshold", metavar="BYTES", type=int, default=config.DATASET_MIN_BYTES, help=f"Datasets smaller than this, as compact JSON, stay in their spec (default {config.DATASET_MIN_BYTES}).")
+    parser.add_argument("--compact", action="store_true", help="Write the Curio JSON without indentation, including embedded Vega-Lite specs.")
+    parser.add_argument("--gzip", action="store_true", help="Gzip-compress the Curio JSON (implied by a .gz output path).")
+    parser.add_argument("--validate", action="store_true", help="Read the notebook with nbformat and validate it against the schema (slower, loads outputs into memory). Scripts are not validated.")
+    parser.add_argument("--rules", metavar="FILE", default=None, help="JSON file of keyword rules for categorizing cells, replacing the built-in keywords.")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the persistent cell analysis cache.")
+    parser.add_argument("--clear-cache", action="store_true", help="Empty the persistent cell analysis cache before running.")
+    parser.add_argument("--cache-dir", default=None, help="Directory holding the analysis cache (default: ~/.cache/nb2curio).")
+    parser.add_argument("--stats", nargs="?", const="text", choices=["text", "json"], default=None, help="Report per-stage timings, slowest cells, cache hit rates and peak memory.")
+    parser.add_argument("--stats-file", default=None, help="Write the --stats report to this file instead of stdout.")
+    parser.add_argument("--profile", metavar="FILE", default=None, help="Run the hot stages under cProfile and write the profile to FILE (implies --stats).")
     args = parser.parse_args()
     
-    converter = NotebookConverter(args.notebook_path)
+    cache_path = os.path.join(args.cache_dir, config.CACHE_FILENAME) if args.cache_dir else default_cache_path()
+    if args.clear_cache:
+        cache = AnalysisCache(cache_path)
+        cache.clear()
+        cache.close()
+        print(f"Cleared analysis cache at: {cache_path}")
+        if not args.notebook_path:
+            return
+    if not args.notebook_path:
+        parser.error("the following arguments are required: notebook_path")
+    cache_path = None if args.no_cache else cache_path
+    if args.output and args.output.endswith('.gz'):
+        args.gzip = True
+    elif args.output and args.gzip:
+        args.output += '.gz'
+    writer = CurioWriter(compact=args.compact, compress=args.gzip)
+    try:
+        rules = CategoryRules.from_file(args.rules) if args.rules else CategoryRules.default()
+    except RulesError as e:
+        parser.error(str(e))
+    if args.dataset_threshold < 0:
+        parser.error("--dataset-threshold must not be negative")
+    if args.coarsen is not None and args.coarsen < 2:
+        parser.error("--coarsen needs chains of at least 2 cells")
+    if args.render:
+        from .graph_renderer import GraphRenderer
+        try:
+            GraphRenderer.format_for(args.render)
+        except ValueError as e:
+            parser.error(str(e))
+    
+    if args.output_dir:
+        if STDIN_PATH in args.notebook_path:
+            parser.error("reading from stdin is not supported with --output-dir")
+        from .batch import BatchConverter
+        results = BatchConverter(args.output_dir, jobs=args.jobs, cache_path=cache_path,
+                                 writer=writer, rules=rules, layout=args.layout,
+                                 coarsen=args.coarsen, datasets=args.datasets,
+                                 dataset_min_bytes=args.dataset_threshold).run(args.notebook_path)
+        sys.exit(0 if results and all(r.ok for r in results) else 1)
+    if len(args.notebook_path) > 1:
+        parser.error("multiple notebooks require --output-dir")
+    if args.patch and not args.previous:
+        parser.error("--patch requires --previous")
+    if args.previous and not (args.output or args.patch):
+        parser.error("--previous requires --output or --patch")
+    
+    cache = AnalysisCache(cache_path, namespace=rules.fingerprint) if cache_path else None
+    stats = ConversionStats(profile_path=args.profile) if (args.stats or args.profile) else None
+    converter = NotebookConverter(args.notebook_path[0], cache=cache, stats=stats,
+                                  validate=args.validate, jobs=args.jobs, writer=writer, rules=rules,
+                                  layout=args.layout, coarsen=args.coarsen, datasets=args.datasets,
+                                  dataset_min_bytes=args.dataset_threshold)
     
-    if args.visualize:
-        converter.visualize()
-    elif args.output:
-        converter.convert_to_curio(args.output)
-    else:
-        print("\nNo output action specified. Use --output <file> to generate JSON or --visualize to see the graph.")
+    try:
+        if args.watch:
+            if not args.output:
+                parser.error("--watch requires --output")
+            if args.notebook_path[0] == STDIN_PATH:
+                parser.error("--watch cannot read from stdin")
+            from .watcher import NotebookWatcher
+            NotebookWatcher(args.notebook_path[0], args.output, analyzer=converter.analyzer, writer=writer,
+                            layout=args.layout, datasets=args.datasets,
+                            dataset_min_bytes=args.dataset_threshold, coarsen=args.coarsen).run()
+        elif args.visualize:
+            converter.visualize()
+        elif args.render:
+            converter.render(args.render)
+        elif args.previous:
+            converter.update_curio(args.previous, args.output, args.patch)
+        elif args.output:
+            converter.convert_to_curio(args.output)
+        else:
+            print("\nNo output action specified. Use --output <file> to generate JSON, --visualize to see the graph or --render <file> to draw it to SVG/HTML.")
+    except NotebookLoadError as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        converter.graph_builder.close()
+        if stats is not None:
+            converter.collect_cache_stats()
+            stats.write(args.stats or "text", args.stats_file)
+        elif cache is not None:
+            print(f"Analysis cache: {cache.hits} hits, {cache.misses} misses")
+        if cache is not None:
+            cache.close()
 
 if __name__ == "__main__":
     main()
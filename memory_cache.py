@@ -0,0 +1,98 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from .config import config
+from .data_models import CellAnalysis
+
+# Approximate cost of an entry beyond its strings and sets: the CellAnalysis
+# object, the ordered dict slot and the (analysis, size) tuple.
+_ENTRY_OVERHEAD = 256
+
+def _deep_size(value: Any) -> int:
+    """Approximates the memory held by a JSON-like value."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_size(k) + _deep_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(item) for item in value)
+    return size
+
+def analysis_size(source: str, analysis: CellAnalysis) -> int:
+    """Approximates the bytes an entry keeps alive, its source key included."""
+    size = _ENTRY_OVERHEAD + sys.getsizeof(source)
+    for names in (analysis.defined_vars, analysis.used_vars, analysis.pure_overwrites):
+        size += sys.getsizeof(names) + sum(sys.getsizeof(name) for name in names)
+    if analysis.vega_spec is not None:
+        size += _deep_size(analysis.vega_spec)
+    return size
+
+class MemoryCache:
+    """
+    In-process LRU cache of CellAnalysis results, bounded by entry count and by
+    an estimate of the memory the entries hold. Entries are keyed by the cell
+    source itself, so two sources can only share a result when they are equal.
+    Cached analyses are shared between lookups and must not be modified.
+    A capacity of zero disables the cache.
+    """
+
+    def __init__(self, max_entries: int = config.MEMORY_CACHE_MAX_ENTRIES,
+                 max_bytes: int = config.MEMORY_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._entries: "OrderedDict[str, Tuple[CellAnalysis, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, source: str) -> bool:
+        return source in self._entries
+
+    def get(self, source: str) -> Optional[CellAnalysis]:
+        """Returns the cached analysis for source, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(source)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(source)
+            return entry[0]
+
+    def put(self, source: str, analysis: CellAnalysis) -> None:
+        """Stores an analysis, evicting least recently used entries when over capacity."""
+        size = analysis_size(source, analysis)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            previous = self._entries.pop(source, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[source] = (analysis, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Removes every entry, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss/eviction counters and the current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions, "entries": len(self._entries),
+                "bytes": self.bytes, "max_entries": self.max_entries, "max_bytes": self.max_bytes,
+            }
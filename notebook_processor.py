@@ -1,39 +1,132 @@
+import os
 import sys
-from typing import List
-import nbformat
+from typing import List, Optional
 from .data_models import CodeCell
+from .notebook_reader import NotebookFormatError, read_code_cells, read_code_cells_from_buffer, minimal_nb_cell
+from .script_reader import looks_like_script, read_script, read_script_from_buffer
+
+# Path that makes the processor read the notebook or script from stdin.
+STDIN_PATH = '-'
+SCRIPT_EXTENSIONS = ('.py',)
+_SNIFF_BYTES = 64
+
+class NotebookLoadError(Exception):
+    """Raised when a notebook file cannot be found or parsed."""
+
+def looks_like_notebook(head: bytes) -> bool:
+    """Whether the leading bytes of a file are a JSON object, as in an .ipynb."""
+    return head.lstrip(b'\xef\xbb\xbf \t\r\n')[:1] == b'{'
 
 class NotebookProcessor:
-    """Handles processing of Jupyter notebook files."""
+    """
+    Handles processing of Jupyter notebook files. By default code cells are pulled
+    straight from the raw JSON without materializing outputs or NotebookNode
+    objects; with validate=True the notebook goes through nbformat instead. When
+    data holds the raw notebook JSON, it is used instead of reading the file and
+    notebook_path only names the notebook in messages; a notebook_path of '-'
+    reads it from stdin.
+
+    Percent-format scripts (cells delimited by "# %%") are read line by line by
+    the script reader and never reach nbformat. They are recognized by their .py
+    extension, or for other paths, stdin and data by not starting with a JSON
+    object and either having a cell marker or parsing as Python. Anything else
+    raises NotebookLoadError.
+    """
     
-    def __init__(self, notebook_path: str):
+    def __init__(self, notebook_path: str, validate: bool = False, data: Optional[bytes] = None):
         self.notebook_path = notebook_path
+        self.validate = validate
+        self.data = data
         self._notebook = None
+        self._code_cells: Optional[List[CodeCell]] = None
     
     def get_code_cells(self) -> List[CodeCell]:
         """Extracts all non-empty code cells from the notebook."""
+        if self._code_cells is None:
+            self._code_cells = self._read_code_cells()
+        return list(self._code_cells)
+    
+    def _read_code_cells(self) -> List[CodeCell]:
+        if self.data is None and self.notebook_path == STDIN_PATH:
+            self.data = sys.stdin.buffer.read()
+        try:
+            is_script = self._is_script()
+        except FileNotFoundError:
+            raise NotebookLoadError(f"Error: The file '{self.notebook_path}' was not found.") from None
+        except OSError as e:
+            raise NotebookLoadError(f"An error occurred while reading the file: {e}") from e
+        if is_script is None:
+            raise NotebookLoadError(f"Error: '{self.notebook_path}' is neither a notebook nor a percent-format script.")
+        if is_script:
+            return self._read_script()
+        if not self.validate:
+            try:
+                if self.data is not None:
+                    return read_code_cells_from_buffer(self.data)
+                return read_code_cells(self.notebook_path)
+            except FileNotFoundError:
+                raise NotebookLoadError(f"Error: The file '{self.notebook_path}' was not found.") from None
+            except OSError as e:
+                raise NotebookLoadError(f"An error occurred while reading the notebook file: {e}") from e
+            except (NotebookFormatError, ValueError, IndexError):
+                pass  # nbformat upgrades older formats and reports malformed files precisely.
+        
         if self._notebook is None:
             self._load_notebook()
-        
         return [
             CodeCell(
-                id=cell.metadata.get('id', f'cell_{i}'),
+                id=cell.metadata.get('id') or cell.get('id') or f'cell_{i}',
                 source=cell.source,
-                nb_cell=cell
+                nb_cell=minimal_nb_cell(cell.get('id'), dict(cell.metadata))
             )
             for i, cell in enumerate(self._notebook.cells)
             if cell.cell_type == 'code' and cell.source.strip()
         ]
     
+    def _is_script(self) -> Optional[bool]:
+        """
+        Chooses the reader: by extension for files, by sniffing the content
+        otherwise. Returns None for content that is neither format.
+        """
+        if self.data is not None:
+            return self._sniff(self.data)
+        extension = os.path.splitext(self.notebook_path)[1].lower()
+        if extension in SCRIPT_EXTENSIONS:
+            return True
+        if extension == '.ipynb':
+            return False
+        with open(self.notebook_path, 'rb') as f:
+            if looks_like_notebook(f.read(_SNIFF_BYTES)):
+                return False
+            f.seek(0)
+            return self._sniff(f.read())
+
+    @staticmethod
+    def _sniff(data: bytes) -> Optional[bool]:
+        if looks_like_notebook(data[:_SNIFF_BYTES]):
+            return False
+        return True if looks_like_script(data) else None
+    
+    def _read_script(self) -> List[CodeCell]:
+        try:
+            if self.data is not None:
+                return read_script_from_buffer(self.data)
+            return read_script(self.notebook_path)
+        except FileNotFoundError:
+            raise NotebookLoadError(f"Error: The file '{self.notebook_path}' was not found.") from None
+        except (UnicodeDecodeError, OSError) as e:
+            raise NotebookLoadError(f"An error occurred while reading the script file: {e}") from e
+    
     def _load_notebook(self) -> None:
-        """Loads the notebook from file."""
+        """Loads and validates the notebook from file with nbformat."""
+        import nbformat
         try:
+            if self.data is not None:
+                self._notebook = nbformat.reads(self.data.decode('utf-8'), as_version=4)
+                return
             with open(self.notebook_path, 'r', encoding='utf-8') as f:
                 self._notebook = nbformat.read(f, as_version=4)
         except FileNotFoundError:
-            print(f"Error: The file '{self.notebook_path}' was not found.")
-            sys.exit(1)
+            raise NotebookLoadError(f"Error: The file '{self.notebook_path}' was not found.") from None
         except Exception as e:
-            print(f"An error occurred while reading the notebook file: {e}")
-            sys.exit(1)
-            
\ No newline at end of file
+            raise NotebookLoadError(f"An error occurred while reading the notebook file: {e}") from e
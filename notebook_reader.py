@@ -0,0 +1,206 @@
+import json
+import mmap
+import re
+from typing import Any, Callable, Dict, List, Optional, Union
+from .data_models import CodeCell
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+_WHITESPACE = re.compile(rb'[ \t\n\r]*')
+_STRUCTURAL = re.compile(rb'["{}\[\]]')
+_SCALAR = re.compile(rb'[^,:}\]\s]+')
+# Remainder of a JSON string after an escape boundary, as an unrolled loop so
+# runs of plain bytes are consumed in C.
+_STRING_TAIL = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_ESCAPED_QUOTE_LIMIT = 16
+_QUOTE, _BACKSLASH = ord('"'), ord('\\')
+_OPEN = {ord('{'), ord('[')}
+_CLOSE = {ord('}'), ord(']')}
+
+# Keys of a code cell that later stages read; everything else (outputs,
+# attachments, execution counts) is skipped without being decoded.
+_CELL_KEYS = frozenset(['cell_type', 'id', 'source', 'metadata'])
+_RELEASE_CHUNK = 16 * 1024 * 1024
+
+class NotebookFormatError(ValueError):
+    """Raised when the buffer is not a notebook the fast reader can handle."""
+
+def _skip_ws(buf: Buffer, pos: int) -> int:
+    return _WHITESPACE.match(buf, pos).end()
+
+def _string_end(buf: Buffer, pos: int) -> int:
+    """Returns the index just past the JSON string starting at pos."""
+    # Jump between quote characters with find(), which skips base64 payloads at
+    # memory speed. Strings dense with escaped quotes (HTML outputs) switch to the
+    # regex after a few hits instead of looping in Python once per quote.
+    i = pos + 1
+    for _ in range(_ESCAPED_QUOTE_LIMIT):
+        q = buf.find(b'"', i)
+        if q < 0:
+            raise NotebookFormatError(f"unterminated string at offset {pos}")
+        j = q - 1
+        while buf[j] == _BACKSLASH:
+            j -= 1
+        if (q - 1 - j) % 2 == 0:
+            return q + 1
+        i = q + 1
+    match = _STRING_TAIL.match(buf, i)
+    if match is None:
+        raise NotebookFormatError(f"unterminated string at offset {pos}")
+    return match.end()
+
+def _value_end(buf: Buffer, pos: int) -> int:
+    """Returns the index just past the JSON value starting at pos, without decoding it."""
+    first = buf[pos]
+    if first == _QUOTE:
+        return _string_end(buf, pos)
+    if first not in _OPEN:
+        match = _SCALAR.match(buf, pos)
+        if match is None:
+            raise NotebookFormatError(f"unexpected character at offset {pos}")
+        return match.end()
+
+    depth, i = 0, pos
+    while True:
+        match = _STRUCTURAL.search(buf, i)
+        if match is None:
+            raise NotebookFormatError("unterminated container")
+        i = match.start()
+        ch = buf[i]
+        if ch == _QUOTE:
+            i = _string_end(buf, i)
+            continue
+        depth += 1 if ch in _OPEN else -1
+        i += 1
+        if depth == 0:
+            return i
+
+def _decode(buf: Buffer, start: int, end: int) -> Any:
+    return json.loads(bytes(buf[start:end]))
+
+def _scan_object(buf: Buffer, pos: int, on_member: Callable[[str, int], int]) -> int:
+    """
+    Walks the members of the object starting at pos. on_member receives each key
+    and the offset of its value and must return the offset just past that value.
+    """
+    pos = _skip_ws(buf, pos)
+    if buf[pos] != ord('{'):
+        raise NotebookFormatError(f"expected an object at offset {pos}")
+    pos = _skip_ws(buf, pos + 1)
+    if buf[pos] == ord('}'):
+        return pos + 1
+    while True:
+        key_end = _string_end(buf, pos)
+        key = _decode(buf, pos, key_end)
+        pos = _skip_ws(buf, key_end)
+        if buf[pos] != ord(':'):
+            raise NotebookFormatError(f"expected ':' at offset {pos}")
+        pos = _skip_ws(buf, on_member(key, _skip_ws(buf, pos + 1)))
+        if buf[pos] == ord('}'):
+            return pos + 1
+        if buf[pos] != ord(','):
+            raise NotebookFormatError(f"expected ',' or '}}' at offset {pos}")
+        pos = _skip_ws(buf, pos + 1)
+
+def _scan_array(buf: Buffer, pos: int, on_item: Callable[[int], int]) -> int:
+    """Walks the items of the array starting at pos, like _scan_object."""
+    if buf[pos] != ord('['):
+        raise NotebookFormatError(f"expected an array at offset {pos}")
+    pos = _skip_ws(buf, pos + 1)
+    if buf[pos] == ord(']'):
+        return pos + 1
+    while True:
+        pos = _skip_ws(buf, on_item(pos))
+        if buf[pos] == ord(']'):
+            return pos + 1
+        if buf[pos] != ord(','):
+            raise NotebookFormatError(f"expected ',' or ']' at offset {pos}")
+        pos = _skip_ws(buf, pos + 1)
+
+def _page_releaser(mm: mmap.mmap) -> Optional[Callable[[int], None]]:
+    """
+    Returns a callback that drops already-scanned pages of a read-only mapping
+    from the resident set, so peak memory tracks the largest cell rather than
+    the whole file. The pages stay in the OS page cache.
+    """
+    if not hasattr(mm, 'madvise') or not hasattr(mmap, 'MADV_DONTNEED'):
+        return None
+    released = 0
+
+    def release(upto: int) -> None:
+        nonlocal released
+        upto -= upto % mmap.PAGESIZE
+        if upto - released >= _RELEASE_CHUNK:
+            mm.madvise(mmap.MADV_DONTNEED, released, upto - released)
+            released = upto
+    return release
+
+def read_code_cells_from_buffer(buf: Buffer, release: Optional[Callable[[int], None]] = None) -> List[CodeCell]:
+    """
+    Extracts non-empty code cells from the raw bytes of an nbformat 4 notebook.
+    Only the cell type, id, source and metadata of each cell are decoded; outputs
+    and other payloads are skipped by scanning for their closing delimiter.
+    """
+    raw_cells: List[Dict[str, Any]] = []
+    header: Dict[str, Any] = {}
+
+    def on_cell_member(cell: Dict[str, Any]) -> Callable[[str, int], int]:
+        def handle(key: str, pos: int) -> int:
+            end = _value_end(buf, pos)
+            if key in _CELL_KEYS:
+                cell[key] = _decode(buf, pos, end)
+            return end
+        return handle
+
+    def on_cell(pos: int) -> int:
+        cell: Dict[str, Any] = {}
+        end = _scan_object(buf, pos, on_cell_member(cell))
+        raw_cells.append(cell)
+        if release is not None:
+            release(end)
+        return end
+
+    def on_top_member(key: str, pos: int) -> int:
+        if key == 'cells':
+            return _scan_array(buf, pos, on_cell)
+        end = _value_end(buf, pos)
+        if key in ('nbformat', 'worksheets'):
+            header[key] = _decode(buf, pos, end) if key == 'nbformat' else True
+        return end
+
+    _scan_object(buf, 0, on_top_member)
+    if header.get('nbformat', 4) < 4 or 'worksheets' in header:
+        raise NotebookFormatError("notebook predates nbformat 4")
+
+    code_cells = []
+    for i, cell in enumerate(raw_cells):
+        if cell.get('cell_type') != 'code':
+            continue
+        source = cell.get('source', '')
+        if isinstance(source, list):
+            source = ''.join(source)
+        if not source.strip():
+            continue
+        metadata = cell.get('metadata') or {}
+        code_cells.append(CodeCell(
+            id=metadata.get('id') or cell.get('id') or f'cell_{i}',
+            source=source,
+            nb_cell=minimal_nb_cell(cell.get('id'), metadata)
+        ))
+    return code_cells
+
+def read_code_cells(path: str) -> List[CodeCell]:
+    """Memory-maps a notebook file and extracts its code cells."""
+    with open(path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty files cannot be mapped.
+            raise NotebookFormatError("notebook file is empty") from None
+    with mm:
+        if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        return read_code_cells_from_buffer(mm, _page_releaser(mm))
+
+def minimal_nb_cell(cell_id: Optional[str], metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """The subset of a notebook cell kept on CodeCell.nb_cell."""
+    return {"id": cell_id, "cell_type": "code", "metadata": metadata}
@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+from .code_analyzer import CodeAnalyzer
+from .spec_extractor import AltairSpecExtractor
+from .category_rules import CategoryRules
+from .data_models import CellAnalysis
+from .config import config
+
+TimedAnalysis = Tuple[Optional[CellAnalysis], float]
+
+# Per-process analyzer, created once by the pool initializer.
+_analyzer: Optional[CodeAnalyzer] = None
+
+def _init_worker(rules: Optional[CategoryRules] = None) -> None:
+    global _analyzer
+    # Altair cells are never sent to workers, so this extractor never starts a subprocess.
+    _analyzer = CodeAnalyzer(spec_extractor=AltairSpecExtractor(workers=1), rules=rules)
+
+def _analyze_chunk(sources: List[str]) -> List[TimedAnalysis]:
+    return _analyze_sources(_analyzer, sources)
+
+def _analyze_sources(analyzer: CodeAnalyzer, sources: List[str]) -> List[TimedAnalysis]:
+    results = []
+    for source in sources:
+        start = time.perf_counter()
+        analysis = analyzer.analyze_source(source)
+        results.append((analysis, time.perf_counter() - start))
+    return results
+
+def _chunk(indices: List[int], sources: List[str], target_chars: int) -> List[List[int]]:
+    """Splits indices into contiguous runs of roughly target_chars of source each."""
+    chunks, current, size = [], [], 0
+    for i in indices:
+        current.append(i)
+        size += len(sources[i])
+        if size >= target_chars:
+            chunks.append(current)
+            current, size = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+class ParallelCellAnalyzer:
+    """
+    Analyzes the cells of a single notebook on a pool of worker processes.
+    Cache lookups and writes, and cells that need Altair spec
+    extraction, stay in the calling process; the remaining cells are sent in
+    contiguous chunks and merged back by position, so the result never depends
+    on scheduling. When little uncached source is left, cells are analyzed
+    serially instead of paying for the pool.
+    """
+
+    def __init__(self, analyzer: CodeAnalyzer, jobs: Optional[int] = None,
+                 min_source_chars: int = config.PARALLEL_MIN_SOURCE_CHARS):
+        self.analyzer = analyzer
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        self.min_source_chars = min_source_chars
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # The analyzer may be shared by request threads, as in the server.
+        self._executor_lock = threading.Lock()
+
+    def analyze(self, sources: List[str]) -> List[Tuple[CellAnalysis, float]]:
+        """Returns (analysis, seconds) for every source, in order."""
+        results: List[Optional[Tuple[CellAnalysis, float]]] = [None] * len(sources)
+        pending = []
+        for i, source in enumerate(sources):
+            start = time.perf_counter()
+            if 'alt.Chart' in source:
+                results[i] = (self.analyzer.analyze_dependencies(source), time.perf_counter() - start)
+                continue
+            cached = self.analyzer.cached_analysis(source)
+            if cached is not None:
+                results[i] = (cached, time.perf_counter() - start)
+            else:
+                pending.append(i)
+
+        for i, (analysis, seconds) in zip(pending, self._analyze_pending(pending, sources)):
+            if analysis is None:
+                analysis = CellAnalysis(set(), set(), set(), "other")
+            else:
+                self.analyzer.store_analysis(sources[i], analysis)
+            results[i] = (analysis, seconds)
+        return results
+
+    def _analyze_pending(self, pending: List[int], sources: List[str]) -> List[TimedAnalysis]:
+        total_chars = sum(len(sources[i]) for i in pending)
+        if self.jobs == 1 or total_chars < self.min_source_chars:
+            return _analyze_sources(self.analyzer, [sources[i] for i in pending])
+
+        # A few chunks per worker keeps the pool balanced when cell sizes vary.
+        target = max(config.PARALLEL_MIN_CHUNK_CHARS, total_chars // (self.jobs * 4))
+        chunks = [[sources[i] for i in chunk] for chunk in _chunk(pending, sources, target)]
+        try:
+            return [result for chunk in self._pool().map(_analyze_chunk, chunks) for result in chunk]
+        except (BrokenProcessPool, OSError) as e:
+            print(f"Warning: Parallel analysis failed ({e}); analyzing cells serially.")
+            self.close()
+            return _analyze_sources(self.analyzer, [sources[i] for i in pending])
+
+    def _pool(self) -> ProcessPoolExecutor:
+        """Returns the worker pool, starting it on first use."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.jobs, initializer=_init_worker, initargs=(self.analyzer.rules,)
+                )
+            return self._executor
+
+    def close(self) -> None:
+        """Shuts down the worker pool, if one was started."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
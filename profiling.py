@@ -0,0 +1,107 @@
+import cProfile
+import heapq
+import json
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak memory is reported as unknown.
+    resource = None
+
+def peak_memory_bytes() -> Optional[int]:
+    """Returns the peak resident set size of the current process, if known."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class ConversionStats:
+    """
+    Collects per-stage wall time, per-cell analysis time, cache counters and peak
+    memory for one conversion. When profile_path is set, the hot stages are also
+    run under cProfile and the combined profile is written there.
+    """
+
+    def __init__(self, profile_path: Optional[str] = None, slowest_cells: int = 10):
+        self.stages: Dict[str, float] = {}
+        self.cell_times: List[Tuple[float, str]] = []
+        self.caches: Dict[str, Dict[str, Any]] = {}
+        self.slowest_cells = slowest_cells
+        self.profile_path = profile_path
+        self._profiler = cProfile.Profile() if profile_path else None
+
+    @contextmanager
+    def stage(self, name: str, profile: bool = True) -> Iterator[None]:
+        """Times a pipeline stage; repeated stages accumulate."""
+        profiling = self._profiler is not None and profile
+        if profiling:
+            self._profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+            if profiling:
+                self._profiler.disable()
+
+    def record_cell(self, cell_id: str, seconds: float) -> None:
+        self.cell_times.append((seconds, cell_id))
+
+    def record_cache(self, name: str, hits: int, misses: int, **extra: Any) -> None:
+        lookups = hits + misses
+        self.caches[name] = {
+            "hits": hits, "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0, **extra
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """Returns all collected measurements as a JSON-serializable dict."""
+        slowest = heapq.nlargest(self.slowest_cells, self.cell_times)
+        return {
+            "stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "total_seconds": round(sum(self.stages.values()), 6),
+            "cells": {
+                "count": len(self.cell_times),
+                "total_seconds": round(sum(t for t, _ in self.cell_times), 6),
+                "slowest": [{"cell_id": cell_id, "seconds": round(t, 6)} for t, cell_id in slowest],
+            },
+            "caches": self.caches,
+            "peak_memory_bytes": peak_memory_bytes(),
+        }
+
+    def format_text(self) -> str:
+        """Formats the report for humans."""
+        report = self.report()
+        lines = ["\nConversion statistics", "  Stage timings:"]
+        for name, seconds in report["stages"].items():
+            lines.append(f"    {name:<12} {seconds * 1000:10.2f} ms")
+        lines.append(f"    {'total':<12} {report['total_seconds'] * 1000:10.2f} ms")
+
+        cells = report["cells"]
+        if cells["count"]:
+            lines.append(f"  Cell analysis: {cells['count']} cells, {cells['total_seconds'] * 1000:.2f} ms")
+            for entry in cells["slowest"]:
+                lines.append(f"    {entry['seconds'] * 1000:10.2f} ms  {entry['cell_id']}")
+        for name, cache in report["caches"].items():
+            evictions = f", {cache['evictions']} evictions" if "evictions" in cache else ""
+            lines.append(f"  {name} cache: {cache['hits']} hits, {cache['misses']} misses "
+                         f"({cache['hit_rate']:.0%} hit rate{evictions})")
+        if report["peak_memory_bytes"] is not None:
+            lines.append(f"  Peak memory: {report['peak_memory_bytes'] / (1024 * 1024):.1f} MiB")
+        return "\n".join(lines)
+
+    def write(self, fmt: str = "text", path: Optional[str] = None) -> None:
+        """Emits the report as text or JSON to path or stdout, and dumps the profile."""
+        output = json.dumps(self.report(), indent=2) if fmt == "json" else self.format_text()
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(output + "\n")
+        else:
+            print(output)
+        if self._profiler is not None:
+            self._profiler.dump_stats(self.profile_path)
+            print(f"\ncProfile data written to: {self.profile_path}")
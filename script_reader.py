@@ -0,0 +1,82 @@
+import ast
+import io
+import re
+from typing import Iterable, List, Optional
+from .data_models import CodeCell
+from .notebook_reader import minimal_nb_cell
+
+# A percent-format cell marker as written by jupytext, VS Code and Spyder:
+# "# %%" at the start of a line, optionally followed by a title, a [cell type]
+# and metadata. Indented "# %%" comments inside a block and commented cell
+# magics such as "# %%time" are not markers.
+_MARKER = re.compile(r'#\s*%%(?:\s+(.*?))?\s*$')
+_CELL_TYPE = re.compile(r'\[(\w+)\]')
+_TEXT_CELL_TYPES = frozenset(['markdown', 'md', 'raw'])
+
+def _is_comment_or_blank(line: str) -> bool:
+    stripped = line.lstrip()
+    return not stripped or stripped.startswith('#')
+
+def read_script_cells(lines: Iterable[str]) -> List[CodeCell]:
+    """
+    Splits the lines of a percent-format Python script into code cells as they
+    are read, without building a notebook. Markdown and raw cells are skipped but
+    still counted, so ids are positions in the file as for notebooks whose cells
+    carry no id. Code before the first marker is a cell of its own unless it is
+    only comments, such as a jupytext header. A script without markers is a
+    single cell.
+    """
+    code_cells: List[CodeCell] = []
+    index = 0
+    cell_type: Optional[str] = None  # None while in the lines before the first marker
+    body: List[str] = []
+
+    def finish() -> None:
+        nonlocal index
+        if cell_type is None and all(_is_comment_or_blank(line) for line in body):
+            return
+        source = ''.join(body).strip('\n').rstrip()
+        if cell_type not in _TEXT_CELL_TYPES and source.strip():
+            code_cells.append(CodeCell(id=f'cell_{index}', source=source, nb_cell=minimal_nb_cell(None, {})))
+        index += 1
+
+    for line in lines:
+        match = _MARKER.match(line)
+        if match is None:
+            body.append(line)
+            continue
+        finish()
+        options = match.group(1) or ''
+        declared = _CELL_TYPE.search(options)
+        cell_type = declared.group(1).lower() if declared else 'code'
+        body = []
+    finish()
+    return code_cells
+
+def read_script(path: str) -> List[CodeCell]:
+    """Reads the code cells of a percent-format script file line by line."""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        return read_script_cells(f)
+
+def read_script_from_buffer(data: bytes) -> List[CodeCell]:
+    """Reads the code cells of a percent-format script held in memory."""
+    return read_script_cells(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8-sig'))
+
+def looks_like_script(data: bytes) -> bool:
+    """Whether content that is not a notebook is a script: it has a cell marker or parses as Python."""
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return False
+    if any(_MARKER.match(line) for line in text.splitlines()):
+        return True
+    try:
+        ast.parse(text)
+    except (SyntaxError, ValueError):
+        return False
+    return True
+
+def is_percent_script(path: str) -> bool:
+    """Whether a .py file has a percent-format cell marker, reading only up to the first one."""
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        return any(_MARKER.match(line) for line in f)
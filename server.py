@@ -0,0 +1,334 @@
+"""
+Long-running conversion server.
+
+Keeps a warm analyzer, graph builder and converter in memory and converts
+notebooks posted over a local HTTP or Unix socket endpoint:
+
+    python -m notebook_converter.main serve --port 8765
+    curl --data-binary @notebook.ipynb http://127.0.0.1:8765/convert
+
+Endpoints:
+    POST /convert   Body is the .ipynb JSON or a percent-format script; responds
+                    with the Curio JSON. Query parameters: compact=1, validate=1.
+    GET  /health    Liveness and uptime.
+    GET  /metrics   Request counts, latency histograms and cache hit rates as
+                    JSON, or in the Prometheus text format with ?format=prometheus.
+"""
+import argparse
+import bisect
+import io
+import json
+import os
+import signal
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from .notebook_processor import NotebookProcessor, NotebookLoadError
+from .code_analyzer import CodeAnalyzer
+from .graph_builder import DependencyGraphBuilder
+from .curio_converter import CurioConverter
+from .curio_writer import CurioWriter
+from .analysis_cache import AnalysisCache, default_cache_path
+from .memory_cache import MemoryCache
+from .graph_layout import LAYOUTS
+from .category_rules import CategoryRules, RulesError
+from .config import config
+
+ENDPOINTS = ("/convert", "/health", "/metrics")
+
+class ServerMetrics:
+    """Request counters and per-endpoint latency histograms, safe to update from any thread."""
+
+    def __init__(self, buckets: Tuple[float, ...] = config.SERVER_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.started = time.time()
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, int], int] = {}
+        # Per endpoint: a count for each bucket plus one for +Inf, and the sum of latencies.
+        self._histograms: Dict[str, List[int]] = {}
+        self._sums: Dict[str, float] = {}
+
+    def begin(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def observe(self, endpoint: str, status: int, seconds: float) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._requests[(endpoint, status)] = self._requests.get((endpoint, status), 0) + 1
+            counts = self._histograms.setdefault(endpoint, [0] * (len(self.buckets) + 1))
+            counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self._sums[endpoint] = self._sums.get(endpoint, 0.0) + seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the counters with cumulative histogram buckets, as Prometheus defines them."""
+        with self._lock:
+            requests = dict(self._requests)
+            histograms = {endpoint: list(counts) for endpoint, counts in self._histograms.items()}
+            sums = dict(self._sums)
+            in_flight = self.in_flight
+        latency = {}
+        for endpoint, counts in histograms.items():
+            cumulative, running = [], 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                running += count
+                cumulative.append({"le": "+Inf" if bound == float('inf') else bound, "count": running})
+            latency[endpoint] = {"buckets": cumulative, "count": running, "sum_seconds": round(sums[endpoint], 6)}
+        return {
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "in_flight": in_flight,
+            "requests": [
+                {"endpoint": endpoint, "status": status, "count": count}
+                for (endpoint, status), count in sorted(requests.items())
+            ],
+            "latency": latency,
+        }
+
+def _prometheus(snapshot: Dict[str, Any]) -> str:
+    """Renders a metrics snapshot in the Prometheus text exposition format."""
+    lines = [
+        "# TYPE nb2curio_uptime_seconds gauge",
+        f"nb2curio_uptime_seconds {snapshot['uptime_seconds']}",
+        "# TYPE nb2curio_in_flight_requests gauge",
+        f"nb2curio_in_flight_requests {snapshot['in_flight']}",
+        "# TYPE nb2curio_requests_total counter",
+    ]
+    for entry in snapshot["requests"]:
+        lines.append(f'nb2curio_requests_total{{endpoint="{entry["endpoint"]}",status="{entry["status"]}"}} {entry["count"]}')
+    lines.append("# TYPE nb2curio_request_duration_seconds histogram")
+    for endpoint, histogram in snapshot["latency"].items():
+        for bucket in histogram["buckets"]:
+            lines.append(f'nb2curio_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bucket["le"]}"}} {bucket["count"]}')
+        lines.append(f'nb2curio_request_duration_seconds_sum{{endpoint="{endpoint}"}} {histogram["sum_seconds"]}')
+        lines.append(f'nb2curio_request_duration_seconds_count{{endpoint="{endpoint}"}} {histogram["count"]}')
+    for metric, key in (("cache_hits_total", "hits"), ("cache_misses_total", "misses"), ("cache_hit_ratio", "hit_rate")):
+        lines.append(f"# TYPE nb2curio_{metric} {'gauge' if key == 'hit_rate' else 'counter'}")
+        for name, cache in snapshot["caches"].items():
+            lines.append(f'nb2curio_{metric}{{cache="{name}"}} {cache[key]}')
+    lines.append("# TYPE nb2curio_cache_evictions_total counter")
+    for name, cache in snapshot["caches"].items():
+        if "evictions" in cache:
+            lines.append(f'nb2curio_cache_evictions_total{{cache="{name}"}} {cache["evictions"]}')
+    lines.append("# TYPE nb2curio_cache_bytes gauge")
+    for name, cache in snapshot["caches"].items():
+        if "bytes" in cache:
+            lines.append(f'nb2curio_cache_bytes{{cache="{name}"}} {cache["bytes"]}')
+    return "\n".join(lines) + "\n"
+
+def _cache_entry(hits: int, misses: int) -> Dict[str, Any]:
+    lookups = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / lookups if lookups else 0.0}
+
+class ConversionService:
+    """
+    The warm conversion pipeline shared by every request thread. At most
+    max_concurrent conversions run at once; further requests wait for a slot.
+    """
+
+    def __init__(self, cache: Optional[AnalysisCache] = None, jobs: Optional[int] = 1,
+                 max_concurrent: int = config.SERVER_MAX_CONCURRENT, rules: Optional[CategoryRules] = None,
+                 memory_cache: Optional[MemoryCache] = None, layout: Optional[str] = None):
+        self.cache = cache
+        self.analyzer = CodeAnalyzer(cache=cache, rules=rules, memory_cache=memory_cache)
+        self.graph_builder = DependencyGraphBuilder(self.analyzer, jobs=jobs)
+        self._outputs = {
+            compact: (CurioConverter(compact=compact, layout=layout), CurioWriter(compact=compact))
+            for compact in (False, True)
+        }
+        self.metrics = ServerMetrics()
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrent))
+
+    def warm_up(self) -> None:
+        """Starts the Altair extraction workers before the first request needs them."""
+        self.analyzer.spec_extractor.start()
+
+    def convert(self, data: bytes, compact: bool = False, validate: bool = False) -> Optional[bytes]:
+        """
+        Converts raw notebook JSON or percent-format script text to Curio JSON.
+        Returns None when the notebook has no code cells; raises NotebookLoadError
+        when it cannot be read.
+        """
+        with self._slots:
+            code_cells = NotebookProcessor("<request body>", validate=validate, data=data).get_code_cells()
+            if not code_cells:
+                return None
+            graph = self.graph_builder.build_graph(code_cells)
+            converter, writer = self._outputs[compact]
+            output = io.BytesIO()
+            writer.write_to(output, converter.dataflow(graph))
+            return output.getvalue()
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        extractor = self.analyzer.spec_extractor
+        caches = {"altair_spec": _cache_entry(extractor.hits, extractor.misses),
+                  "memory": self.analyzer.memory_cache.stats()}
+        if self.cache is not None:
+            caches["analysis"] = self.cache.stats()
+        return caches
+
+    def close(self) -> None:
+        self.graph_builder.close()
+        self.analyzer.spec_extractor.close()
+        if self.cache is not None:
+            self.cache.close()
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    """Routes requests to the server's ConversionService and records their latency."""
+    protocol_version = "HTTP/1.1"
+    server_version = "nb2curio"
+
+    def do_GET(self) -> None:
+        self._handle(self._get)
+
+    def do_POST(self) -> None:
+        self._handle(self._post)
+
+    def _handle(self, route) -> None:
+        metrics = self.server.service.metrics
+        url = urlsplit(self.path)
+        endpoint = url.path if url.path in ENDPOINTS else "other"
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        metrics.begin()
+        start = time.perf_counter()
+        status = 500
+        try:
+            status, body, content_type = route(url.path, query)
+        except Exception as e:  # Never let one request take the server down.
+            status, body, content_type = 500, self._error(f"{type(e).__name__}: {e}"), "application/json"
+        finally:
+            metrics.observe(endpoint, status, time.perf_counter() - start)
+        self._send(status, body, content_type)
+
+    def _get(self, path: str, query: Dict[str, str]) -> Tuple[int, bytes, str]:
+        service = self.server.service
+        if path == "/health":
+            body = {"status": "ok", "uptime_seconds": round(time.time() - service.metrics.started, 3)}
+            return 200, json.dumps(body).encode('utf-8'), "application/json"
+        if path == "/metrics":
+            snapshot = service.metrics.snapshot()
+            snapshot["caches"] = service.cache_stats()
+            if query.get("format") == "prometheus":
+                return 200, _prometheus(snapshot).encode('utf-8'), "text/plain; version=0.0.4"
+            return 200, json.dumps(snapshot, indent=2).encode('utf-8'), "application/json"
+        return 404, self._error(f"unknown endpoint: {path}"), "application/json"
+
+    def _post(self, path: str, query: Dict[str, str]) -> Tuple[int, bytes, str]:
+        if path != "/convert":
+            return 404, self._error(f"unknown endpoint: {path}"), "application/json"
+        header = self.headers.get("Content-Length")
+        if header is None:
+            self.close_connection = True
+            return 411, self._error("Content-Length is required"), "application/json"
+        try:
+            length = int(header)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            return 400, self._error(f"invalid Content-Length: {header}"), "application/json"
+        if length > config.SERVER_MAX_BODY_BYTES:
+            self.close_connection = True
+            return 413, self._error("notebook exceeds the maximum request size"), "application/json"
+        data = self.rfile.read(length)
+
+        try:
+            result = self.server.service.convert(
+                data, compact=query.get("compact") == "1", validate=query.get("validate") == "1"
+            )
+        except NotebookLoadError as e:
+            return 400, self._error(str(e)), "application/json"
+        if result is None:
+            return 422, self._error("No code cells found in the notebook."), "application/json"
+        return 200, result, "application/json"
+
+    @staticmethod
+    def _error(message: str) -> bytes:
+        return json.dumps({"error": message}).encode('utf-8')
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address.
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class _TCPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def make_server(service: ConversionService, host: str = config.SERVER_HOST, port: int = config.SERVER_PORT,
+                socket_path: Optional[str] = None, verbose: bool = False) -> socketserver.BaseServer:
+    """Binds a threaded HTTP server on host:port, or on a Unix socket when socket_path is set."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixServer(socket_path, ConversionRequestHandler)
+    else:
+        server = _TCPServer((host, port), ConversionRequestHandler)
+    server.service = service
+    server.verbose = verbose
+    return server
+
+def _interrupt(signum, frame) -> None:
+    raise KeyboardInterrupt
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="main serve", description="Serve notebook conversions from a warm, long-running process.")
+    parser.add_argument("--host", default=config.SERVER_HOST, help="Interface to listen on.")
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT, help="TCP port (0 picks a free one).")
+    parser.add_argument("--socket", default=None, help="Listen on this Unix socket path instead of TCP.")
+    parser.add_argument("--max-concurrent", type=int, default=config.SERVER_MAX_CONCURRENT, help="Conversions allowed to run at once.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes for analyzing the cells of large notebooks.")
+    parser.add_argument("--rules", metavar="FILE", default=None, help="JSON file of keyword rules for categorizing cells.")
+    parser.add_argument("--layout", choices=LAYOUTS, default=config.LAYOUT_ALGORITHM, help="Node layout of the returned dataflows.")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the persistent cell analysis cache.")
+    parser.add_argument("--cache-dir", default=None, help="Directory holding the analysis cache (default: ~/.cache/nb2curio).")
+    parser.add_argument("--memory-cache-mb", type=float, default=config.MEMORY_CACHE_MAX_BYTES / (1024 * 1024),
+                        help="Memory budget of the in-process analysis cache in MiB (0 disables it).")
+    parser.add_argument("--verbose", action="store_true", help="Log every request to stderr.")
+    args = parser.parse_args(argv)
+    try:
+        rules = CategoryRules.from_file(args.rules) if args.rules else CategoryRules.default()
+    except RulesError as e:
+        parser.error(str(e))
+
+    cache = None
+    if not args.no_cache:
+        cache_path = os.path.join(args.cache_dir, config.CACHE_FILENAME) if args.cache_dir else default_cache_path()
+        cache = AnalysisCache(cache_path, namespace=rules.fingerprint)
+    memory_cache = MemoryCache(max_bytes=int(args.memory_cache_mb * 1024 * 1024))
+    service = ConversionService(cache=cache, jobs=args.jobs, max_concurrent=args.max_concurrent, rules=rules,
+                                memory_cache=memory_cache, layout=args.layout)
+    service.warm_up()
+    server = make_server(service, args.host, args.port, args.socket, args.verbose)
+
+    # Process managers stop services with SIGTERM; unwind through the cleanup below.
+    signal.signal(signal.SIGTERM, _interrupt)
+    if args.socket:
+        print(f"Listening on unix:{args.socket}", flush=True)
+    else:
+        host, port = server.server_address[:2]
+        print(f"Listening on http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
@@ -0,0 +1,116 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional, Tuple
+from .config import config
+
+# How inline Vega-Lite datasets at or above the size threshold are written:
+# "inline" leaves specs untouched, "shared" stores each unique dataset once in a
+# "datasets" section of the Curio JSON, "file" stores them in a side file next
+# to it, and "drop" replaces them with empty data for preview-only exports.
+DATASET_MODES = ("inline", "shared", "file", "drop")
+
+class DatasetStore:
+    """
+    Moves large inline datasets out of the Vega-Lite specs of one dataflow.
+    Datasets are named by a hash of their content, so charts that plot the same
+    data share one entry however many nodes embed it. Specs then reference the
+    entry as a named data source, {"name": "data-<hash>"}, with Vega-Lite's own
+    semantics: a renderer supplies the stored datasets as the spec's "datasets".
+    Specs are rewritten by copying only the parts that change, so analyses held
+    in caches are never modified.
+    """
+
+    def __init__(self, mode: str = "inline", min_bytes: int = config.DATASET_MIN_BYTES):
+        if mode not in DATASET_MODES:
+            raise ValueError(f"unknown dataset mode: {mode}; expected one of: {', '.join(DATASET_MODES)}")
+        self.mode = mode
+        self.min_bytes = min_bytes
+        self.datasets: Dict[str, Any] = {}
+        self.references = 0
+        self.bytes_removed = 0
+        # Values already measured, by object id; the values are kept so ids stay unique.
+        self._seen: Dict[int, Tuple[Any, Optional[str], int]] = {}
+
+    def rewrite(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns spec with its large datasets moved to the store, or emptied in drop mode."""
+        if self.mode == "inline":
+            return spec
+        renamed: Dict[str, str] = {}
+        datasets = spec.get("datasets")
+        if isinstance(datasets, dict) and datasets:
+            kept, moved = {}, False
+            for name, values in datasets.items():
+                key = self._externalize(values)
+                if key is None:
+                    kept[name] = values
+                    continue
+                moved = True
+                if self.mode == "drop":
+                    kept[name] = []
+                else:
+                    renamed[name] = key
+            if moved:
+                spec = {k: v for k, v in spec.items() if k != "datasets"}
+                if kept:
+                    spec["datasets"] = kept
+        return self._rewrite_sources(spec, renamed)
+
+    def _rewrite_sources(self, value: Any, renamed: Dict[str, str]) -> Any:
+        """Rewrites every data source below value, copying only the containers that change."""
+        if isinstance(value, list):
+            items = [self._rewrite_sources(item, renamed) for item in value]
+            return items if any(new is not old for new, old in zip(items, value)) else value
+        if not isinstance(value, dict):
+            return value
+        changed = {}
+        for key, item in value.items():
+            if key == "datasets":
+                continue
+            if key == "data" and isinstance(item, dict):
+                new = self._rewrite_source(item, renamed)
+            else:
+                new = self._rewrite_sources(item, renamed)
+            if new is not item:
+                changed[key] = new
+        return {**value, **changed} if changed else value
+
+    def _rewrite_source(self, data: Dict[str, Any], renamed: Dict[str, str]) -> Dict[str, Any]:
+        name = data.get("name")
+        if isinstance(name, str) and name in renamed:
+            self.references += 1
+            return {**data, "name": renamed[name]}
+        values = data.get("values")
+        if not isinstance(values, (list, dict, str)):
+            return data
+        key = self._externalize(values)
+        if key is None:
+            return data
+        if self.mode == "drop":
+            return {**data, "values": []}
+        self.references += 1
+        source = {k: v for k, v in data.items() if k != "values"}
+        source["name"] = key
+        return source
+
+    def _externalize(self, values: Any) -> Optional[str]:
+        """Returns the content name of values when they are at or above the threshold, storing them once."""
+        seen = self._seen.get(id(values))
+        if seen is None:
+            encoded = json.dumps(values, separators=(',', ':'), sort_keys=True).encode('utf-8')
+            key = None
+            if len(encoded) >= self.min_bytes:
+                key = "data-" + hashlib.sha256(encoded).hexdigest()[:32]
+            seen = self._seen[id(values)] = (values, key, len(encoded))
+        _, key, size = seen
+        if key is not None:
+            self.bytes_removed += size
+            if self.mode != "drop":
+                self.datasets.setdefault(key, values)
+        return key
+
+    def summary(self) -> str:
+        if self.mode == "drop":
+            return f"{self.bytes_removed / 1e6:.1f} MB of inline data dropped from specs"
+        stored = sum(self._seen[id(values)][2] for values in self.datasets.values())
+        return (f"{len(self.datasets)} unique datasets ({stored / 1e6:.1f} MB) stored once for "
+                f"{self.references} references, {self.bytes_removed / 1e6:.1f} MB removed from specs")
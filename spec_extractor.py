@@ -0,0 +1,272 @@
+import ast
+import atexit
+import hashlib
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Union
+from .config import config
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; memory limits are skipped there.
+    resource = None
+
+class SpecExtractionError(Exception):
+    """Raised when a worker timed out or crashed, as opposed to a cell that yields no chart."""
+
+# Cache entry for a cell whose extraction failed, so it is not retried in this process.
+_FAILED = object()
+
+def _limit_memory(limit_mb: int) -> None:
+    """Caps the address space of the current process at its size plus limit_mb."""
+    if resource is None or not limit_mb:
+        return
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        current = 0
+    limit = current + limit_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError):
+        pass
+
+def _evaluate_chart(code: str, modules: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Executes cleaned cell code in a fresh namespace and returns the spec of the
+    Altair chart produced by its final expression.
+    """
+    tree = ast.parse(code)
+    if not tree.body or not isinstance(tree.body[-1], ast.Expr):
+        return None
+
+    exec_namespace = dict(modules)
+    exec_namespace['df'] = modules['pd'].DataFrame()
+
+    main_code_block = ast.Module(body=tree.body[:-1], type_ignores=[])
+    last_expression = ast.Expression(body=tree.body[-1].value)
+
+    exec(compile(main_code_block, filename='<ast>', mode='exec'), exec_namespace)
+    chart_object = eval(compile(last_expression, filename='<ast>', mode='eval'), exec_namespace)
+
+    if hasattr(chart_object, 'to_dict'):
+        return chart_object.to_dict()
+    return None
+
+def _worker_main() -> None:
+    """
+    Worker loop, run as `python -m <package>.spec_extractor`. Pre-imports the charting
+    stack once, then evaluates one cell per JSON line read from stdin and answers
+    with one JSON line on stdout.
+    """
+    # Keep private handles on the protocol pipes and point fds 0/1 at devnull so
+    # cells that print or read input cannot corrupt the protocol.
+    proto_in = os.fdopen(os.dup(0), 'r', encoding='utf-8')
+    proto_out = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    sys.stdin, sys.stdout = open(os.devnull), open(os.devnull, 'w')
+
+    def reply(message: Dict[str, Any]) -> None:
+        proto_out.write(json.dumps(message) + "\n")
+        proto_out.flush()
+
+    try:
+        import pandas as pd
+        import altair as alt
+        from vega_datasets import data
+        modules = {'alt': alt, 'pd': pd, 'data': data}
+    except Exception:
+        modules = None
+    _limit_memory(int(sys.argv[1]) if len(sys.argv) > 1 else 0)
+    reply({"ready": True})
+
+    for line in proto_in:
+        code = json.loads(line)["code"]
+        spec = None
+        if modules is not None:
+            try:
+                spec = json.dumps(_evaluate_chart(code, modules))
+            except MemoryError:
+                break  # The interpreter may be in a bad state; let the pool replace us.
+            except Exception:
+                spec = None
+        reply({"spec": spec})
+
+class _SpecWorker:
+    """A single pre-warmed extraction subprocess and its pipes."""
+
+    def __init__(self, memory_limit_mb: int):
+        package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [package_root, os.environ.get('PYTHONPATH')])))
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", f"{__package__}.spec_extractor", str(memory_limit_mb)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            env=env, text=True, encoding='utf-8'
+        )
+        # A reader thread turns the blocking pipe into a queue we can wait on with a timeout.
+        self._responses: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        threading.Thread(target=self._read_responses, daemon=True).start()
+        self._ready = False
+
+    def _read_responses(self) -> None:
+        for line in self.process.stdout:
+            self._responses.put(json.loads(line))
+        self._responses.put(None)  # EOF: the worker exited.
+
+    def _receive(self, timeout: float, reason: str) -> Dict[str, Any]:
+        try:
+            message = self._responses.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(reason) from None
+        if message is None:
+            raise EOFError("worker exited")
+        return message
+
+    def run(self, code: str, timeout: float) -> Optional[str]:
+        """Evaluates code, raising TimeoutError or EOFError if the worker fails."""
+        if not self._ready:
+            self._receive(config.SPEC_WORKER_START_TIMEOUT, "worker did not start")
+            self._ready = True
+        self.process.stdin.write(json.dumps({"code": code}) + "\n")
+        self.process.stdin.flush()
+        return self._receive(timeout, f"cell exceeded {timeout:g}s")["spec"]
+
+    def close(self) -> None:
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=1)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            pass
+        self.kill()
+
+    def kill(self) -> None:
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+class AltairSpecExtractor:
+    """
+    Extracts Vega-Lite specs from Altair cells in a pool of isolated subprocesses.
+    Workers are launched with `python -m` rather than multiprocessing, so callers
+    do not need an `if __name__ == "__main__"` guard.
+    Each cell runs under a wall-clock timeout and an address-space limit, workers are
+    reused across cells, and results are cached by a SHA-256 digest of the code.
+    """
+
+    def __init__(self, workers: int = config.SPEC_WORKERS, timeout: float = config.SPEC_TIMEOUT,
+                 memory_limit_mb: int = config.SPEC_MEMORY_LIMIT_MB):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self._idle: "queue.LifoQueue[_SpecWorker]" = queue.LifoQueue()
+        self._spawned = 0
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[str, Union[str, None, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def extract(self, code: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the Vega-Lite spec produced by code, or None if it yields no chart.
+        Raises SpecExtractionError when the worker times out or crashes.
+        """
+        key = hashlib.sha256(code.encode('utf-8', 'surrogatepass')).hexdigest()
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._load(self._cache[key])
+            self.misses += 1
+
+        worker = self._acquire()
+        try:
+            spec = worker.run(code, self.timeout)
+            self._idle.put(worker)
+        except (TimeoutError, EOFError, OSError) as e:
+            reason = str(e) if isinstance(e, TimeoutError) else "worker exited, likely over the memory limit"
+            print(f"Warning: Altair spec extraction failed ({reason}). Skipping the chart spec.")
+            worker.kill()
+            with self._lock:
+                self._spawned -= 1
+            spec = _FAILED  # Remembered below so the same cell is not retried.
+
+        with self._lock:
+            self._cache[key] = spec
+            if len(self._cache) > config.SPEC_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return self._load(spec)
+
+    def extract_many(self, codes: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Extracts specs for several cells concurrently, preserving input order."""
+        if len(codes) <= 1:
+            return [self._extract_or_none(code) for code in codes]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(codes))) as executor:
+            return list(executor.map(self._extract_or_none, codes))
+
+    def _extract_or_none(self, code: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.extract(code)
+        except SpecExtractionError:
+            return None
+
+    def start(self) -> None:
+        """
+        Spawns the whole worker pool ahead of time, so that the first chart does not
+        wait for the charting stack to import. Workers finish starting in the background.
+        """
+        with self._lock:
+            missing = self.workers - self._spawned
+            self._spawned += missing
+        for _ in range(missing):
+            self._idle.put(_SpecWorker(self.memory_limit_mb))
+
+    def close(self) -> None:
+        """Shuts down all idle workers."""
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.close()
+            with self._lock:
+                self._spawned -= 1
+
+    def _acquire(self) -> _SpecWorker:
+        """Returns an idle worker, spawning one if the pool is below capacity."""
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                spawn = self._spawned < self.workers
+                if spawn:
+                    self._spawned += 1
+            if spawn:
+                return _SpecWorker(self.memory_limit_mb)
+            # Poll so that capacity freed by a killed worker is noticed.
+            try:
+                return self._idle.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    @staticmethod
+    def _load(spec: Union[str, None, object]) -> Optional[Dict[str, Any]]:
+        if spec is _FAILED:
+            raise SpecExtractionError("extraction of this cell already failed")
+        # Decoding on every lookup hands each caller its own copy of the spec.
+        spec = json.loads(spec) if spec is not None else None
+        return spec if isinstance(spec, dict) else None
+
+if __name__ == "__main__":
+    _worker_main()
@@ -0,0 +1,14 @@
+import os
+import pytest
+from ..batch import BatchConverter
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_workers_close_the_analysis_cache(tmp_path, jobs):
+    for name in ("first", "second"):
+        (tmp_path / f"{name}.py").write_text(f"# %%\n{name} = 1\n# %%\nresult = {name} + 1\n")
+    cache_path = str(tmp_path / "cache.db")
+    results = BatchConverter(str(tmp_path / "out"), jobs=jobs, cache_path=cache_path).run([str(tmp_path)])
+    assert [result.ok for result in results] == [True, True]
+    assert os.path.exists(cache_path)
+    # SQLite removes the write-ahead log when the last connection closes cleanly.
+    assert not os.path.exists(cache_path + "-wal")
@@ -0,0 +1,111 @@
+import ast
+from typing import Optional
+import pytest
+from ..code_analyzer import CodeAnalyzer
+from ..config import config
+from ..data_models import CellAnalysis
+
+class NoCharts:
+    """Spec extractor for cells that never build an Altair chart."""
+    def extract(self, code: str) -> None:
+        return None
+
+def _rhs_names(node: ast.AST) -> set:
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Load)}
+
+def walk_analysis(code: str) -> CellAnalysis:
+    """The analyzer before CellVisitor: one ast.walk, re-walking every assignment value."""
+    cleaned = config.SHELL_PATTERN.sub('', config.MAGIC_PATTERN.sub('', code))
+    try:
+        tree = ast.parse(cleaned)
+    except SyntaxError:
+        return CellAnalysis(set(), set(), set(), "other")
+    defined_vars, used_vars, mutated_vars, pure_overwrites, imported_aliases = set(), set(), set(), set(), set()
+    vega_spec = None
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Store):
+                defined_vars.add(node.id)
+            elif isinstance(node.ctx, ast.Load):
+                used_vars.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            defined_vars.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                imported_aliases.add(alias.asname or alias.name)
+        elif isinstance(node, ast.Call):
+            if any(kw.arg == 'inplace' and getattr(kw.value, 'value', False) for kw in node.keywords):
+                if isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name):
+                    mutated_vars.add(node.func.value.id)
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Subscript) and isinstance(target.value, ast.Name):
+                    mutated_vars.add(target.value.id)
+            lhs_vars = {t.id for t in node.targets if isinstance(t, ast.Name)}
+            pure_overwrites.update(lhs_vars - _rhs_names(node.value))
+            if not vega_spec and any(isinstance(t, ast.Name) and t.id == 'spec' for t in node.targets):
+                try:
+                    spec_dict = ast.literal_eval(node.value)
+                    if isinstance(spec_dict, dict) and "$schema" in spec_dict:
+                        vega_spec = spec_dict
+                except (ValueError, SyntaxError):
+                    pass
+    category = _walk_category(tree, code, vega_spec)
+    used_vars.update(mutated_vars)
+    return CellAnalysis(defined_vars, used_vars - imported_aliases, pure_overwrites, category, vega_spec)
+
+def _walk_category(tree: ast.Module, code: str, vega_spec: Optional[dict]) -> str:
+    if all(isinstance(n, (ast.Import, ast.ImportFrom)) for n in tree.body):
+        return "imports"
+    if any(kw in code for kw in config.VIZ_KEYWORDS) or vega_spec is not None:
+        return "visualize"
+    if any(kw in code for kw in config.DATA_KEYWORDS):
+        return "load_data"
+    if any(isinstance(n, (ast.Assign, ast.Call, ast.Expr)) for n in tree.body):
+        return "transform"
+    return "other"
+
+SNIPPETS = {
+    "spec_literal": 'spec = {"$schema": "https://vega.github.io/schema/vega-lite/v5.json", "mark": "bar"}',
+    "spec_without_schema": 'spec = {"mark": "bar"}\nx = spec',
+    "spec_not_literal": 'spec = make_spec(df)\nspec = {"$schema": "v5", "data": {"name": "t"}}',
+    "spec_nested_first_in_walk_order": (
+        'def build():\n    spec = {"$schema": "inner", "mark": "line"}\n    return spec\n'
+        'spec = {"$schema": "outer", "mark": "bar"}'
+    ),
+    "spec_in_branch": 'if flag:\n    spec = {"$schema": "a"}\nelse:\n    spec = {"$schema": "b"}',
+    "chained_assign": 'a = b = c + 1\nd, (e, f) = g, (h, a)',
+    "self_referencing_assign": 'x = x + 1\ny = 2\nz: int = y',
+    "aug_and_walrus": 'total += step\nif (n := len(items)) > 3:\n    big = n',
+    "nested_scopes": (
+        'def f(a, b=default):\n    inner = a + b\n    return [k * inner for k in range(b)]\n'
+        'class Model(Base):\n    size = limit\n    def fit(self):\n        self.w = data\n'
+        'g = lambda q: q + offset'
+    ),
+    "comprehensions": 'pairs = {k: v for k, v in mapping.items() if v > cutoff}\nflat = [y for x in rows for y in x]',
+    "inplace_true": 'df.dropna(inplace=True)\nother.fillna(0, inplace=False)\nthird.sort_values("a", inplace=1)',
+    "inplace_nested_attribute": 'frame.col.replace("a", "b", inplace=True)\nmodel.fit(X, inplace=flag)',
+    "subscript_assign": 'df["total"] = df["a"] + df["b"]\nlookup[key] = value\nobj.attr[0] = 1',
+    "imports_only": 'import pandas as pd\nfrom os import path as p, sep\nimport matplotlib.pyplot',
+    "imports_with_use": 'import numpy as np\narr = np.zeros(n)',
+    "magics_and_shell": '%matplotlib inline\n!pip install pandas\nresult = compute(data)\n%time result',
+    "load_data": 'raw = pd.read_csv("data.csv")',
+    "visualize_keyword": 'df.plot(x="a")\nplt.show()',
+    "control_flow": (
+        'for i, row in enumerate(rows):\n    acc.append(row)\nwhile running:\n    running = step()\n'
+        'try:\n    value = parse(text)\nexcept ValueError as err:\n    log(err)\n'
+        'with open(path) as fh:\n    content = fh.read()'
+    ),
+    "decorators_and_fstrings": '@cache\ndef load(name):\n    return f"{prefix}/{name}"\nglobal counter\nprint(f"{counter!r:>10}")',
+    "deeply_nested": 'value = ' + '(' * 150 + 'seed' + ' + 1)' * 150,
+    "only_comments": '# nothing here\n',
+    "empty": '',
+    "syntax_error": 'def broken(:\n    pass',
+    "syntax_error_unclosed": 'x = [1, 2,\ny = 3',
+}
+
+@pytest.mark.parametrize("name", sorted(SNIPPETS))
+def test_cell_visitor_matches_ast_walk_analysis(name):
+    code = SNIPPETS[name]
+    analysis = CodeAnalyzer(spec_extractor=NoCharts()).analyze_dependencies(code)
+    assert analysis == walk_analysis(code)
@@ -0,0 +1,66 @@
+import io
+import json
+from typing import List, Tuple
+import pytest
+from ..code_analyzer import CodeAnalyzer
+from ..curio_converter import CurioConverter, CurioDataflow
+from ..curio_diff import CurioUpdater, apply_patch
+from ..curio_writer import CurioWriter
+from ..data_models import CodeCell
+from ..graph_builder import DependencyGraphBuilder
+from .test_code_analyzer import NoCharts
+
+def spec_cell(values: List[int]) -> str:
+    spec = {"$schema": "https://vega.github.io/schema/vega-lite/v5.json", "mark": "bar",
+            "datasets": {"points": [{"a": value} for value in values]}}
+    return f"spec = {spec!r}\nchart = clean"
+
+# Cells as (id, source), with ids that survive edits as in nbformat 4.5.
+NOTEBOOK = [
+    ("imports", "import pandas as pd"),
+    ("load", "raw = pd.read_csv('data.csv')"),
+    ("clean", "clean = raw.dropna()"),
+    ("summary", "summary = clean.describe()"),
+    ("chart", spec_cell(list(range(20)))),
+]
+# Drops the summary cell, edits the cleaning step, redraws the chart from other
+# data and appends a cell that reads two earlier ones.
+EDITED = [
+    ("imports", "import pandas as pd"),
+    ("load", "raw = pd.read_csv('data.csv')"),
+    ("clean", "clean = raw.fillna(0)"),
+    ("chart", spec_cell(list(range(20, 40)))),
+    ("ratio", "ratio = clean['a'] / raw['b']"),
+]
+
+def dataflow(notebook: List[Tuple[str, str]], datasets: str = "inline") -> CurioDataflow:
+    cells = [CodeCell(id=cell_id, source=source, nb_cell=None) for cell_id, source in notebook]
+    graph = DependencyGraphBuilder(CodeAnalyzer(spec_extractor=NoCharts())).build_graph(cells)
+    return CurioConverter(datasets=datasets, dataset_min_bytes=64).dataflow(graph)
+
+def written(flow, compact: bool) -> bytes:
+    output = io.BytesIO()
+    CurioWriter(compact=compact, backend="json").write_to(output, flow)
+    return output.getvalue()
+
+def test_patch_turns_previous_into_merged():
+    previous = dataflow(NOTEBOOK).to_dict()
+    merged, patch = CurioUpdater(previous).update(dataflow(EDITED))
+    assert patch.added_nodes and patch.removed_nodes and patch.changed_nodes
+    assert patch.added_edges and patch.removed_edges
+    assert apply_patch(previous, json.loads(json.dumps(patch.to_dict()))) == merged.to_dict()
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_unchanged_notebook_is_rewritten_byte_for_byte(compact):
+    before = written(dataflow(NOTEBOOK, "shared"), compact)
+    merged, patch = CurioUpdater(json.loads(before)).update(dataflow(NOTEBOOK, "shared"))
+    assert patch.is_empty()
+    assert written(merged, compact) == before
+
+def test_patch_carries_shared_dataset_changes():
+    previous = dataflow(NOTEBOOK, "shared").to_dict()
+    merged, patch = CurioUpdater(previous).update(dataflow(EDITED, "shared"))
+    assert patch.added_datasets and patch.removed_datasets
+    patched = apply_patch(previous, json.loads(json.dumps(patch.to_dict())))
+    assert patched == merged.to_dict()
+    assert set(patched["datasets"]) == set(patch.added_datasets)
@@ -0,0 +1,56 @@
+import random
+import networkx as nx
+from ..code_analyzer import CodeAnalyzer
+from ..curio_converter import CurioConverter
+from ..dependency_query import DependencyQuery
+from ..graph_builder import DependencyGraphBuilder
+from .test_graph_builder import random_notebook
+
+def random_graphs(count: int, seed: int = 0):
+    builder = DependencyGraphBuilder(CodeAnalyzer())
+    rng = random.Random(seed)
+    for _ in range(count):
+        cells, analyses = random_notebook(rng, rng.randint(1, 40))
+        yield rng, builder.build_graph_from_analyses(cells, analyses)
+
+def test_closure_matches_networkx_on_random_dags():
+    for rng, graph in random_graphs(200):
+        nx_graph = graph.to_networkx()
+        assert nx.is_directed_acyclic_graph(nx_graph)
+        query = DependencyQuery(graph)
+        for cell in graph.cells:
+            assert [graph.cell_id(i) for i in query.ancestors([cell.id])] == \
+                sorted(nx.ancestors(nx_graph, cell.id), key=graph.index)
+            assert [graph.cell_id(i) for i in query.descendants([cell.id])] == \
+                sorted(nx.descendants(nx_graph, cell.id), key=graph.index)
+        targets = rng.sample([cell.id for cell in graph.cells], min(3, len(graph.cells)))
+        expected = set().union(*(nx.ancestors(nx_graph, target) for target in targets))
+        assert {graph.cell_id(i) for i in query.ancestors(targets)} == expected
+        u, v = rng.choice(graph.cells).id, rng.choice(graph.cells).id
+        assert query.depends_on(v, u) == (u != v and nx.has_path(nx_graph, u, v))
+
+def test_slice_export_keeps_the_full_conversion_of_its_cells():
+    converter = CurioConverter()
+    for rng, graph in random_graphs(50, seed=1):
+        full = {node["id"]: node for node in converter.dag_to_curio_json(graph)["dataflow"]["nodes"]}
+        nx_graph = graph.to_networkx()
+        target = rng.choice(graph.cells).id
+        for direction in ("upstream", "downstream", "both"):
+            view = DependencyQuery(graph).slice([target], direction)
+            expected = {target}
+            if direction != "downstream":
+                expected |= nx.ancestors(nx_graph, target)
+            if direction != "upstream":
+                expected |= nx.descendants(nx_graph, target)
+            assert {view.cell_id(i) for i in view.nodes()} == expected
+
+            exported = converter.dag_to_curio_json(graph, view)["dataflow"]
+            kept = {converter.node_uuid(cell_id) for cell_id in expected
+                    if graph.category(graph.index(cell_id)) != "imports"}
+            assert {node["id"] for node in exported["nodes"]} == kept
+            for node in exported["nodes"]:
+                assert node["content"] == full[node["id"]]["content"]
+                assert node["type"] == full[node["id"]]["type"]
+            expected_edges = {(converter.node_uuid(u), converter.node_uuid(v)) for u, v in nx_graph.edges()}
+            expected_edges = {(u, v) for u, v in expected_edges if u in kept and v in kept}
+            assert {(edge["source"], edge["target"]) for edge in exported["edges"]} == expected_edges
@@ -0,0 +1,129 @@
+import random
+from typing import Dict, List, Set, Tuple
+from ..code_analyzer import CodeAnalyzer
+from ..config import config
+from ..data_models import CellAnalysis, CodeCell
+from ..graph_builder import DependencyGraphBuilder
+
+VARIABLES = [f"v{i}" for i in range(12)]
+
+def backward_scan_edges(cells: List[CodeCell], analyses: Dict[str, CellAnalysis]) -> Dict[Tuple[str, str], Set[str]]:
+    """The original edge algorithm: each used variable resolves to the nearest earlier definition."""
+    edges: Dict[Tuple[str, str], Set[str]] = {}
+    cell_ids = [cell.id for cell in cells]
+    for i, current in enumerate(cell_ids):
+        analysis = analyses[current]
+        for var in analysis.used_vars - analysis.pure_overwrites:
+            for j in range(i - 1, -1, -1):
+                if var in analyses[cell_ids[j]].defined_vars:
+                    edges.setdefault((cell_ids[j], current), set()).add(var)
+                    break
+    return edges
+
+def random_notebook(rng: random.Random, size: int) -> Tuple[List[CodeCell], Dict[str, CellAnalysis]]:
+    cells, analyses = [], {}
+    for i in range(size):
+        defined = set(rng.sample(VARIABLES, rng.randint(0, 3)))
+        used = set(rng.sample(VARIABLES, rng.randint(0, 4)))
+        # In-place mutations such as df.dropna(inplace=True) count as uses.
+        used |= set(rng.sample(VARIABLES, rng.randint(0, 2)))
+        overwrites = {var for var in defined if rng.random() < 0.3}
+        cell = CodeCell(id=f"cell_{i}", source=f"# cell {i}", nb_cell=None)
+        cells.append(cell)
+        analyses[cell.id] = CellAnalysis(defined, used, overwrites, rng.choice(config.LOGICAL_CELL_ORDER))
+    return cells, analyses
+
+def test_edges_match_backward_scan_on_random_notebooks():
+    builder = DependencyGraphBuilder(CodeAnalyzer())
+    rng = random.Random(0)
+    for _ in range(300):
+        cells, analyses = random_notebook(rng, rng.randint(0, 40))
+        graph = builder.build_graph_from_analyses(cells, analyses)
+        edges = {(graph.cell_id(u), graph.cell_id(v)): set(names) for u, v, names in graph.edges()}
+        ordered = DependencyGraphBuilder._logical_order(cells, analyses)
+        assert edges == backward_scan_edges(ordered, analyses)
+
+def graph_of(*cells: Tuple[str, Set[str], Set[str], str]):
+    """Builds a graph from (source, defined, used, category) tuples, with ids cell_0, cell_1, ..."""
+    code_cells, analyses = [], {}
+    for i, (source, defined, used, category) in enumerate(cells):
+        cell = CodeCell(id=f"cell_{i}", source=source, nb_cell=None)
+        code_cells.append(cell)
+        analyses[cell.id] = CellAnalysis(set(defined), set(used), set(), category)
+    return DependencyGraphBuilder(CodeAnalyzer()).build_graph_from_analyses(code_cells, analyses)
+
+def edge_map(graph) -> Dict[Tuple[str, str], Set[str]]:
+    return {(graph.cell_id(u), graph.cell_id(v)): set(names) for u, v, names in graph.edges()}
+
+def test_coarsen_fuses_a_linear_run():
+    graph = graph_of(
+        ("import pandas as pd", {"pd"}, set(), "imports"),
+        ("raw = pd.read_csv('a.csv')", {"raw"}, {"pd"}, "load_data"),
+        ("a = raw.dropna()", {"a"}, {"raw"}, "transform"),
+        ("b = a + 1", {"b"}, {"a"}, "transform"),
+        ("c = pd.DataFrame(b)", {"c"}, {"b", "pd"}, "transform"),
+        ("c.plot()", set(), {"c"}, "visualize"),
+    )
+    coarse = DependencyGraphBuilder.coarsen_chains(graph)
+    assert [cell.id for cell in coarse.cells] == ["cell_0", "cell_1", "cell_2", "cell_5"]
+    chain, analysis = coarse.cell(2), coarse.analysis(2)
+    assert [member.id for member in chain.members] == ["cell_2", "cell_3", "cell_4"]
+    assert chain.source == "a = raw.dropna()\nb = a + 1\nc = pd.DataFrame(b)"
+    assert chain.output_var == "c"
+    assert (analysis.defined_vars, analysis.used_vars, analysis.category) == ({"a", "b", "c"}, {"raw", "pd"}, "transform")
+    assert edge_map(coarse) == {
+        ("cell_0", "cell_1"): {"pd"}, ("cell_0", "cell_2"): {"pd"},
+        ("cell_1", "cell_2"): {"raw"}, ("cell_2", "cell_5"): {"c"},
+    }
+
+def test_fused_run_hands_on_the_last_link_when_its_last_cell_defines_nothing():
+    graph = graph_of(
+        ("a = 1", {"a"}, set(), "transform"),
+        ("b = a + 1", {"b"}, {"a"}, "transform"),
+        ("print(b)", set(), {"b"}, "transform"),
+    )
+    coarse = DependencyGraphBuilder.coarsen_chains(graph)
+    assert len(coarse.cells) == 1
+    assert coarse.cell(0).output_var == "b"
+
+def test_fan_out_and_fan_in_break_chains():
+    fan_out = graph_of(
+        ("x = 1", {"x"}, set(), "transform"),
+        ("y = x + 1", {"y"}, {"x"}, "transform"),
+        ("z = x * 2", {"z"}, {"x"}, "transform"),
+        ("w = y - 1", {"w"}, {"y"}, "transform"),
+    )
+    coarse = DependencyGraphBuilder.coarsen_chains(fan_out)
+    assert [cell.id for cell in coarse.cells] == ["cell_0", "cell_1", "cell_2"]
+    assert [member.id for member in coarse.cell(1).members] == ["cell_1", "cell_3"]
+    assert edge_map(coarse) == {("cell_0", "cell_1"): {"x"}, ("cell_0", "cell_2"): {"x"}}
+
+    fan_in = graph_of(
+        ("x = 1", {"x"}, set(), "transform"),
+        ("y = 2", {"y"}, set(), "transform"),
+        ("z = x + y", {"z"}, {"x", "y"}, "transform"),
+    )
+    assert DependencyGraphBuilder.coarsen_chains(fan_in) is fan_in
+
+def test_chains_need_min_length_cells_of_one_coarsened_category():
+    run = [
+        ("a = 1", {"a"}, set(), "transform"),
+        ("b = a + 1", {"b"}, {"a"}, "transform"),
+        ("c = b + 1", {"c"}, {"b"}, "transform"),
+    ]
+    graph = graph_of(*run)
+    assert DependencyGraphBuilder.coarsen_chains(graph, min_length=4) is graph
+    assert len(DependencyGraphBuilder.coarsen_chains(graph, min_length=3).cells) == 1
+    assert DependencyGraphBuilder.coarsen_chains(graph, categories=frozenset(["visualize"])) is graph
+
+    mixed = graph_of(*run[:2], ("b.plot()", set(), {"b"}, "visualize"))
+    coarse = DependencyGraphBuilder.coarsen_chains(mixed)
+    assert [cell.id for cell in coarse.cells] == ["cell_0", "cell_2"]
+
+def test_import_cells_are_never_fused():
+    graph = graph_of(
+        ("import numpy as np", {"np"}, set(), "imports"),
+        ("from numpy import linalg", {"linalg"}, {"np"}, "imports"),
+        ("x = linalg.norm(v)", {"x"}, {"linalg"}, "transform"),
+    )
+    assert DependencyGraphBuilder.coarsen_chains(graph, categories=frozenset(["imports", "transform"])) is graph
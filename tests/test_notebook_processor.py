@@ -0,0 +1,28 @@
+import json
+import pytest
+from ..notebook_processor import NotebookLoadError, NotebookProcessor
+
+NOTEBOOK = json.dumps({
+    "nbformat": 4, "nbformat_minor": 5, "metadata": {},
+    "cells": [{"cell_type": "code", "id": "a1", "metadata": {}, "source": "x = 1", "outputs": []}],
+}).encode('utf-8')
+
+def _cells(data: bytes):
+    return NotebookProcessor("<request body>", data=data).get_code_cells()
+
+def test_notebook_and_script_bodies_are_sniffed():
+    assert [cell.source for cell in _cells(NOTEBOOK)] == ["x = 1"]
+    assert [cell.source for cell in _cells(b"# %%\nx = 1\n# %%\ny = x\n")] == ["x = 1", "y = x"]
+    assert [cell.source for cell in _cells(b"x = 1\ny = x\n")] == ["x = 1\ny = x"]
+
+@pytest.mark.parametrize("data", [b"garbage{", b"\xff\xfe\x00binary", b"<html><body>not a notebook</body></html>"])
+def test_bodies_that_are_neither_format_fail_to_load(data):
+    with pytest.raises(NotebookLoadError):
+        _cells(data)
+
+@pytest.mark.parametrize("name", ["folder", "folder.ipynb"])
+def test_unreadable_paths_fail_to_load(tmp_path, name):
+    path = tmp_path / name
+    path.mkdir()
+    with pytest.raises(NotebookLoadError):
+        NotebookProcessor(str(path)).get_code_cells()
@@ -0,0 +1,20 @@
+from ..script_reader import read_script_cells
+
+def test_indented_marker_does_not_split_a_block():
+    script = (
+        "# %%\n"
+        "def f(rows):\n"
+        "    total = 0\n"
+        "    # %% not a cell boundary\n"
+        "    for row in rows:\n"
+        "        total += row\n"
+        "    return total\n"
+        "# %% [markdown]\n"
+        "# notes\n"
+        "# %%\n"
+        "result = f(data)\n"
+    )
+    cells = read_script_cells(script.splitlines(keepends=True))
+    assert [cell.id for cell in cells] == ['cell_0', 'cell_2']
+    assert '# %% not a cell boundary' in cells[0].source
+    assert cells[1].source == 'result = f(data)'
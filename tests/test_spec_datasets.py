@@ -0,0 +1,68 @@
+import copy
+from typing import Any, Dict
+import pytest
+from ..spec_datasets import DATASET_MODES, DatasetStore
+
+BIG = [{"x": i, "y": i * i} for i in range(50)]
+OTHER = [{"x": i, "label": f"point {i}"} for i in range(40)]
+SMALL = [{"x": 1}]
+
+def chart(values) -> Dict[str, Any]:
+    return {
+        "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+        "datasets": {"table": values, "tiny": SMALL},
+        "data": {"name": "table"},
+        "layer": [
+            {"data": {"values": copy.deepcopy(OTHER)}, "mark": "point"},
+            {"data": {"name": "tiny"}, "mark": "rule"},
+            {"data": {"values": SMALL, "format": {"type": "json"}}, "mark": "text"},
+        ],
+    }
+
+def resolve(value: Any, datasets: Dict[str, Any]) -> Any:
+    """The data each source of a spec stands for, with named sources looked up in datasets."""
+    if isinstance(value, list):
+        return [resolve(item, datasets) for item in value]
+    if not isinstance(value, dict):
+        return value
+    resolved = {}
+    for key, item in value.items():
+        if key == "datasets":
+            continue
+        if key == "data" and isinstance(item, dict):
+            source = {k: v for k, v in item.items() if k not in ("name", "values")}
+            source["values"] = datasets[item["name"]] if "name" in item else item["values"]
+            item = source
+        resolved[key] = resolve(item, datasets)
+    return resolved
+
+@pytest.mark.parametrize("mode", DATASET_MODES)
+def test_every_mode_resolves_to_the_inline_data(mode):
+    specs = [chart(BIG), chart(copy.deepcopy(BIG))]
+    originals = copy.deepcopy(specs)
+    store = DatasetStore(mode, min_bytes=200)
+    rewritten = [store.rewrite(spec) for spec in specs]
+    assert specs == originals
+
+    for spec, new in zip(specs, rewritten):
+        expected = resolve(spec, spec["datasets"])
+        if mode == "drop":
+            # Preview-only output: large datasets are emptied, small ones kept.
+            expected["data"]["values"] = []
+            expected["layer"][0]["data"]["values"] = []
+        assert resolve(new, {**store.datasets, **new.get("datasets", {})}) == expected
+
+    if mode == "inline":
+        assert rewritten == specs and not store.datasets
+    elif mode == "drop":
+        assert not store.datasets
+    else:
+        # BIG and OTHER are stored once each, however many specs embed them.
+        assert sorted(store.datasets.values(), key=len) == [OTHER, BIG]
+        assert store.references == 4
+        assert all(new["datasets"] == {"tiny": SMALL} for new in rewritten)
+
+def test_threshold_is_inclusive():
+    size = len('[{"x":1}]')
+    assert DatasetStore("shared", min_bytes=size).rewrite(chart(SMALL))["data"]["name"].startswith("data-")
+    assert DatasetStore("shared", min_bytes=size + 1).rewrite(chart(SMALL))["data"] == {"name": "table"}
@@ -0,0 +1,101 @@
+import os
+import time
+from typing import Dict, Optional, Tuple
+from .notebook_processor import NotebookProcessor, NotebookLoadError
+from .code_analyzer import CodeAnalyzer
+from .graph_builder import DependencyGraphBuilder
+from .curio_converter import CurioConverter
+from .curio_writer import CurioWriter, datasets_path
+from .data_models import CellAnalysis, GraphPatch
+from .cell_graph import CellGraph
+from .config import config
+
+class NotebookWatcher:
+    """
+    Keeps a notebook's dependency graph in memory and re-syncs it whenever the
+    file changes. Only cells whose source changed are re-analyzed; the graph is
+    rebuilt from the kept analyses and the Curio JSON is rewritten with stable
+    node ids when any node or edge changed. With coarsen set, linear chains of
+    cells are fused when the JSON is written, as in a one-off conversion.
+    """
+
+    def __init__(self, notebook_path: str, output_path: str, analyzer: Optional[CodeAnalyzer] = None,
+                 interval: float = config.WATCH_INTERVAL, writer: Optional[CurioWriter] = None,
+                 layout: Optional[str] = None, datasets: Optional[str] = None,
+                 dataset_min_bytes: int = config.DATASET_MIN_BYTES, coarsen: Optional[int] = None):
+        self.notebook_path = notebook_path
+        self.output_path = output_path
+        self.interval = interval
+        self.coarsen = coarsen
+        self.graph_builder = DependencyGraphBuilder(analyzer or CodeAnalyzer())
+        self.writer = writer or CurioWriter()
+        self.curio_converter = CurioConverter(compact=self.writer.compact, layout=layout, datasets=datasets,
+                                              dataset_min_bytes=dataset_min_bytes)
+        self.graph = CellGraph()
+        self.cell_analyses: Dict[str, CellAnalysis] = {}
+        self._sources: Dict[str, str] = {}
+        self._signature: Optional[Tuple[int, int]] = None
+        self._written = False
+
+    def sync(self) -> GraphPatch:
+        """Re-reads the notebook, re-analyzes changed cells and updates the graph."""
+        code_cells = NotebookProcessor(self.notebook_path).get_code_cells()
+        dirty = [cell for cell in code_cells if self._sources.get(cell.id) != cell.source]
+
+        analyzer = self.graph_builder.analyzer
+        analyzer.prefetch_altair_specs([cell.source for cell in dirty])
+        for cell in dirty:
+            self.cell_analyses[cell.id] = analyzer.analyze_dependencies(cell.source)
+        self._sources = {cell.id: cell.source for cell in code_cells}
+        self.cell_analyses = {cell.id: self.cell_analyses[cell.id] for cell in code_cells}
+
+        self.graph, patch = self.graph_builder.update_graph(self.graph, code_cells, self.cell_analyses)
+        if not patch.is_empty() or not self._written:
+            self._write_output()
+        return patch
+
+    def run(self) -> None:
+        """Polls the notebook for changes until interrupted."""
+        print(f"\nWatching notebook: {self.notebook_path} (Ctrl+C to stop)")
+        try:
+            while True:
+                signature = self._file_signature()
+                if signature is not None and signature != self._signature:
+                    self._signature = signature
+                    self._sync_and_report()
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
+
+    def _sync_and_report(self) -> None:
+        start = time.perf_counter()
+        try:
+            patch = self.sync()
+        except NotebookLoadError as e:
+            # Editors often write notebooks in several steps; retry on the next change.
+            print(f"{e} Waiting for the next save...")
+            self._signature = None
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        if patch.is_empty():
+            print(f"No dependency changes ({elapsed:.0f} ms).")
+        else:
+            print(f"Updated {self.output_path}: {patch.summary()} ({elapsed:.0f} ms)")
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.notebook_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _write_output(self) -> None:
+        """Writes the Curio JSON atomically so readers never see a partial file."""
+        tmp_path = f"{self.output_path}.tmp"
+        graph = self.graph
+        if self.coarsen is not None:
+            graph = self.graph_builder.coarsen_chains(graph, self.coarsen)
+        self.writer.write(tmp_path, self.curio_converter.dataflow(graph),
+                          side_path=datasets_path(self.output_path))
+        os.replace(tmp_path, self.output_path)
+        self._written = True